@@ -0,0 +1,126 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the rule-based context extraction fast path.
+
+Measures how often the rule-based parser is confident enough to skip the LLM
+extractor, how long parsing takes, and the resulting per-turn latency saving.
+
+By default the LLM latency is taken from --llm-latency-ms. With --live, the LLM
+extractor is called through the ADK runner for every sample query instead
+(requires Vertex AI credentials).
+
+Usage:
+    uv run python -m benchmarks.context_extraction [--live] [--llm-latency-ms 800]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from tabulate import tabulate
+
+from rag.shared_libraries.context_parser import (
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    parse_student_context,
+)
+
+SAMPLE_QUERIES = [
+    "I'm studying CBSE Grade 10 Science. Can you explain what photosynthesis is?",
+    "I'm studying Tamil Nadu State Board Grade 4 Science. Explain photosynthesis like a story.",
+    "What is a quadratic equation? Use memory techniques.",
+    "I'm in Class 9 ICSE. Help me with algebra using simple examples.",
+    "Explain Newton's laws for Grade 11 Physics",
+    "I'm studying Maharashtra State Board Class 12 Mathematics. Explain with simple examples.",
+    "i am studing in 4th science in tamilnadu state board : what is transparent object?",
+    "I'm in 5th grade CBSE. What is photosynthesis?",
+    "Tamil Nadu State Board Grade 4 English: can you explain MY LITTLE PICTIONARY",
+    "cbse class x maths - what are real numbers?",
+    "What about cellular respiration?",
+    "Hi, how are you?",
+]
+
+PARSER_REPEATS = 200
+
+
+def time_parser(query: str, threshold: float) -> tuple[float, bool]:
+    """Returns the mean parse time in milliseconds and whether the LLM is skipped."""
+    start = time.perf_counter()
+    for _ in range(PARSER_REPEATS):
+        parsed = parse_student_context(query)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / PARSER_REPEATS
+    return elapsed_ms, parsed.is_confident(threshold)
+
+
+async def time_llm_extractor(queries: list[str]) -> list[float]:
+    """Calls the LLM extractor once per query and returns latencies in milliseconds."""
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    from rag.agents import create_context_extractor_agent
+
+    agent = create_context_extractor_agent(use_fast_path=False)
+    runner = InMemoryRunner(agent, app_name='context_extraction_benchmark')
+    latencies = []
+    for query in queries:
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id='benchmark', session_id=str(uuid.uuid4())
+        )
+        message = types.Content(role='user', parts=[types.Part(text=query)])
+        start = time.perf_counter()
+        async for _ in runner.run_async(
+            user_id='benchmark', session_id=session.id, new_message=message
+        ):
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', action='store_true', help='Measure the LLM extractor against Vertex AI.')
+    parser.add_argument('--llm-latency-ms', type=float, default=800.0, help='Assumed LLM extractor latency when not --live.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.live:
+        llm_latencies = asyncio.run(time_llm_extractor(SAMPLE_QUERIES))
+    else:
+        llm_latencies = [args.llm_latency_ms] * len(SAMPLE_QUERIES)
+
+    rows = []
+    baseline_ms = 0.0
+    fast_path_ms = 0.0
+    for query, llm_ms in zip(SAMPLE_QUERIES, llm_latencies, strict=True):
+        parse_ms, skipped = time_parser(query, args.threshold)
+        turn_ms = parse_ms if skipped else parse_ms + llm_ms
+        baseline_ms += llm_ms
+        fast_path_ms += turn_ms
+        rows.append([query[:60], 'rules' if skipped else 'llm', f'{parse_ms:.3f}', f'{llm_ms:.0f}', f'{turn_ms:.1f}'])
+
+    print(tabulate(rows, headers=['query', 'path', 'parse ms', 'llm ms', 'turn ms']))
+    hits = sum(1 for row in rows if row[1] == 'rules')
+    print()
+    print(f'Fast-path hit rate: {hits}/{len(rows)} ({hits / len(rows):.0%})')
+    print(f'Mean extraction latency, LLM only:  {baseline_ms / len(rows):.1f} ms')
+    print(f'Mean extraction latency, fast path: {fast_path_ms / len(rows):.1f} ms')
+    print(f'Mean saving per turn:               {(baseline_ms - fast_path_ms) / len(rows):.1f} ms')
+    if args.live:
+        print(f'LLM latency p50: {statistics.median(llm_latencies):.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline load benchmark for the explanation agent and the root RAG agent.
+
+Drives concurrent sessions through the real ADK runner with a stub model and a
+stub retrieval backend (see benchmarks/stubs.py), so orchestration overhead,
+caching and concurrency changes can be measured without Vertex AI. Each session
+asks a question naming its board, grade and subject, followed by follow-up
+questions, with streaming enabled as in run_explanation_agent.py.
+
+Reports throughput, p50/p95/p99 turn latency and time to first token, per-stage
+latency, and the peak resident memory of the process.
+
+With --llm-stages, context extraction and retrieval go through the model too,
+as they do without the fast paths. --fast-stages then runs those two stages on a
+faster stub model with thinking turned off (StageConfig), while the generator
+keeps the main model, to measure the effect of per-stage model selection.
+
+Usage:
+    uv run python -m benchmarks.load_test [--agent explanation|root] [--sessions 16]
+        [--turns 3] [--first-token-ms 300] [--tokens-per-second 200]
+        [--thinking-tokens 0] [--output-tokens 150] [--retrieval-ms 50]
+        [--retrieval-cache] [--llm-stages] [--fast-stages] [--fast-first-token-ms 150]
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import os
+import resource
+import sys
+import time
+import uuid
+
+from google.adk.agents import BaseAgent
+from google.adk.runners import InMemoryRunner
+from tabulate import tabulate
+
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag.shared_libraries.retrieval_cache import RetrievalCache
+from rag.shared_libraries.stage_config import StageConfig
+from rag.shared_libraries.streaming import stream_turn
+
+OPENING_QUESTIONS = [
+    "I'm studying CBSE Grade 10 Science. Can you explain photosynthesis like a story?",
+    "I'm studying Tamil Nadu State Board Grade 4 Science. What is a transparent object? Use simple examples.",
+    "I'm studying Maharashtra State Board Class 12 Mathematics. What is a derivative? Use simple examples.",
+    "ICSE Class 9 English: what is a simile? Give me a memory technique.",
+]
+FOLLOW_UP_QUESTIONS = [
+    'Can you explain that with simple examples?',
+    'Give me a memory technique to remember it.',
+    'Explain it like a story.',
+]
+
+
+@dataclasses.dataclass
+class LoadTestResult:
+    """Measurements of one load test run, in seconds."""
+
+    wall_time: float
+    latencies: list[float]
+    times_to_first_token: list[float]
+    stages: dict[str, list[float]]
+
+    @property
+    def turns(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        """Completed turns per second."""
+        return self.turns / self.wall_time if self.wall_time else 0.0
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Returns the q-th percentile (0-100) of values, interpolating linearly."""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_mb() -> float:
+    """Returns the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def create_agent(
+    agent: str,
+    llm: StubLlm,
+    retrieval_tool: FixtureRetrieval,
+    llm_stages: bool = False,
+    fast_stage_config: StageConfig | None = None,
+) -> BaseAgent:
+    """Builds the explanation agent or the root agent on the stub backends.
+
+    For the explanation agent, `llm_stages` turns off the fast paths of context
+    extraction and retrieval, and `fast_stage_config` is the configuration of
+    those two stages.
+    """
+    # The agents only authenticate when no project is configured.
+    os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'offline-benchmark')
+    if agent == 'root':
+        from rag.agent import create_root_agent
+
+        return create_root_agent(model=llm, retrieval_tool=retrieval_tool)
+
+    from rag.explanation_agent import create_explanation_agent
+
+    # Explicit stage configs, so that *_MODEL environment variables do not swap
+    # a real model in for the stub.
+    return create_explanation_agent(
+        model=llm,
+        retrieval_tool=retrieval_tool,
+        use_direct_retrieval=not llm_stages,
+        use_context_fast_path=not llm_stages,
+        context_extractor_config=fast_stage_config or StageConfig(),
+        rag_retrieval_config=fast_stage_config or StageConfig(),
+        explanation_generator_config=StageConfig(),
+    )
+
+
+async def run_load_test(agent: BaseAgent, sessions: int, turns: int) -> LoadTestResult:
+    """Runs `sessions` concurrent sessions of `turns` turns each.
+
+    Args:
+        agent: The agent to run.
+        sessions: Number of concurrent sessions.
+        turns: Turns per session; the first asks a new question and the others
+            are follow-ups.
+
+    Returns:
+        LoadTestResult: Latencies of every turn and the wall time of the run.
+    """
+    runner = InMemoryRunner(agent=agent, app_name='load_test')
+    answer_authors = ('ExplanationGeneratorAgent', agent.name)
+    latencies, times_to_first_token = [], []
+    stages: dict[str, list[float]] = {}
+
+    async def run_session(index: int) -> None:
+        user_id = f'student-{index}'
+        session = await runner.session_service.create_session(
+            app_name='load_test', user_id=user_id, session_id=str(uuid.uuid4())
+        )
+        questions = [OPENING_QUESTIONS[index % len(OPENING_QUESTIONS)], *FOLLOW_UP_QUESTIONS]
+        for turn in range(turns):
+            timings = await stream_turn(
+                runner,
+                user_id=user_id,
+                session_id=session.id,
+                message=questions[turn % len(questions)],
+                on_text=lambda text: None,
+                answer_authors=answer_authors,
+            )
+            latencies.append(timings.total)
+            if timings.time_to_first_token is not None:
+                times_to_first_token.append(timings.time_to_first_token)
+            for stage, seconds in timings.stages.items():
+                stages.setdefault(stage, []).append(seconds)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(i) for i in range(sessions)))
+    return LoadTestResult(
+        wall_time=time.perf_counter() - start,
+        latencies=latencies,
+        times_to_first_token=times_to_first_token,
+        stages=stages,
+    )
+
+
+def print_report(result: LoadTestResult) -> None:
+    def ms(values: list[float], q: float) -> str:
+        return f'{percentile(values, q) * 1000:.0f}'
+
+    print(f'{result.turns} turns in {result.wall_time:.2f}s: {result.throughput:.1f} turns/s, '
+          f'peak RSS {peak_rss_mb():.0f} MiB')
+    print()
+    rows = [
+        ['turn', ms(result.latencies, 50), ms(result.latencies, 95), ms(result.latencies, 99)],
+        ['first token', ms(result.times_to_first_token, 50), ms(result.times_to_first_token, 95),
+         ms(result.times_to_first_token, 99)],
+    ]
+    rows += [
+        [stage, ms(values, 50), ms(values, 95), ms(values, 99)]
+        for stage, values in result.stages.items()
+    ]
+    print(tabulate(rows, headers=['', 'p50 ms', 'p95 ms', 'p99 ms']))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agent', choices=['explanation', 'root'], default='explanation')
+    parser.add_argument('--sessions', type=int, default=16, help='Number of concurrent sessions.')
+    parser.add_argument('--turns', type=int, default=3, help='Turns per session.')
+    parser.add_argument('--first-token-ms', type=float, default=300.0, help='Stub model time to first token.')
+    parser.add_argument('--tokens-per-second', type=float, default=200.0, help='Stub model generation speed.')
+    parser.add_argument('--thinking-tokens', type=int, default=0, help='Stub model thinking per response.')
+    parser.add_argument('--output-tokens', type=int, default=150, help='Length of stub model answers.')
+    parser.add_argument('--retrieval-ms', type=float, default=50.0, help='Stub retrieval latency.')
+    parser.add_argument('--retrieval-cache', action='store_true', help='Put a RetrievalCache in front of retrieval.')
+    parser.add_argument('--llm-stages', action='store_true',
+                        help='Extract context and retrieve through the model instead of the fast paths.')
+    parser.add_argument('--fast-stages', action='store_true',
+                        help='Run extraction and retrieval on a faster stub model with thinking off.')
+    parser.add_argument('--fast-first-token-ms', type=float, default=150.0,
+                        help='Time to first token of the --fast-stages model.')
+    args = parser.parse_args()
+
+    llm = StubLlm(
+        first_token_latency=args.first_token_ms / 1000,
+        tokens_per_second=args.tokens_per_second,
+        thinking_tokens=args.thinking_tokens,
+        output_tokens=args.output_tokens,
+    )
+    fast_stage_config = None
+    if args.fast_stages:
+        fast_llm = llm.model_copy(update={'model': 'stub-fast', 'first_token_latency': args.fast_first_token_ms / 1000})
+        fast_stage_config = StageConfig(model=fast_llm, thinking_budget=0, max_output_tokens=256)
+    retrieval_tool = FixtureRetrieval(
+        latency=args.retrieval_ms / 1000,
+        cache=RetrievalCache() if args.retrieval_cache else None,
+    )
+    agent = create_agent(args.agent, llm, retrieval_tool, args.llm_stages, fast_stage_config)
+    result = asyncio.run(run_load_test(agent, args.sessions, args.turns))
+    print_report(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the direct (non-LLM) retrieval stage against the LLM retrieval agent.
+
+Runs the explanation agent end to end on sample queries twice, once with the LLM
+RAG Retrieval Agent and once with DirectRagRetrievalAgent, and reports per-turn
+latency and token usage (prompt and output tokens summed over all model calls).
+
+Requires Vertex AI credentials and RAG_CORPUS.
+
+Usage:
+    uv run python -m benchmarks.retrieval_stage [--repeats 1]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from tabulate import tabulate
+
+SAMPLE_QUERIES = [
+    "I'm studying CBSE Grade 10 Science. Can you explain photosynthesis like a story?",
+    "I'm studying Tamil Nadu State Board Grade 4 Science. What is a transparent object? Use simple examples.",
+    "I'm studying Maharashtra State Board Class 12 Mathematics. What is a derivative? Use simple examples.",
+    "Tamil Nadu State Board Grade 4 English: can you explain MY LITTLE PICTIONARY like a story",
+]
+
+
+async def run_turn(runner: InMemoryRunner, query: str) -> dict:
+    """Runs one turn in a new session and returns its latency and token usage."""
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id='benchmark', session_id=str(uuid.uuid4())
+    )
+    message = types.Content(role='user', parts=[types.Part(text=query)])
+    prompt_tokens = output_tokens = llm_calls = 0
+    start = time.perf_counter()
+    async for event in runner.run_async(
+        user_id='benchmark', session_id=session.id, new_message=message
+    ):
+        usage = event.usage_metadata
+        if usage is not None:
+            llm_calls += 1
+            prompt_tokens += usage.prompt_token_count or 0
+            output_tokens += usage.candidates_token_count or 0
+    return {
+        'latency_ms': (time.perf_counter() - start) * 1000,
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'llm_calls': llm_calls,
+    }
+
+
+async def run_benchmark(repeats: int) -> dict[str, list[dict]]:
+    from rag.explanation_agent import create_explanation_agent
+
+    results = {}
+    for mode, direct in (('llm', False), ('direct', True)):
+        agent = create_explanation_agent(use_direct_retrieval=direct)
+        runner = InMemoryRunner(agent, app_name='retrieval_stage_benchmark')
+        results[mode] = [
+            await run_turn(runner, query) for _ in range(repeats) for query in SAMPLE_QUERIES
+        ]
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=1, help='Turns per sample query and mode.')
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.repeats))
+
+    rows = []
+    for mode, turns in results.items():
+        latencies = [t['latency_ms'] for t in turns]
+        rows.append([
+            mode,
+            f'{statistics.mean(latencies):.0f}',
+            f'{statistics.median(latencies):.0f}',
+            f'{statistics.mean(t["llm_calls"] for t in turns):.1f}',
+            f'{statistics.mean(t["prompt_tokens"] for t in turns):.0f}',
+            f'{statistics.mean(t["output_tokens"] for t in turns):.0f}',
+        ])
+    print(tabulate(
+        rows,
+        headers=['retrieval', 'mean ms', 'p50 ms', 'llm calls', 'prompt tokens', 'output tokens'],
+    ))
+
+    llm_ms = statistics.mean(t['latency_ms'] for t in results['llm'])
+    direct_ms = statistics.mean(t['latency_ms'] for t in results['direct'])
+    print()
+    print(f'Mean saving per turn: {llm_ms - direct_ms:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cold-start benchmark for the agent packages.
+
+Starts a fresh interpreter for every sample and measures, cumulatively from
+process start:
+- import: `import rag` (should not authenticate or build anything)
+- import agent module: `import rag.explanation_agent` (dominated by ADK imports)
+- build agent: first access to the explanation agent
+- first event: the first event of the first request, run through an
+  InMemoryRunner. The sample query names its board, grade and subject, so the
+  first event comes from the rule-based context extractor and needs no network.
+  With --live the whole first request is measured instead (requires Vertex AI
+  credentials and RAG_CORPUS).
+
+Usage:
+    uv run python -m benchmarks.startup [--samples 5] [--live]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from tabulate import tabulate
+
+PHASES = ['import', 'import agent module', 'build agent', 'first event']
+
+SAMPLE_SCRIPT = '''
+import asyncio, json, sys, time
+start = time.perf_counter()
+timings = {}
+
+import rag
+timings['import'] = time.perf_counter() - start
+
+import rag.explanation_agent
+timings['import agent module'] = time.perf_counter() - start
+
+agent = rag.explanation_agent.get_explanation_agent()
+timings['build agent'] = time.perf_counter() - start
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+async def first_request(live):
+    runner = InMemoryRunner(agent, app_name='startup_benchmark')
+    session = await runner.session_service.create_session(app_name='startup_benchmark', user_id='benchmark')
+    message = types.Content(role='user', parts=[types.Part(
+        text="I'm studying CBSE Grade 10 Science. Explain photosynthesis like a story.")])
+    events = runner.run_async(user_id='benchmark', session_id=session.id, new_message=message)
+    async for _ in events:
+        if not live:
+            break
+    await events.aclose()
+
+asyncio.run(first_request(live=sys.argv[1] == 'live'))
+timings['first event'] = time.perf_counter() - start
+print(json.dumps(timings))
+'''
+
+
+def run_sample(live: bool) -> dict:
+    """Runs one cold start in a new interpreter and returns its phase timings."""
+    result = subprocess.run(
+        [sys.executable, '-c', SAMPLE_SCRIPT, 'live' if live else 'offline'],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, 'PYTHONWARNINGS': 'ignore'},
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5, help='Number of cold starts to measure.')
+    parser.add_argument('--live', action='store_true', help='Run the whole first request against Vertex AI.')
+    args = parser.parse_args()
+
+    samples = [run_sample(args.live) for _ in range(args.samples)]
+    rows = []
+    for phase in PHASES:
+        seconds = [sample[phase] * 1000 for sample in samples]
+        label = 'first request' if phase == 'first event' and args.live else phase
+        rows.append([label, f'{statistics.median(seconds):.0f}', f'{max(seconds):.0f}'])
+    print(tabulate(rows, headers=['cumulative to', 'p50 ms', 'max ms']))
+
+
+if __name__ == '__main__':
+    main()
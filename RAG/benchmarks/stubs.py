@@ -0,0 +1,251 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Offline stand-ins for Vertex AI, for benchmarks that run without credentials.
+
+- StubLlm: a deterministic model with a configurable time to first token,
+  thinking time and generation speed. It honours the thinking budget and maximum
+  output tokens of the request, so per-stage settings show up in latency. It
+  calls the first declared tool once per turn, answers the context extractor
+  with the JSON it expects, and otherwise writes an answer of a fixed number of
+  tokens, streamed in chunks when the runner asks for streaming.
+- FixtureRetrieval: the real TextbookRagRetrieval tool (textbook filtering,
+  caching and metrics included) whose vector search is replaced by term overlap
+  over a local fixture corpus, with a configurable latency.
+
+Example:
+    >>> agent = create_explanation_agent(
+    ...     model=StubLlm(first_token_latency=0.2),
+    ...     retrieval_tool=FixtureRetrieval(latency=0.05),
+    ... )
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections.abc import AsyncGenerator
+from types import SimpleNamespace
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+from vertexai.preview import rag
+
+from rag.shared_libraries.context_parser import parse_student_context
+from rag.shared_libraries.metrics import Metrics
+from rag.shared_libraries.retrieval_cache import RetrievalCache
+from rag.shared_libraries.student_context import StudentContext
+from rag.shared_libraries.textbook_manifest import TextbookManifest
+from rag.tools.textbook_retrieval import (
+    DEFAULT_SIMILARITY_TOP_K,
+    TOOL_DESCRIPTION,
+    TOOL_NAME,
+    TextbookRagRetrieval,
+)
+
+FIXTURE_CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'textbooks.json')
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates the token count of a text (about 4 tokens per 3 words)."""
+    return (len(text.split()) * 4 + 2) // 3
+
+
+def _content_text(content: types.Content) -> str:
+    return ' '.join(part.text for part in content.parts or [] if part.text)
+
+
+class StubLlm(BaseLlm):
+    """A deterministic model with configurable latency, for offline benchmarks.
+
+    Attributes:
+        first_token_latency: Seconds until the first chunk of a response, not
+            counting thinking.
+        tokens_per_second: Generation speed, of thinking and of the response.
+        thinking_tokens: Tokens spent thinking before each response, unless
+            the request's thinking budget is lower.
+        output_tokens: Length of text answers, in tokens, unless the request's
+            max_output_tokens is lower.
+        chunk_tokens: Tokens per streamed chunk.
+    """
+
+    model: str = 'stub-llm'
+    first_token_latency: float = 0.3
+    tokens_per_second: float = 200.0
+    thinking_tokens: int = 0
+    output_tokens: int = 150
+    chunk_tokens: int = 10
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r'stub-.*']
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        prompt = ' '.join(_content_text(c) for c in llm_request.contents)
+        system_instruction = llm_request.config.system_instruction if llm_request.config else None
+        prompt_tokens = estimate_tokens(prompt) + estimate_tokens(
+            system_instruction if isinstance(system_instruction, str) else ''
+        )
+        question = next(
+            (_content_text(c) for c in reversed(llm_request.contents) if c.role == 'user' and _content_text(c)),
+            '',
+        )
+
+        thinking_tokens, output_tokens = self._limits(llm_request)
+        await asyncio.sleep(self.first_token_latency + thinking_tokens / self.tokens_per_second)
+
+        function_call = self._function_call(llm_request, question)
+        if function_call is not None:
+            yield self._response(types.Part(function_call=function_call), prompt_tokens, 20)
+            return
+
+        agent_name = (llm_request.config.labels or {}).get('adk_agent_name', '') if llm_request.config else ''
+        if agent_name.startswith('ContextExtractor'):
+            student_context = StudentContext.from_parsed(parse_student_context(question))
+            text = student_context.model_dump_json(exclude_none=True)
+            yield self._response(types.Part(text=text), prompt_tokens, estimate_tokens(text))
+            return
+
+        words = _WORD.findall(question.lower()) or ['stub']
+        pieces = []
+        for start in range(0, output_tokens, self.chunk_tokens):
+            count = min(self.chunk_tokens, output_tokens - start)
+            pieces.append(' '.join(words[(start + i) % len(words)] for i in range(count)) + ' ')
+            delay = count / self.tokens_per_second
+            if stream:
+                if start:
+                    await asyncio.sleep(delay)
+                yield LlmResponse(
+                    content=types.Content(role='model', parts=[types.Part(text=pieces[-1])]),
+                    partial=True,
+                )
+            elif start:
+                await asyncio.sleep(delay)
+        yield self._response(types.Part(text=''.join(pieces)), prompt_tokens, output_tokens)
+
+    def _limits(self, llm_request: LlmRequest) -> tuple[int, int]:
+        """Returns the thinking and output tokens allowed by the request."""
+        thinking_tokens, output_tokens = self.thinking_tokens, self.output_tokens
+        config = llm_request.config
+        if config is not None:
+            budget = config.thinking_config.thinking_budget if config.thinking_config else None
+            if budget is not None and budget >= 0:
+                thinking_tokens = min(thinking_tokens, budget)
+            if config.max_output_tokens:
+                output_tokens = min(output_tokens, config.max_output_tokens)
+        return thinking_tokens, output_tokens
+
+    def _function_call(self, llm_request: LlmRequest, question: str) -> types.FunctionCall | None:
+        """Calls the first declared tool, unless this turn already called one."""
+        if llm_request.contents and any(
+            part.function_response for part in llm_request.contents[-1].parts or []
+        ):
+            return None
+        for tool in (llm_request.config.tools or []) if llm_request.config else []:
+            for declaration in getattr(tool, 'function_declarations', None) or []:
+                return types.FunctionCall(name=declaration.name, args={'query': question})
+        return None
+
+    @staticmethod
+    def _response(part: types.Part, prompt_tokens: int, output_tokens: int) -> LlmResponse:
+        return LlmResponse(
+            content=types.Content(role='model', parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+
+class FixtureRetrieval(TextbookRagRetrieval):
+    """The textbook retrieval tool, searching a local fixture corpus.
+
+    Args:
+        fixture_path: JSON file with "rag_corpus" and a list of "textbooks", each
+            with "rag_file_id", "display_name" (following the upload naming
+            convention) and "chunks".
+        latency: Seconds each search takes, standing in for the RAG Engine.
+        similarity_top_k: Number of chunks to retrieve.
+        cache: Retrieval cache to use, if any.
+        metrics: Where to record retrieval metrics.
+    """
+
+    uses_rag_engine = False
+
+    def __init__(
+        self,
+        fixture_path: str = FIXTURE_CORPUS_PATH,
+        latency: float = 0.05,
+        similarity_top_k: int = DEFAULT_SIMILARITY_TOP_K,
+        cache: RetrievalCache | None = None,
+        metrics: Metrics | None = None,
+    ):
+        with open(fixture_path, encoding='utf-8') as f:
+            fixture = json.load(f)
+        rag_corpus = fixture['rag_corpus']
+        textbooks = fixture['textbooks']
+        super().__init__(
+            name=TOOL_NAME,
+            description=TOOL_DESCRIPTION,
+            rag_resources=[rag.RagResource(rag_corpus=rag_corpus)],
+            similarity_top_k=similarity_top_k,
+            cache=cache,
+            metrics=metrics,
+            textbook_manifest=TextbookManifest.from_rag_files(
+                SimpleNamespace(name=f'{rag_corpus}/ragFiles/{t["rag_file_id"]}', display_name=t['display_name'])
+                for t in textbooks
+            ),
+        )
+        self.latency = latency
+        self.chunks = [
+            {
+                'rag_file_id': textbook['rag_file_id'],
+                'text': text,
+                'terms': set(_WORD.findall(text.lower())),
+                'source_uri': f'gs://fixture/{textbook["display_name"]}',
+                'source_display_name': textbook['display_name'],
+            }
+            for textbook in textbooks
+            for text in textbook['chunks']
+        ]
+
+    def query_corpus(self, query: str, store: types.VertexRagStore) -> list[dict]:
+        time.sleep(self.latency)
+        allowed = {
+            file_id for resource in store.rag_resources or [] for file_id in resource.rag_file_ids or []
+        }
+        terms = set(_WORD.findall(query.lower()))
+        scored = []
+        for chunk in self.chunks:
+            if allowed and chunk['rag_file_id'] not in allowed:
+                continue
+            overlap = len(terms & chunk['terms'])
+            if overlap:
+                scored.append((1.0 - overlap / len(terms), chunk))
+        scored.sort(key=lambda item: item[0])
+        return [
+            {
+                'text': chunk['text'],
+                'source_uri': chunk['source_uri'],
+                'source_display_name': chunk['source_display_name'],
+                'distance': distance,
+            }
+            for distance, chunk in scored[:store.similarity_top_k or DEFAULT_SIMILARITY_TOP_K]
+        ]
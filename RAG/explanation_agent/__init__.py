@@ -12,37 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-# Copyright 2025 Google LLC
-#
-# Licensed under the Apache License, Version 2.0 (the "License");
-# you may not use this file except in compliance with the License.
-# You may obtain a copy of the License at
-#
-#     http://www.apache.org/licenses/LICENSE-2.0
-#
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-# See the License for the specific language governing permissions and
-# limitations under the License.
-
 """Explanation Agent Package.
 
 This package contains the Sequential Explanation Agent that provides
 explanations for student questions based on their board, grade, and subject.
+The agent is built on first access to `root_agent`.
 """
 
-import os
+from typing import TYPE_CHECKING
 
-import google.auth
+if TYPE_CHECKING:
+    from google.adk.agents import SequentialAgent
 
-_, project_id = google.auth.default()
-os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
-os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
-os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
+__all__ = ['root_agent']
 
-# Import from agent.py which exports root_agent for ADK CLI
-from .agent import root_agent
 
-__all__ = ['root_agent']
+def __getattr__(name: str) -> 'SequentialAgent':
+    if name == 'root_agent':
+        # Import from agent.py which exports root_agent for ADK CLI
+        from .agent import root_agent
 
+        return root_agent
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -19,20 +19,18 @@ The agent is a SequentialAgent that orchestrates a three-stage workflow:
 1. Context Extraction
 2. RAG Retrieval
 3. Explanation Generation
-"""
-
-import os
 
-import google.auth
+The agent is built on first access to `root_agent`, which also sets up the
+environment (see rag/shared_libraries/environment.py).
+"""
 
-_, project_id = google.auth.default()
-os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
-os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
-os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
+from google.adk.agents import SequentialAgent
 
-# Import the explanation agent
-from rag.explanation_agent import explanation_agent
+from rag.explanation_agent import get_explanation_agent
 
-# ADK CLI expects 'root_agent' to be exported from agent.py
-root_agent = explanation_agent
 
+def __getattr__(name: str) -> SequentialAgent:
+    # ADK CLI expects 'root_agent' to be exported from agent.py
+    if name == 'root_agent':
+        return get_explanation_agent()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -12,16 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os
+"""Student Educational RAG Agent package.
 
-import google.auth
+The submodules are imported, and the agents built, on first access, e.g.
+`rag.agent.root_agent` or `from rag.explanation_agent import explanation_agent`,
+so that importing the package does not authenticate or construct any agent.
+"""
 
-_, project_id = google.auth.default()
-os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
-os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
-os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
+import importlib
+from types import ModuleType
 
-from . import agent
-from . import explanation_agent
+__all__ = ['agent', 'explanation_agent']
 
-__all__ = ['agent', 'explanation_agent']
\ No newline at end of file
+
+def __getattr__(name: str) -> ModuleType:
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -12,51 +12,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os
+import functools
 
 from google.adk.agents import Agent
-from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
-from vertexai.preview import rag
+from google.adk.agents.llm_agent import ToolUnion
+from google.adk.models import BaseLlm
 
-from dotenv import load_dotenv
+from .callbacks import create_history_compaction_callback
 from .prompts import return_instructions_root
+from .shared_libraries.environment import configure_environment
+from .shared_libraries.history_compaction import HistoryCompactor, get_history_compactor
+from .tools import TextbookRagRetrieval, create_textbook_retrieval_tool
 
-load_dotenv()
-
-# Build tools list conditionally based on RAG_CORPUS availability
-tools = []
-rag_corpus = os.environ.get("RAG_CORPUS")
-
-if rag_corpus:
-    ask_vertex_retrieval = VertexAiRagRetrieval(
-        name='retrieve_student_textbook_content',
-        description=(
-            'Use this tool to retrieve relevant content from student textbooks in the RAG corpus. '
-            'The corpus contains PDFs organized by education board, grade level, and subject. '
-            'IMPORTANT: When calling this tool, you MUST include the student\'s education board, '
-            'grade, and subject in the query string to make retrieval more targeted and efficient. '
-            'Format your query as: "[board] [grade] [subject]: [student question]" '
-            'Example: "CBSE Grade 10 Science: What is photosynthesis?" '
-            'This ensures semantic search retrieves content primarily from the correct textbook, '
-            'reducing irrelevant results and improving efficiency. '
-            'After retrieval, filter the results to use only chunks from files matching the student\'s '
-            'board, grade, and subject (check the file display_name or title in the retrieved chunks).'
+
+def create_root_agent(
+    model: str | BaseLlm = 'gemini-2.5-flash',
+    retrieval_tool: TextbookRagRetrieval | None = None,
+    history_compactor: HistoryCompactor | None = None,
+) -> Agent:
+    """Creates the root RAG agent.
+
+    The agent gets `retrieval_tool`, or by default the textbook retrieval tool if
+    RAG_CORPUS is set. Long conversation histories are compacted with
+    `history_compactor`, by default the one configured by the
+    HISTORY_COMPACTION_* environment variables.
+    """
+    configure_environment()
+
+    # Build tools list conditionally based on RAG_CORPUS availability
+    tools: list[ToolUnion] = []
+    ask_vertex_retrieval = retrieval_tool or create_textbook_retrieval_tool()
+    if ask_vertex_retrieval:
+        tools.append(ask_vertex_retrieval)
+
+    history_compactor = history_compactor if history_compactor is not None else get_history_compactor()
+    return Agent(
+        model=model,
+        name='ask_rag_agent',
+        instruction=return_instructions_root(),
+        tools=tools,
+        before_model_callback=(
+            create_history_compaction_callback(history_compactor) if history_compactor else None
         ),
-        rag_resources=[
-            rag.RagResource(
-                # RAG corpus containing student textbooks organized by board, grade, and subject
-                # e.g. projects/123/locations/us-central1/ragCorpora/456
-                rag_corpus=rag_corpus
-            )
-        ],
-        similarity_top_k=5,  # Reduced from 10 since queries are more targeted with context
-        vector_distance_threshold=0.6,
     )
-    tools.append(ask_vertex_retrieval)
-
-root_agent = Agent(
-    model='gemini-2.5-flash',
-    name='ask_rag_agent',
-    instruction=return_instructions_root(),
-    tools=tools,
-)
+
+
+@functools.cache
+def get_root_agent() -> Agent:
+    """Returns the root agent, building it on first use."""
+    return create_root_agent()
+
+
+def __getattr__(name: str) -> Agent:
+    # `root_agent` is what the ADK CLI and deployment scripts look up; it is
+    # built on first access rather than at import.
+    if name == 'root_agent':
+        return get_root_agent()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
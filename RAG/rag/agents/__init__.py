@@ -18,11 +18,16 @@ This package contains individual agent modules that are used as sub-agents
 in the sequential explanation agent workflow.
 """
 
-from .context_extractor_agent import create_context_extractor_agent
+from .context_extractor_agent import (
+    ContextExtractorAgent,
+    create_context_extractor_agent,
+)
 from .explanation_generator_agent import create_explanation_generator_agent
-from .rag_retrieval_agent import create_rag_retrieval_agent
+from .rag_retrieval_agent import DirectRagRetrievalAgent, create_rag_retrieval_agent
 
 __all__ = [
+    'ContextExtractorAgent',
+    'DirectRagRetrievalAgent',
     'create_context_extractor_agent',
     'create_rag_retrieval_agent',
     'create_explanation_generator_agent',
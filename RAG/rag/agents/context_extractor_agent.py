@@ -22,41 +22,261 @@ The agent analyzes user queries to identify:
 - Grade Level (e.g., Grade 1, Grade 2, Class 10, etc.)
 - Subject (e.g., Mathematics, Science, English, History, etc.)
 
+Queries that state their context explicitly are handled by a deterministic parser
+(see rag/shared_libraries/context_parser.py); the LLM is only called when the
+parser is not confident. This removes one model round-trip from most turns.
+
+Either way the result is a StudentContext (see
+rag/shared_libraries/student_context.py): the LLM extractor answers with that
+structured output schema, and state['student_context'] holds the validated
+fields, so later agents read them directly instead of parsing model text.
+
+The resolved context is kept in session state (state['session_student_context'])
+and reused on follow-up turns that do not mention a board, grade or subject, so
+those turns skip extraction entirely.
+
+While the context is incomplete, the student's question is kept in
+state['pending_question'], so that it is answered once a reply such as "CBSE
+Grade 10 Science" completes the context.
+
 This information is then passed to subsequent agents in the sequential workflow.
 """
 
-from google.adk.agents import Agent
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import Agent, BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models import BaseLlm
+from google.genai import types
 
+from ..callbacks.history_compaction import create_history_compaction_callback
 from ..prompts.context_extractor_prompts import return_instructions_context_extractor
+from ..shared_libraries.constants import (
+    PENDING_QUESTION_KEY,
+    SESSION_CONTEXT_KEY,
+    STUDENT_CONTEXT_KEY,
+)
+from ..shared_libraries.context_parser import (
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    ParsedStudentContext,
+    mentions_topic,
+    parse_student_context,
+)
+from ..shared_libraries.history_compaction import HistoryCompactor
+from ..shared_libraries.stage_config import CONTEXT_EXTRACTOR, StageConfig
+from ..shared_libraries.student_context import StudentContext
+
+
+def get_user_query(ctx: InvocationContext) -> str:
+    """Returns the text of the user message that started the invocation."""
+    if not ctx.user_content or not ctx.user_content.parts:
+        return ''
+    return ''.join(part.text for part in ctx.user_content.parts if part.text)
+
+
+def pending_question_delta(
+    state: dict, query: str, previous: ParsedStudentContext, student_context: StudentContext
+) -> dict:
+    """Returns the update of state['pending_question'] for a turn.
+
+    Args:
+        state: The session state.
+        query: The student's message.
+        previous: The session's context before this turn.
+        student_context: The context resolved for this turn.
+    """
+    pending = state.get(PENDING_QUESTION_KEY)
+    if not student_context.is_complete:
+        question = query if mentions_topic(query) else pending
+    elif pending and not previous.is_complete and not mentions_topic(query):
+        # This message completes the context: answer the question asked before.
+        question = pending
+    else:
+        question = None
+    return {PENDING_QUESTION_KEY: question} if question != pending else {}
+
+
+def get_session_context(state: dict) -> ParsedStudentContext:
+    """Returns the student context resolved earlier in the session.
+
+    The result is empty (no fields set) when nothing has been resolved yet.
+    """
+    return ParsedStudentContext.from_dict(state.get(SESSION_CONTEXT_KEY) or {})
+
 
+class ContextExtractorAgent(BaseAgent):
+    """Extracts the student context, calling the LLM only when it has to.
 
-def create_context_extractor_agent(model: str = 'gemini-2.5-flash') -> Agent:
+    For each turn:
+    1. If the session already has a complete context and the query does not
+       mention a board, grade or subject, that context is reused as is.
+    2. Otherwise the query is parsed with the rule-based extractor and merged
+       onto the session context. When board, grade and subject are all known with
+       at least `confidence_threshold` confidence, the result is written to
+       state['student_context'] directly, as the StudentContext the LLM would
+       produce.
+    3. Only if neither applies is the query delegated to the wrapped LLM
+       extractor. Its StudentContext is merged onto the session context.
+
+    Whatever is resolved is stored in state['session_student_context'] for later
+    turns, and the question of turns with an incomplete context in
+    state['pending_question'] (see pending_question_delta()).
+    """
+
+    llm_extractor: BaseAgent
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD
+
+    def __init__(
+        self,
+        llm_extractor: BaseAgent,
+        name: str = 'ContextExtractorAgent',
+        confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+    ):
+        # pydantic validates the fields of the subclass, which mypy cannot see.
+        super().__init__(  # type: ignore[call-arg]
+            name=name,
+            description=(
+                'Extracts education board, grade level, and subject from user queries, '
+                'reusing the session context and falling back to an LLM when needed.'
+            ),
+            llm_extractor=llm_extractor,
+            confidence_threshold=confidence_threshold,
+            sub_agents=[llm_extractor],
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        query = get_user_query(ctx)
+        previous = get_session_context(ctx.session.state)
+        parsed = parse_student_context(query)
+
+        if previous.is_complete and not parsed.mentions_context:
+            # Follow-up turn: the context is unchanged, and it is already in the
+            # conversation history, so only state needs refreshing.
+            student_context = StudentContext.from_parsed(previous)
+            yield self._create_event(
+                ctx,
+                state_delta={
+                    STUDENT_CONTEXT_KEY: student_context.to_state(),
+                    **pending_question_delta(ctx.session.state, query, previous, student_context),
+                },
+            )
+            return
+
+        merged = parsed.merged_onto(previous)
+        if merged.is_confident(self.confidence_threshold):
+            # Emit the context as the LLM would have, so that later agents still
+            # see it in the conversation history as well as in state.
+            student_context = StudentContext.from_parsed(merged)
+            yield self._create_event(
+                ctx,
+                content=types.Content(
+                    role='model', parts=[types.Part(text=student_context.model_dump_json(exclude_none=True))]
+                ),
+                state_delta={
+                    STUDENT_CONTEXT_KEY: student_context.to_state(),
+                    SESSION_CONTEXT_KEY: student_context.to_state(),
+                    **pending_question_delta(ctx.session.state, query, previous, student_context),
+                },
+            )
+            return
+
+        extracted = None
+        async for event in self.llm_extractor.run_async(ctx):
+            if event.actions and STUDENT_CONTEXT_KEY in event.actions.state_delta:
+                extracted = event.actions.state_delta[STUDENT_CONTEXT_KEY]
+            yield event
+
+        if extracted is not None:
+            extracted = StudentContext.from_state(extracted).to_parsed()
+            student_context = StudentContext.from_parsed(extracted.merged_onto(previous))
+            yield self._create_event(
+                ctx,
+                state_delta={
+                    STUDENT_CONTEXT_KEY: student_context.to_state(),
+                    SESSION_CONTEXT_KEY: student_context.to_state(),
+                    **pending_question_delta(ctx.session.state, query, previous, student_context),
+                },
+            )
+
+    def _create_event(
+        self,
+        ctx: InvocationContext,
+        state_delta: dict,
+        content: types.Content | None = None,
+    ) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def create_context_extractor_agent(
+    model: str | BaseLlm = 'gemini-2.5-flash',
+    use_fast_path: bool = True,
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+    config: StageConfig | None = None,
+    history_compactor: HistoryCompactor | None = None,
+) -> BaseAgent:
     """Creates and returns a Context Extractor Agent.
     
-    The Context Extractor Agent is an LLM agent that analyzes user queries to extract
-    education board, grade level, and subject information. This information is stored
-    in the agent's output key for use by subsequent agents in the sequential workflow.
+    The Context Extractor Agent analyzes user queries to extract education board,
+    grade level, and subject information. The validated StudentContext is stored
+    in state['student_context'] for use by subsequent agents in the sequential
+    workflow.
+
+    By default the LLM extractor is wrapped in a ContextExtractorAgent that reuses
+    the session's context on follow-up turns and skips the model call whenever the
+    rule-based parser is confident.
     
     Args:
-        model: The model name to use for the agent. Defaults to 'gemini-2.5-flash'.
+        model: The model (name or BaseLlm instance) to use for the agent. Defaults to
+            'gemini-2.5-flash'.
+        use_fast_path: Whether to try the rule-based parser before calling the LLM.
+            Defaults to True.
+        confidence_threshold: Minimum parser confidence (0-1) for skipping the LLM.
+        config: Model and generation settings of the LLM extractor, overriding
+            `model`. Defaults to the CONTEXT_EXTRACTOR_* environment variables
+            (see rag/shared_libraries/stage_config.py).
+        history_compactor: Compacts the conversation history in the LLM
+            extractor's model requests once it is long. Only applies without the
+            fast path, which sends the extractor the current message alone.
     
     Returns:
-        Agent: A configured Context Extractor Agent instance.
+        BaseAgent: A configured Context Extractor Agent instance.
     
     Example:
         >>> agent = create_context_extractor_agent()
         >>> # The agent will extract context from user queries and store it in state
     """
-    agent = Agent(
-        name='ContextExtractorAgent',
-        model=model,
+    config = config if config is not None else StageConfig.from_env(CONTEXT_EXTRACTOR)
+    llm_extractor = Agent(
+        name='ContextExtractorLlmAgent' if use_fast_path else 'ContextExtractorAgent',
+        **config.agent_kwargs(model),
         instruction=return_instructions_context_extractor(),
+        # The previously resolved context is injected into the instruction, so the
+        # extractor does not need to re-read the whole conversation history.
+        include_contents='none' if use_fast_path else 'default',
         description=(
             'Extracts education board, grade level, and subject from user queries. '
             'Outputs structured JSON with board, grade, and subject information.'
         ),
-        output_key='student_context',  # Stores extracted context in state['student_context']
+        before_model_callback=(
+            create_history_compaction_callback(history_compactor) if history_compactor else None
+        ),
+        output_schema=StudentContext,
+        output_key=STUDENT_CONTEXT_KEY,  # Stores extracted context in state['student_context']
     )
-    
-    return agent
 
+    if not use_fast_path:
+        return llm_extractor
+
+    return ContextExtractorAgent(
+        llm_extractor=llm_extractor,
+        confidence_threshold=confidence_threshold,
+    )
@@ -19,15 +19,49 @@ textbook content into clear, age-appropriate explanations tailored to the studen
 grade level.
 
 The agent reads the student context and retrieved content from previous agents and
-generates curriculum-aligned explanations with proper citations.
+generates curriculum-aligned explanations with proper citations. When it offers
+the student a choice of explanation styles, the retrieved content is kept for the
+reply (see rag/callbacks/style_choice.py).
+
+The student context is read from the StudentContext in state and written into
+the instruction as plain fields; when it is incomplete, the generator asks the
+student for the missing details.
 """
 
+
 from google.adk.agents import Agent
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import BaseLlm
+
+from ..callbacks.history_compaction import create_history_compaction_callback
+from ..callbacks.style_choice import record_style_choice
+from ..prompts.explanation_generator_prompts import (
+    return_instructions_explanation_generator,
+    return_student_context_instructions,
+)
+from ..shared_libraries.constants import (
+    FINAL_EXPLANATION_KEY,
+    PENDING_QUESTION_KEY,
+    STUDENT_CONTEXT_KEY,
+)
+from ..shared_libraries.history_compaction import HistoryCompactor
+from ..shared_libraries.stage_config import EXPLANATION_GENERATOR, StageConfig
+from ..shared_libraries.student_context import StudentContext
 
-from ..prompts.explanation_generator_prompts import return_instructions_explanation_generator
+
+def explanation_generator_instruction(context: ReadonlyContext) -> str:
+    """Returns the generator instructions with this turn's student context."""
+    student_context = StudentContext.from_state(context.state.get(STUDENT_CONTEXT_KEY))
+    return return_instructions_explanation_generator() + return_student_context_instructions(
+        student_context, pending_question=context.state.get(PENDING_QUESTION_KEY)
+    )
 
 
-def create_explanation_generator_agent(model: str = 'gemini-2.5-flash') -> Agent:
+def create_explanation_generator_agent(
+    model: str | BaseLlm = 'gemini-2.5-flash',
+    config: StageConfig | None = None,
+    history_compactor: HistoryCompactor | None = None,
+) -> Agent:
     """Creates and returns an Explanation Generator Agent.
     
     The Explanation Generator Agent synthesizes retrieved textbook content into
@@ -36,7 +70,15 @@ def create_explanation_generator_agent(model: str = 'gemini-2.5-flash') -> Agent
     and generates curriculum-aligned explanations with proper citations.
     
     Args:
-        model: The model name to use for the agent. Defaults to 'gemini-2.5-flash'.
+        model: The model (name or BaseLlm instance) to use for the agent. Defaults to
+            'gemini-2.5-flash'.
+        config: Model and generation settings, overriding `model`. Defaults to
+            the EXPLANATION_GENERATOR_* environment variables (see
+            rag/shared_libraries/stage_config.py).
+        history_compactor: Compacts the conversation history in the agent's
+            model requests once it is long (see
+            rag/shared_libraries/history_compaction.py). None sends the whole
+            history.
     
     Returns:
         Agent: A configured Explanation Generator Agent instance.
@@ -45,16 +87,21 @@ def create_explanation_generator_agent(model: str = 'gemini-2.5-flash') -> Agent
         >>> agent = create_explanation_generator_agent()
         >>> # The agent will generate explanations based on student context and retrieved content
     """
+    config = config if config is not None else StageConfig.from_env(EXPLANATION_GENERATOR)
     agent = Agent(
         name='ExplanationGeneratorAgent',
-        model=model,
-        instruction=return_instructions_explanation_generator(),
+        **config.agent_kwargs(model),
+        instruction=explanation_generator_instruction,
         description=(
             'Generates age-appropriate, curriculum-aligned explanations based on '
             'retrieved textbook content and student context (board, grade, subject). '
             'Includes proper citations and tailors explanations to the student\'s grade level.'
         ),
-        output_key='final_explanation',  # Stores final explanation in state['final_explanation']
+        output_key=FINAL_EXPLANATION_KEY,  # Stores final explanation in state['final_explanation']
+        before_model_callback=(
+            create_history_compaction_callback(history_compactor) if history_compactor else None
+        ),
+        after_agent_callback=record_style_choice,
     )
     
     return agent
@@ -20,32 +20,301 @@ board, grade, and subject.
 
 The agent uses the Vertex AI RAG Retrieval tool to fetch textbook content and
 passes it to the explanation generator agent for synthesis.
+
+By default retrieval is done by a deterministic stage (DirectRagRetrievalAgent)
+that builds the "[board] [grade] [subject]: [question]" query itself and calls the
+RAG Engine directly. This avoids an LLM call that would only decide to call the
+tool and then re-type the retrieved chunks into its response. The retrieved
+chunks are packed into the generator model's context token budget (see
+rag/shared_libraries/context_packer.py) before they are passed on.
 """
 
-import os
+import asyncio
+import contextlib
+import contextvars
+import logging
+from collections.abc import AsyncGenerator, Iterator
 
-from google.adk.agents import Agent
-from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
-from vertexai.preview import rag
+from google.adk.agents import Agent, BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models import BaseLlm
+from google.genai import types
 
+from ..callbacks.history_compaction import create_history_compaction_callback
 from ..prompts.rag_retrieval_prompts import return_instructions_rag_retrieval
+from ..shared_libraries.constants import (
+    PENDING_QUESTION_KEY,
+    PENDING_STYLE_CHOICE_KEY,
+    RETRIEVED_CHUNKS_KEY,
+    RETRIEVED_CONTENT_KEY,
+    SESSION_CONTEXT_KEY,
+    STUDENT_CONTEXT_KEY,
+)
+from ..shared_libraries.context_packer import ContextPacker
+from ..shared_libraries.context_parser import ParsedStudentContext
+from ..shared_libraries.explanation_style import parse_style_reply
+from ..shared_libraries.history_compaction import HistoryCompactor
+from ..shared_libraries.stage_config import RAG_RETRIEVAL, StageConfig
+from ..shared_libraries.student_context import StudentContext
+from ..tools import TextbookRagRetrieval, create_textbook_retrieval_tool
+from .context_extractor_agent import get_user_query
+
+logger = logging.getLogger(__name__)
+
+# Chunks retrieved ahead of the current turn, as {'query', 'chunks'}; see
+# prefetched_retrieval().
+_prefetched: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    'prefetched_retrieval', default=None
+)
+
+
+@contextlib.contextmanager
+def prefetched_retrieval(query: str, chunks: list[dict]) -> Iterator[None]:
+    """Makes turns run inside the block use `chunks` when they retrieve `query`.
+
+    The chunks travel with the async context of the turn rather than in session
+    state, so they apply only to the turns run inside the block, whichever stage
+    answers them.
+
+    Example:
+        >>> with prefetched_retrieval(query, chunks):
+        ...     await stream_turn(runner, user_id, session_id, question, on_text)
+    """
+    token = _prefetched.set({'query': query, 'chunks': chunks})
+    try:
+        yield
+    finally:
+        _prefetched.reset(token)
+
+
+def get_student_context(state: dict) -> ParsedStudentContext:
+    """Returns the student context resolved by the Context Extractor Agent.
+
+    This is the StudentContext in state['student_context'], falling back to the
+    session's context when this turn's is incomplete and the session's is not.
+    """
+    context = StudentContext.from_state(state.get(STUDENT_CONTEXT_KEY))
+    if not context.is_complete:
+        session_context = StudentContext.from_state(state.get(SESSION_CONTEXT_KEY))
+        if session_context.is_complete:
+            context = session_context
+    return context.to_parsed()
+
+
+def describe_textbook(student_context: ParsedStudentContext) -> str:
+    """Returns the known parts of the student's textbook, e.g. "Grade 11 Physics"."""
+    return ' '.join(
+        value for value in (student_context.board, student_context.grade, student_context.subject) if value
+    )
+
+
+def build_retrieval_query(student_context: ParsedStudentContext, question: str) -> str:
+    """Builds the "[board] [grade] [subject]: [question]" retrieval query.
+
+    Parts of the context that are not known yet are left out.
+    """
+    textbook = describe_textbook(student_context)
+    return f'{textbook}: {question.strip()}' if textbook else question.strip()
+
+
+def _format_location(chunk: dict) -> str:
+    """Returns e.g. "Chapter 3 Light, 3.2 Reflection, pp. 41-42" for chunks with a location."""
+    parts = [chunk[key] for key in ('chapter', 'section') if chunk.get(key)]
+    start, end = chunk.get('page_start'), chunk.get('page_end')
+    if start is not None:
+        parts.append(f'p. {start}' if end in (None, start) else f'pp. {start}-{end}')
+    return ', '.join(parts)
+
+
+def _format_source(chunk: dict) -> str:
+    source = chunk.get('source_display_name') or chunk.get('source_uri') or 'Unknown source'
+    location = _format_location(chunk)
+    return f'{source} ({location})' if location else source
+
+
+def format_retrieved_chunks(
+    student_context: ParsedStudentContext,
+    chunks: list[dict],
+    omitted: list[dict] | None = None,
+) -> str:
+    """Formats retrieved chunks for the Explanation Generator Agent.
+
+    The output follows what the LLM retrieval agent used to produce: the chunk
+    text with its source, or "Answer not found in the textbook for ..." when
+    nothing was retrieved. The sources of `omitted` chunks, whose text did not
+    fit in the context budget, are listed after the chunks.
+    """
+    textbook = describe_textbook(student_context)
+    if not chunks:
+        return f'Answer not found in the textbook for {textbook}'
+
+    sections = [f'Retrieved content from the {textbook} textbook:']
+    for number, chunk in enumerate(chunks, start=1):
+        text = chunk['text'].strip() + (' [...]' if chunk.get('truncated') else '')
+        sections.append(f'[{number}] Source: {_format_source(chunk)}\n{text}')
+    if omitted:
+        sources = '\n'.join(
+            f'[{number}] Source: {_format_source(chunk)}'
+            for number, chunk in enumerate(omitted, start=len(chunks) + 1)
+        )
+        sections.append(f'Also relevant (text omitted for length):\n{sources}')
+    return '\n\n'.join(sections)
+
 
+class DirectRagRetrievalAgent(BaseAgent):
+    """Retrieves textbook content without an LLM.
 
-def create_rag_retrieval_agent(model: str = 'gemini-2.5-flash') -> Agent:
+    Reads the student context from state, builds the retrieval query from it and
+    the student's message, and calls the retrieval tool directly. The results are
+    stored in state:
+    - state['retrieved_content']: the chunks formatted as text, also emitted as
+      the agent's response so the Explanation Generator sees them in history.
+      With a context packer, only the chunks that fit its token budget are
+      included in full; the others are cited without their text.
+    - state['retrieved_chunks']: the raw chunks with their source metadata
+      (text, source_uri, source_display_name, distance, and chapter, section,
+      page_start and page_end when the backend knows them).
+
+    When the student context is incomplete, the corpus is searched with the
+    parts that are known (the Explanation Generator then asks the student for
+    the rest); with no context at all, retrieval is skipped. A message that only
+    completes the context is answered with the question asked before it
+    (state['pending_question']). When the message is the
+    student's reply to the generator's menu of explanation styles, the content
+    retrieved for the original question (state['pending_style_choice']) is
+    reused; it is already in the conversation history, so it is not emitted
+    again. Chunks retrieved ahead of the turn for the same query (see
+    prefetched_retrieval()) are used instead of retrieving again.
+    """
+
+    retrieval_tool: TextbookRagRetrieval
+    context_packer: ContextPacker | None = None
+
+    def __init__(
+        self,
+        retrieval_tool: TextbookRagRetrieval,
+        name: str = 'RagRetrievalAgent',
+        context_packer: ContextPacker | None = None,
+    ):
+        # pydantic validates the fields of the subclass, which mypy cannot see.
+        super().__init__(  # type: ignore[call-arg]
+            name=name,
+            description=(
+                'Retrieves relevant textbook content from the RAG corpus based on student context. '
+                'Builds a targeted query from the student\'s board, grade, and subject and calls '
+                'the RAG Engine directly, without an LLM.'
+            ),
+            retrieval_tool=retrieval_tool,
+            context_packer=context_packer,
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        student_context = get_student_context(ctx.session.state)
+        message = get_user_query(ctx)
+        # A message that only completes the context answers the question before it.
+        question = ctx.session.state.get(PENDING_QUESTION_KEY) or message
+        pending = ctx.session.state.get(PENDING_STYLE_CHOICE_KEY)
+        if pending and parse_style_reply(message):
+            logger.info('Style reply: reusing the content retrieved for %r', pending['question'])
+            yield self._create_event(
+                ctx,
+                state_delta={
+                    RETRIEVED_CONTENT_KEY: pending['retrieved_content'],
+                    RETRIEVED_CHUNKS_KEY: pending['retrieved_chunks'],
+                },
+            )
+            return
+
+        if not describe_textbook(student_context) or not question.strip():
+            logger.info('Skipping retrieval: no student context')
+            yield self._create_event(
+                ctx, state_delta={RETRIEVED_CONTENT_KEY: '', RETRIEVED_CHUNKS_KEY: []}
+            )
+            return
+
+        query = build_retrieval_query(student_context, question)
+        prefetched = _prefetched.get()
+        if prefetched and prefetched['query'] == query:
+            chunks = prefetched['chunks']
+        else:
+            chunks = await asyncio.to_thread(self.retrieval_tool.retrieve, query, student_context)
+        if self.context_packer is not None:
+            packed = self.context_packer.pack(chunks)
+            retrieved_content = format_retrieved_chunks(student_context, packed.chunks, packed.omitted)
+            logger.debug(
+                'Packed %d of %d chunk(s) into ~%d tokens', len(packed.chunks), len(chunks), packed.tokens
+            )
+        else:
+            retrieved_content = format_retrieved_chunks(student_context, chunks)
+        yield self._create_event(
+            ctx,
+            content=types.Content(role='model', parts=[types.Part(text=retrieved_content)]),
+            state_delta={
+                RETRIEVED_CONTENT_KEY: retrieved_content,
+                RETRIEVED_CHUNKS_KEY: chunks,
+            },
+        )
+
+    def _create_event(
+        self,
+        ctx: InvocationContext,
+        state_delta: dict,
+        content: types.Content | None = None,
+    ) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def create_rag_retrieval_agent(
+    model: str | BaseLlm = 'gemini-2.5-flash',
+    use_direct_retrieval: bool = True,
+    retrieval_tool: TextbookRagRetrieval | None = None,
+    context_packer: ContextPacker | None = None,
+    config: StageConfig | None = None,
+    history_compactor: HistoryCompactor | None = None,
+) -> BaseAgent:
     """Creates and returns a RAG Retrieval Agent.
     
     The RAG Retrieval Agent uses the Vertex AI RAG Retrieval tool to fetch relevant
     textbook content from the corpus. It reads the student context (board, grade, subject)
     from the previous agent's output and uses it to construct targeted retrieval queries.
+
+    By default this is a DirectRagRetrievalAgent, which calls the tool without an
+    LLM and also stores the raw chunks in state['retrieved_chunks']. Set
+    use_direct_retrieval=False for the LLM-driven agent.
     
     Args:
-        model: The model name to use for the agent. Defaults to 'gemini-2.5-flash'.
+        model: The model (name or BaseLlm instance) to use for the agent. Defaults to
+            'gemini-2.5-flash'. With direct retrieval, it only sets the default
+            context budget, since the generator uses the same model.
+        use_direct_retrieval: Whether to retrieve without an LLM. Defaults to True.
+        retrieval_tool: The retrieval tool to use. Defaults to the textbook
+            retrieval tool configured by RETRIEVAL_BACKEND and RAG_CORPUS (see
+            create_textbook_retrieval_tool).
+        context_packer: Fits the retrieved chunks into the generator's context
+            budget. Defaults to the budget of `model` (see
+            context_packer.token_budget_for). Only used with direct retrieval.
+        config: Model and generation settings of the LLM-driven agent,
+            overriding `model`. Defaults to the RAG_RETRIEVAL_* environment
+            variables (see rag/shared_libraries/stage_config.py).
+        history_compactor: Compacts the conversation history in the LLM-driven
+            agent's model requests once it is long. Only used without direct
+            retrieval.
     
     Returns:
-        Agent: A configured RAG Retrieval Agent instance with the retrieval tool.
+        BaseAgent: A configured RAG Retrieval Agent instance with the retrieval tool.
     
     Raises:
-        ValueError: If RAG_CORPUS environment variable is not set.
+        ValueError: If no retrieval tool is given and none is configured, i.e. the
+            RAG_CORPUS environment variable is not set for the Vertex AI backend.
     
     Example:
         >>> agent = create_rag_retrieval_agent()
@@ -53,52 +322,37 @@ def create_rag_retrieval_agent(model: str = 'gemini-2.5-flash') -> Agent:
     """
     # Build tools list based on RAG_CORPUS availability
     tools = []
-    rag_corpus = os.environ.get("RAG_CORPUS")
-    
-    if not rag_corpus:
+    # Create the RAG retrieval tool (cached when RETRIEVAL_CACHE_ENABLED is set,
+    # searching a local index when RETRIEVAL_BACKEND=local)
+    ask_vertex_retrieval = retrieval_tool or create_textbook_retrieval_tool()
+
+    if ask_vertex_retrieval is None:
         raise ValueError(
             "RAG_CORPUS environment variable is not set. "
             "Please set RAG_CORPUS in your .env file."
         )
-    
-    # Create the RAG retrieval tool
-    ask_vertex_retrieval = VertexAiRagRetrieval(
-        name='retrieve_student_textbook_content',
-        description=(
-            'Use this tool to retrieve relevant content from student textbooks in the RAG corpus. '
-            'The corpus contains PDFs organized by education board, grade level, and subject. '
-            'When calling this tool, include the student\'s education board, grade, and subject in the query string '
-            'to make retrieval more targeted and efficient. '
-            'Format your query as: "[board] [grade] [subject]: [student question]" '
-            'Example: "CBSE Grade 10 Science: What is photosynthesis?" '
-            'This ensures semantic search retrieves content primarily from the correct textbook, '
-            'reducing irrelevant results and improving efficiency. '
-            'After retrieval, filter the results to use only chunks from files matching the student\'s '
-            'board, grade, and subject (check the file display_name or title in the retrieved chunks).'
-        ),
-        rag_resources=[
-            rag.RagResource(
-                # RAG corpus containing student textbooks organized by board, grade, and subject
-                # e.g. projects/123/locations/us-central1/ragCorpora/456
-                rag_corpus=rag_corpus
-            )
-        ],
-        similarity_top_k=5,  # Reduced from 10 since queries are more targeted with context
-        vector_distance_threshold=0.6,
-    )
+    if use_direct_retrieval:
+        return DirectRagRetrievalAgent(
+            retrieval_tool=ask_vertex_retrieval,
+            context_packer=context_packer or ContextPacker.for_model(model),
+        )
     tools.append(ask_vertex_retrieval)
-    
+
+    config = config if config is not None else StageConfig.from_env(RAG_RETRIEVAL)
     agent = Agent(
         name='RagRetrievalAgent',
-        model=model,
+        **config.agent_kwargs(model),
         instruction=return_instructions_rag_retrieval(),
         description=(
             'Retrieves relevant textbook content from the RAG corpus based on student context. '
             'Uses the student\'s board, grade, and subject to construct targeted retrieval queries.'
         ),
         tools=tools,
-        output_key='retrieved_content',  # Stores retrieved content in state['retrieved_content']
+        before_model_callback=(
+            create_history_compaction_callback(history_compactor) if history_compactor else None
+        ),
+        output_key=RETRIEVED_CONTENT_KEY,  # Stores retrieved content in state['retrieved_content']
     )
-    
+
     return agent
 
@@ -0,0 +1,301 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Batch entry point for answering many questions at once.
+
+Classroom modes submit dozens of questions together, usually for the same board,
+grade and subject. run_batch() answers them with one runner of the explanation
+agent and shares the work that the questions have in common:
+
+- Each question's student context is resolved up front, as the Context
+  Extractor would resolve it, and the questions are grouped by it. Every
+  distinct retrieval query in a group is retrieved once; the chunks are passed
+  to each turn that needs them (see prefetched_retrieval()), so the retrieval
+  stage does not run the same search again.
+- Identical self-contained questions (the same topic, context and explanation
+  style, as keyed by the semantic answer cache) are generated once. The other
+  sessions get the question and the shared answer appended to their history,
+  provided the answer was generated from retrieved content.
+- The turns run concurrently, at most `max_concurrency` at a time. Turns of the
+  same session run one after another, in the order they were submitted.
+
+Results are yielded per item as they finish.
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import logging
+from collections.abc import AsyncGenerator, Iterable
+
+from google.adk.runners import Runner
+
+from .agents import ContextExtractorAgent, DirectRagRetrievalAgent
+from .agents.rag_retrieval_agent import build_retrieval_query, prefetched_retrieval
+from .callbacks.answer_cache import answer_cache_key, answer_is_grounded
+from .shared_libraries.constants import PENDING_STYLE_CHOICE_KEY
+from .shared_libraries.context_parser import DEFAULT_CONFIDENCE_THRESHOLD
+from .shared_libraries.explanation_style import parse_style_reply
+from .shared_libraries.intent_classifier import ACADEMIC, classify_intent
+from .shared_libraries.metrics import Metrics, get_metrics
+from .shared_libraries.shared_turns import (
+    find_sub_agent,
+    resolve_student_context,
+    shared_answer_state,
+)
+from .shared_libraries.streaming import (
+    DEFAULT_ANSWER_AUTHORS,
+    TurnTimings,
+    append_turn,
+    stream_turn,
+)
+from .shared_libraries.student_context import StudentContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchItem:
+    """One question of a batch, asked in an existing session."""
+
+    session_id: str
+    question: str
+    user_id: str = 'student'
+
+
+@dataclasses.dataclass
+class BatchResult:
+    """The outcome of one batch item.
+
+    Attributes:
+        index: Position of the item in the batch.
+        item: The item.
+        explanation: The answer text, or None if the turn failed.
+        error: The exception the turn failed with, if any.
+        student_context: The context the item was grouped under, if it could be
+            resolved before the turn.
+        shared: Whether the answer was generated for an identical question
+            elsewhere in the batch.
+        timings: Latency breakdown of the turn; None for shared answers.
+    """
+
+    index: int
+    item: BatchItem
+    explanation: str | None = None
+    error: BaseException | None = None
+    student_context: StudentContext | None = None
+    shared: bool = False
+    timings: TurnTimings | None = None
+
+
+@dataclasses.dataclass
+class _Plan:
+    index: int
+    item: BatchItem
+    student_context: StudentContext | None = None
+    retrieval_query: str | None = None
+    answer_key: tuple | None = None
+    leader: int | None = None
+
+
+async def run_batch(
+    runner: Runner,
+    items: Iterable[BatchItem],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    share_answers: bool = True,
+    metrics: Metrics | None = None,
+) -> AsyncGenerator[BatchResult, None]:
+    """Answers a batch of questions, sharing retrieval and generation between them.
+
+    Args:
+        runner: The runner of the explanation agent. The sessions of the items
+            must already exist in its session service.
+        items: The questions, each with the session it is asked in.
+        max_concurrency: Maximum number of turns (and of prefetch retrievals)
+            running at the same time.
+        share_answers: Whether identical self-contained questions are generated
+            once. Defaults to True.
+        metrics: Where to count the items by outcome (rag_batch_items_total) and
+            the retrievals saved (rag_batch_shared_retrievals_total). Defaults to
+            the process-wide recorder configured by METRICS_EXPORTER.
+
+    Yields:
+        BatchResult: The result of each item, in the order they finish. A failed
+        turn is reported in its result and does not stop the batch.
+
+    Example:
+        >>> runner = InMemoryRunner(create_explanation_agent(), app_name='classroom')
+        >>> items = [BatchItem(session.id, question) for session, question in worksheet]
+        >>> async for result in run_batch(runner, items):
+        ...     print(result.index, result.explanation)
+    """
+    if max_concurrency <= 0:
+        raise ValueError('max_concurrency must be positive')
+    metrics = metrics if metrics is not None else get_metrics()
+    items = list(items)
+    if not items:
+        return
+
+    extractor = find_sub_agent(runner.agent, ContextExtractorAgent)
+    threshold = extractor.confidence_threshold if extractor else DEFAULT_CONFIDENCE_THRESHOLD
+    retrieval_agent = find_sub_agent(runner.agent, DirectRagRetrievalAgent)
+
+    states = {}
+    for item in items:
+        if (item.user_id, item.session_id) not in states:
+            session = await runner.session_service.get_session(
+                app_name=runner.app_name, user_id=item.user_id, session_id=item.session_id
+            )
+            if session is None:
+                raise ValueError(f'Session not found: {item.session_id}')
+            states[item.user_id, item.session_id] = session.state
+
+    plans = []
+    leaders: dict[tuple, int] = {}
+    for index, item in enumerate(items):
+        plan = _Plan(index, item)
+        plans.append(plan)
+        state = states[item.user_id, item.session_id]
+        if state.get(PENDING_STYLE_CHOICE_KEY) and parse_style_reply(item.question):
+            continue  # Answered from the content retrieved for the menu.
+        if classify_intent(item.question) != ACADEMIC:
+            continue
+        plan.student_context = resolve_student_context(item.question, state, threshold)
+        if plan.student_context is None or not plan.student_context.is_complete:
+            continue
+        if retrieval_agent is not None:
+            plan.retrieval_query = build_retrieval_query(plan.student_context.to_parsed(), item.question)
+        if share_answers:
+            plan.answer_key = answer_cache_key(item.question, plan.student_context.to_parsed())
+            if plan.answer_key is not None:
+                plan.leader = leaders.setdefault(plan.answer_key, index)
+
+    groups: dict[str, list[int]] = {}
+    for plan in plans:
+        if plan.student_context is not None:
+            groups.setdefault(plan.student_context.textbook, []).append(plan.index)
+    logger.info('Batch of %d question(s) in %d textbook group(s)', len(items), len(groups))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    prefetches: dict[str, asyncio.Task] = {}
+    answers = {index: asyncio.get_running_loop().create_future() for index in set(leaders.values())}
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def retrieve(query: str, student_context: StudentContext) -> list[dict]:
+        assert retrieval_agent is not None  # Queries are only planned with one.
+        async with semaphore:
+            return await asyncio.to_thread(
+                retrieval_agent.retrieval_tool.retrieve, query, student_context.to_parsed()
+            )
+
+    def prefetch(plan: _Plan) -> asyncio.Task | None:
+        query, student_context = plan.retrieval_query, plan.student_context
+        if query is None or student_context is None or (plan.leader is not None and plan.leader != plan.index):
+            return None
+        if query in prefetches:
+            metrics.increment('rag_batch_shared_retrievals_total')
+        else:
+            prefetches[query] = asyncio.create_task(retrieve(query, student_context))
+        return prefetches[query]
+
+    async def run_turn(plan: _Plan, task: asyncio.Task | None) -> BatchResult:
+        prefetched: contextlib.AbstractContextManager[None] = contextlib.nullcontext()
+        if task is not None and plan.retrieval_query is not None:
+            try:
+                prefetched = prefetched_retrieval(plan.retrieval_query, await task)
+            except Exception as e:
+                logger.warning('Prefetching retrieval for %r failed: %s', plan.retrieval_query, e)
+        pieces: list[str] = []
+        async with semaphore:
+            with prefetched:
+                timings = await stream_turn(
+                    runner,
+                    plan.item.user_id,
+                    plan.item.session_id,
+                    plan.item.question,
+                    pieces.append,
+                    answer_authors=(*DEFAULT_ANSWER_AUTHORS, runner.agent.name),
+                )
+        return BatchResult(
+            plan.index,
+            plan.item,
+            explanation=''.join(pieces),
+            student_context=plan.student_context,
+            timings=timings,
+        )
+
+    async def share_answer(plan: _Plan, student_context: StudentContext, explanation: str) -> BatchResult:
+        await append_turn(
+            runner,
+            plan.item.user_id,
+            plan.item.session_id,
+            plan.item.question,
+            explanation,
+            state_delta=shared_answer_state(student_context, explanation),
+        )
+        return BatchResult(
+            plan.index, plan.item, explanation=explanation, student_context=student_context, shared=True
+        )
+
+    async def answer(plan: _Plan, task: asyncio.Task | None) -> BatchResult:
+        if plan.leader is not None and plan.leader != plan.index:
+            try:
+                explanation = await asyncio.shield(answers[plan.leader])
+            except Exception:
+                explanation = None  # The leader failed; answer this one on its own.
+            if explanation and plan.student_context is not None:
+                return await share_answer(plan, plan.student_context, explanation)
+            task = prefetch(dataclasses.replace(plan, leader=None))
+        result = await run_turn(plan, task)
+        if plan.index in answers:
+            answers[plan.index].set_result(result.explanation if await is_grounded(plan) else None)
+        return result
+
+    async def is_grounded(plan: _Plan) -> bool:
+        # Only answers generated from retrieved content are shared, as with the
+        # semantic answer cache.
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=plan.item.user_id, session_id=plan.item.session_id
+        )
+        return session is not None and answer_is_grounded(session.state)
+
+    async def run_session(session_plans: list[_Plan]) -> None:
+        # Each turn's prefetch starts right away; the turns wait for their session.
+        tasks = [prefetch(plan) for plan in session_plans]
+        for plan, task in zip(session_plans, tasks, strict=True):
+            try:
+                result = await answer(plan, task)
+                metrics.increment('rag_batch_items_total', result='shared' if result.shared else 'generated')
+            except Exception as e:
+                logger.exception('Batch item %d failed', plan.index)
+                if plan.index in answers and not answers[plan.index].done():
+                    answers[plan.index].set_exception(e)
+                    answers[plan.index].exception()  # Marks the exception as retrieved.
+                result = BatchResult(plan.index, plan.item, error=e, student_context=plan.student_context)
+                metrics.increment('rag_batch_items_total', result='error')
+            await results.put(result)
+
+    sessions: dict[tuple[str, str], list[_Plan]] = {}
+    for plan in plans:
+        sessions.setdefault((plan.item.user_id, plan.item.session_id), []).append(plan)
+    workers = [asyncio.create_task(run_session(session_plans)) for session_plans in sessions.values()]
+    try:
+        for _ in range(len(plans)):
+            yield await results.get()
+    finally:
+        for task in (*workers, *prefetches.values()):
+            task.cancel()
+        await asyncio.gather(*workers, *prefetches.values(), return_exceptions=True)
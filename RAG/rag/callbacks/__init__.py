@@ -0,0 +1,37 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Agent callbacks and plugins used by the sequential explanation workflow."""
+
+from .answer_cache import (
+    answer_cache_key,
+    answer_is_grounded,
+    create_answer_cache_callbacks,
+    get_question,
+)
+from .history_compaction import create_history_compaction_callback
+from .intent_gate import create_intent_gate_callback
+from .metrics_plugin import MetricsPlugin
+from .style_choice import record_style_choice
+
+__all__ = [
+    'MetricsPlugin',
+    'answer_cache_key',
+    'answer_is_grounded',
+    'create_answer_cache_callbacks',
+    'create_history_compaction_callback',
+    'create_intent_gate_callback',
+    'get_question',
+    'record_style_choice',
+]
@@ -0,0 +1,167 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Semantic answer cache in front of the explanation workflow.
+
+The before-agent callback looks the student's question up in a SemanticCache
+before any stage runs; on a hit the cached explanation is returned and context
+extraction, retrieval and generation are all skipped. The after-agent callback
+stores new explanations.
+
+Answers are partitioned by (board, grade, subject, explanation style), and
+questions are compared on what remains once those are removed. Only
+self-contained turns are cached: the message must name the student's context and
+an explanation style, so that follow-ups such as "explain that like a story",
+whose meaning depends on the conversation, are never answered from the cache.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.sessions.state import State
+from google.genai import types
+
+from ..shared_libraries.constants import (
+    FINAL_EXPLANATION_KEY,
+    PENDING_STYLE_CHOICE_KEY,
+    RETRIEVED_CHUNKS_KEY,
+    RETRIEVED_CONTENT_KEY,
+    SESSION_CONTEXT_KEY,
+    STUDENT_CONTEXT_KEY,
+)
+from ..shared_libraries.context_parser import (
+    ParsedStudentContext,
+    parse_student_context,
+    strip_student_context,
+)
+from ..shared_libraries.explanation_style import (
+    detect_explanation_style,
+    strip_explanation_style,
+)
+from ..shared_libraries.metrics import Metrics, get_metrics
+from ..shared_libraries.semantic_cache import Partition, SemanticCache
+from ..shared_libraries.student_context import StudentContext
+
+logger = logging.getLogger(__name__)
+
+AgentCallback = Callable[[CallbackContext], Awaitable[types.Content | None]]
+
+
+def get_question(callback_context: CallbackContext) -> str:
+    """Returns the text of the student's message for this turn."""
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return ''
+    return ''.join(part.text for part in content.parts if part.text)
+
+
+def answer_is_grounded(state: State | dict) -> bool:
+    """Whether this turn's explanation was generated from retrieved content."""
+    chunks = state.get(RETRIEVED_CHUNKS_KEY)
+    if chunks is not None:
+        return bool(chunks)
+    retrieved_content = state.get(RETRIEVED_CONTENT_KEY) or ''
+    return bool(retrieved_content) and 'Answer not found' not in retrieved_content
+
+
+def answer_cache_key(
+    question: str, student_context: ParsedStudentContext
+) -> tuple[str, Partition] | None:
+    """Returns the (topic, partition) to cache a turn under, or None.
+
+    The topic is the question without its board, grade, subject and style, which
+    are part of the partition instead; otherwise the shared boilerplate of "I'm
+    studying CBSE Grade 10 Science..." would make unrelated questions look alike.
+    The partition uses the canonical StudentContext values, so "Class 9" and
+    "Grade 9" share answers.
+    """
+    style = detect_explanation_style(question)
+    if style is None or not parse_student_context(question).mentions_context:
+        return None
+    if not student_context.is_confident():
+        return None
+    topic = strip_explanation_style(strip_student_context(question))
+    if not topic:
+        return None
+    canonical = StudentContext.from_parsed(student_context)
+    return topic, (canonical.board, canonical.grade, canonical.subject, style)
+
+
+def create_answer_cache_callbacks(
+    cache: SemanticCache,
+    metrics: Metrics | None = None,
+) -> tuple[AgentCallback, AgentCallback]:
+    """Creates the callbacks that put a semantic answer cache in front of an agent.
+
+    Args:
+        cache: The cache to serve and store explanations in.
+        metrics: Where to count cache hits and misses
+            (rag_answer_cache_lookups_total). Defaults to the process-wide recorder
+            configured by METRICS_EXPORTER.
+
+    Returns:
+        A (before_agent_callback, after_agent_callback) pair for the root
+        explanation agent.
+
+    Example:
+        >>> before, after = create_answer_cache_callbacks(SemanticCache())
+        >>> agent = SequentialAgent(..., before_agent_callback=before,
+        ...                         after_agent_callback=after)
+    """
+    metrics = metrics if metrics is not None else get_metrics()
+
+    async def serve_cached_answer(callback_context: CallbackContext) -> types.Content | None:
+        question = get_question(callback_context)
+        previous = ParsedStudentContext.from_dict(callback_context.state.get(SESSION_CONTEXT_KEY) or {})
+        student_context = parse_student_context(question).merged_onto(previous)
+        key = answer_cache_key(question, student_context)
+        if key is None:
+            return None
+
+        try:
+            explanation = await asyncio.to_thread(cache.get, *key)
+        except Exception as e:
+            logger.warning('Semantic cache lookup failed: %s', e)
+            return None
+        metrics.increment('rag_answer_cache_lookups_total', result='miss' if explanation is None else 'hit')
+        if explanation is None:
+            return None
+
+        resolved = StudentContext.from_parsed(student_context).to_state()
+        callback_context.state[STUDENT_CONTEXT_KEY] = resolved
+        callback_context.state[SESSION_CONTEXT_KEY] = resolved
+        callback_context.state[FINAL_EXPLANATION_KEY] = explanation
+        callback_context.state[PENDING_STYLE_CHOICE_KEY] = None
+        return types.Content(role='model', parts=[types.Part(text=explanation)])
+
+    async def store_answer(callback_context: CallbackContext) -> types.Content | None:
+        state = callback_context.state
+        explanation = state.get(FINAL_EXPLANATION_KEY)
+        if not explanation or not answer_is_grounded(state):
+            return None
+        question = get_question(callback_context)
+        student_context = ParsedStudentContext.from_dict(state.get(SESSION_CONTEXT_KEY) or {})
+        key = answer_cache_key(question, student_context)
+        if key is None:
+            return None
+
+        try:
+            await asyncio.to_thread(cache.put, *key, explanation)
+        except Exception as e:
+            logger.warning('Could not store the explanation in the semantic cache: %s', e)
+        return None
+
+    return serve_cached_answer, store_answer
@@ -0,0 +1,81 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Conversation history compaction for the LLM stages.
+
+The before-model callback compacts the history in each model request with a
+HistoryCompactor (see rag/shared_libraries/history_compaction.py): once the
+earlier turns exceed the token threshold, all but the last few are replaced by a
+running summary that starts with the student's context. The summary is kept in
+state['conversation_summary'], so later turns only summarize the turns that
+newly leave the window.
+"""
+
+from collections.abc import Awaitable, Callable
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+from ..shared_libraries.constants import CONVERSATION_SUMMARY_KEY, SESSION_CONTEXT_KEY
+from ..shared_libraries.history_compaction import HistoryCompactor
+from ..shared_libraries.metrics import Metrics, get_metrics
+from ..shared_libraries.student_context import StudentContext
+
+ModelCallback = Callable[[CallbackContext, LlmRequest], Awaitable[LlmResponse | None]]
+
+
+def create_history_compaction_callback(
+    compactor: HistoryCompactor,
+    metrics: Metrics | None = None,
+) -> ModelCallback:
+    """Creates the callback that compacts the conversation history of model requests.
+
+    Args:
+        compactor: Decides when and how to compact.
+        metrics: Where to count compactions (rag_history_compactions_total) and
+            the estimated input tokens they save (rag_history_tokens_removed), by
+            agent. Defaults to the process-wide recorder configured by
+            METRICS_EXPORTER.
+
+    Returns:
+        A before_model_callback for LLM agents that include the conversation
+        history.
+
+    Example:
+        >>> agent = Agent(..., before_model_callback=create_history_compaction_callback(
+        ...     HistoryCompactor(token_threshold=4000, keep_turns=2)))
+    """
+    metrics = metrics if metrics is not None else get_metrics()
+
+    async def compact_history(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        state = callback_context.state
+        compacted = compactor.compact(
+            llm_request.contents,
+            student_context=StudentContext.from_state(state.get(SESSION_CONTEXT_KEY)),
+            summary=state.get(CONVERSATION_SUMMARY_KEY),
+        )
+        if compacted is None:
+            return None
+
+        llm_request.contents = compacted.contents
+        if compacted.summary != state.get(CONVERSATION_SUMMARY_KEY):
+            state[CONVERSATION_SUMMARY_KEY] = compacted.summary
+        agent = callback_context.agent_name
+        metrics.increment('rag_history_compactions_total', agent=agent)
+        metrics.observe('rag_history_tokens_removed', compacted.tokens_removed, agent=agent)
+        return None
+
+    return compact_history
@@ -0,0 +1,60 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Intent gate in front of the explanation workflow.
+
+The before-agent callback classifies the student's message (see
+rag/shared_libraries/intent_classifier.py). Greetings, thanks, goodbyes and
+other small talk are answered with a short reply and no stage runs; academic
+questions go through context extraction, retrieval and generation as usual.
+"""
+
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from ..shared_libraries.constants import FINAL_EXPLANATION_KEY, SESSION_CONTEXT_KEY
+from ..shared_libraries.context_parser import ParsedStudentContext
+from ..shared_libraries.intent_classifier import ACADEMIC, classify_intent, short_reply
+from ..shared_libraries.metrics import Metrics, get_metrics
+from .answer_cache import AgentCallback, get_question
+
+
+def create_intent_gate_callback(metrics: Metrics | None = None) -> AgentCallback:
+    """Creates the callback that answers small talk without running the workflow.
+
+    Args:
+        metrics: Where to count messages by intent (rag_intent_total). Defaults to
+            the process-wide recorder configured by METRICS_EXPORTER.
+
+    Returns:
+        A before_agent_callback for the root explanation agent.
+
+    Example:
+        >>> agent = SequentialAgent(..., before_agent_callback=create_intent_gate_callback())
+    """
+    metrics = metrics if metrics is not None else get_metrics()
+
+    async def answer_small_talk(callback_context: CallbackContext) -> types.Content | None:
+        intent = classify_intent(get_question(callback_context))
+        metrics.increment('rag_intent_total', intent=intent)
+        if intent == ACADEMIC:
+            return None
+
+        student_context = ParsedStudentContext.from_dict(callback_context.state.get(SESSION_CONTEXT_KEY) or {})
+        reply = short_reply(intent, student_context)
+        callback_context.state[FINAL_EXPLANATION_KEY] = reply
+        return types.Content(role='model', parts=[types.Part(text=reply)])
+
+    return answer_small_talk
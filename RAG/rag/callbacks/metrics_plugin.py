@@ -0,0 +1,185 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""ADK plugin that records latency and token metrics for every agent, model call
+and tool call.
+
+Register it on the runner, e.g.:
+
+    runner = InMemoryRunner(agent=get_explanation_agent(), plugins=[MetricsPlugin()])
+
+Recorded metrics (see rag/shared_libraries/metrics.py for the exporters):
+- rag_invocation_duration_seconds: wall time of a whole turn
+- rag_agent_duration_seconds{agent}: wall time of each agent, including the
+  three stages of the explanation agent
+- rag_model_duration_seconds{agent, model}: wall time of each model call
+- rag_model_time_to_first_chunk_seconds{agent, model}: time until the first
+  response chunk of a model call, which differs from the duration when streaming
+- rag_model_input_tokens / rag_model_output_tokens{agent, model}: token usage
+- rag_tool_duration_seconds{agent, tool}: wall time of each tool call
+- rag_model_errors_total / rag_tool_errors_total: failed calls
+
+Retrieval duration, chunk counts and cache hits are recorded by the retrieval
+tool and the answer cache themselves.
+"""
+
+import threading
+import time
+from typing import Any
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from ..shared_libraries.metrics import Metrics, get_metrics
+
+
+class MetricsPlugin(BasePlugin):
+    """Records the duration of agents, model calls and tool calls, and token usage.
+
+    Args:
+        metrics: Where to record metrics. Defaults to the process-wide recorder
+            configured by METRICS_EXPORTER.
+        name: The name of the plugin.
+    """
+
+    def __init__(self, metrics: Metrics | None = None, name: str = 'metrics'):
+        super().__init__(name)
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self._clock = time.perf_counter
+        # (kind, invocation ID, agent name or function call ID) -> start time and
+        # labels of a running agent, model call or tool call.
+        self._started: dict[tuple[str, str, str], tuple[float, dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, key: tuple[str, str, str], **labels: str) -> None:
+        with self._lock:
+            self._started[key] = (self._clock(), labels)
+
+    def _elapsed(self, key: tuple[str, str, str], pop: bool = True) -> tuple[float, dict[str, str]] | None:
+        with self._lock:
+            started = self._started.pop(key, None) if pop else self._started.get(key)
+        if started is None:
+            return None
+        start, labels = started
+        return self._clock() - start, labels
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        self._start(('run', invocation_context.invocation_id, ''))
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        invocation_id = invocation_context.invocation_id
+        elapsed = self._elapsed(('run', invocation_id, ''))
+        if elapsed is not None:
+            self.metrics.observe('rag_invocation_duration_seconds', elapsed[0])
+        # Agents ended by a callback (e.g. a cached answer) never reach their
+        # after callbacks; forget them with the invocation.
+        with self._lock:
+            for key in [key for key in self._started if key[1] == invocation_id]:
+                del self._started[key]
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        self._start(('agent', callback_context.invocation_id, agent.name), agent=agent.name)
+        return None
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        elapsed = self._elapsed(('agent', callback_context.invocation_id, agent.name))
+        if elapsed is not None:
+            self.metrics.observe('rag_agent_duration_seconds', elapsed[0], **elapsed[1])
+        return None
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        self._start(
+            ('model', callback_context.invocation_id, callback_context.agent_name),
+            agent=callback_context.agent_name,
+            model=llm_request.model or '',
+        )
+        self._start(('first_chunk', callback_context.invocation_id, callback_context.agent_name))
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        invocation_id, agent_name = callback_context.invocation_id, callback_context.agent_name
+        model_key = ('model', invocation_id, agent_name)
+        first_chunk = self._elapsed(('first_chunk', invocation_id, agent_name))
+        if first_chunk is not None:
+            model = self._elapsed(model_key, pop=False)
+            labels = model[1] if model is not None else {'agent': agent_name}
+            self.metrics.observe('rag_model_time_to_first_chunk_seconds', first_chunk[0], **labels)
+
+        # When streaming, this is called for every chunk; the call ends with the
+        # first response that is not partial.
+        if llm_response.partial:
+            return None
+        elapsed = self._elapsed(model_key)
+        if elapsed is None:
+            return None
+        duration, labels = elapsed
+        self.metrics.observe('rag_model_duration_seconds', duration, **labels)
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            if usage.prompt_token_count is not None:
+                self.metrics.observe('rag_model_input_tokens', usage.prompt_token_count, **labels)
+            output_tokens = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+            self.metrics.observe('rag_model_output_tokens', output_tokens, **labels)
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> None:
+        invocation_id, agent_name = callback_context.invocation_id, callback_context.agent_name
+        self._elapsed(('first_chunk', invocation_id, agent_name))
+        elapsed = self._elapsed(('model', invocation_id, agent_name))
+        labels = elapsed[1] if elapsed is not None else {'agent': agent_name}
+        self.metrics.increment('rag_model_errors_total', 1, **labels)
+        return None
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext
+    ) -> None:
+        self._start(
+            ('tool', tool_context.invocation_id, tool_context.function_call_id or tool.name),
+            agent=tool_context.agent_name,
+            tool=tool.name,
+        )
+        return None
+
+    async def after_tool_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> None:
+        elapsed = self._elapsed(
+            ('tool', tool_context.invocation_id, tool_context.function_call_id or tool.name)
+        )
+        if elapsed is not None:
+            self.metrics.observe('rag_tool_duration_seconds', elapsed[0], **elapsed[1])
+        return None
+
+    async def on_tool_error_callback(
+        self, *, tool: BaseTool, tool_args: dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> None:
+        self._elapsed(('tool', tool_context.invocation_id, tool_context.function_call_id or tool.name))
+        self.metrics.increment('rag_tool_errors_total', agent=tool_context.agent_name, tool=tool.name)
+        return None
@@ -0,0 +1,66 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Remembers the retrieved content while the student picks an explanation style.
+
+When the student does not ask for a style, the Explanation Generator answers
+with a menu ("1. Explain like a story, 2. ...") instead of an explanation. The
+reply to it carries no new question, so there is nothing new to extract or
+retrieve. The after-agent callback of the generator records the turn's retrieved
+content in state['pending_style_choice'] when it offered the menu, and clears it
+otherwise; on the next turn DirectRagRetrievalAgent reuses that content for a
+style reply instead of retrieving with "1" as the query.
+"""
+
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+from ..shared_libraries.constants import (
+    FINAL_EXPLANATION_KEY,
+    PENDING_STYLE_CHOICE_KEY,
+    RETRIEVED_CHUNKS_KEY,
+    RETRIEVED_CONTENT_KEY,
+)
+from ..shared_libraries.explanation_style import (
+    asks_for_style,
+    detect_explanation_style,
+)
+from .answer_cache import get_question
+
+
+async def record_style_choice(callback_context: CallbackContext) -> types.Content | None:
+    """After-agent callback of the Explanation Generator.
+
+    Example:
+        >>> agent = Agent(name='ExplanationGeneratorAgent', ...,
+        ...               after_agent_callback=record_style_choice)
+    """
+    state = callback_context.state
+    question = get_question(callback_context)
+    retrieved_chunks = state.get(RETRIEVED_CHUNKS_KEY)
+    offered_menu = (
+        bool(retrieved_chunks)
+        and detect_explanation_style(question) is None
+        and asks_for_style(state.get(FINAL_EXPLANATION_KEY) or '')
+    )
+    if offered_menu:
+        state[PENDING_STYLE_CHOICE_KEY] = {
+            'question': question,
+            'retrieved_content': state.get(RETRIEVED_CONTENT_KEY) or '',
+            'retrieved_chunks': retrieved_chunks,
+        }
+    elif state.get(PENDING_STYLE_CHOICE_KEY) is not None:
+        state[PENDING_STYLE_CHOICE_KEY] = None
+    return None
@@ -0,0 +1,163 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Coalescing of identical questions asked at the same time.
+
+When a teacher projects a question and the class submits it within seconds,
+every copy would run the full pipeline. TurnCoalescer sits in front of the
+runner of the explanation agent and runs such turns once: the first one runs in
+its own session, and the identical ones that arrive while it is in flight share
+its answer stream (see rag/shared_libraries/single_flight.py). When the answer
+is complete, each of the other sessions gets the question and the shared answer
+appended to its history, so follow-ups work as usual.
+
+Turns are identical when they have the same key as in the semantic answer cache:
+the question without its context and style, plus the resolved board, grade,
+subject and explanation style. Only self-contained questions have such a key;
+everything else runs normally.
+"""
+
+import logging
+import time
+from collections.abc import AsyncGenerator, Callable
+
+from google.adk.runners import Runner
+
+from .agents import ContextExtractorAgent
+from .callbacks.answer_cache import answer_cache_key
+from .shared_libraries.context_parser import DEFAULT_CONFIDENCE_THRESHOLD
+from .shared_libraries.metrics import Metrics, get_metrics
+from .shared_libraries.shared_turns import (
+    find_sub_agent,
+    resolve_student_context,
+    shared_answer_state,
+)
+from .shared_libraries.single_flight import SingleFlight
+from .shared_libraries.streaming import (
+    DEFAULT_ANSWER_AUTHORS,
+    TurnTimings,
+    append_turn,
+    iter_turn,
+)
+from .shared_libraries.student_context import StudentContext
+
+logger = logging.getLogger(__name__)
+
+
+class TurnCoalescer:
+    """Runs identical concurrent turns of an explanation agent once.
+
+    Turns that cannot be coalesced, e.g. follow-ups or questions whose context
+    the Context Extractor would have to ask the LLM about, run as usual.
+
+    Args:
+        runner: The runner of the explanation agent.
+        metrics: Where to count coalesced turns (rag_coalesced_turns_total, by
+            role: "leader" for turns that ran, "follower" for turns that shared
+            an answer). Defaults to the process-wide recorder configured by
+            METRICS_EXPORTER.
+        clock: Returns the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        metrics: Metrics | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.runner = runner
+        self.metrics = metrics if metrics is not None else get_metrics()
+        self.answer_authors = (*DEFAULT_ANSWER_AUTHORS, runner.agent.name)
+        self.flights: SingleFlight[str | TurnTimings] = SingleFlight()
+        self._clock = clock
+        extractor = find_sub_agent(runner.agent, ContextExtractorAgent)
+        self._confidence_threshold = (
+            extractor.confidence_threshold if extractor is not None else DEFAULT_CONFIDENCE_THRESHOLD
+        )
+
+    async def coalescing_key(
+        self, user_id: str, session_id: str, message: str
+    ) -> tuple[tuple, StudentContext] | None:
+        """Returns the key identical turns share and the turn's context, or None."""
+        session = await self.runner.session_service.get_session(
+            app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            return None
+        student_context = resolve_student_context(message, session.state, self._confidence_threshold)
+        if student_context is None:
+            return None
+        key = answer_cache_key(message, student_context.to_parsed())
+        if key is None:
+            return None
+        return (self.runner.app_name, *key), student_context
+
+    async def iter_turn(
+        self, user_id: str, session_id: str, message: str
+    ) -> AsyncGenerator[str | TurnTimings, None]:
+        """Runs one turn, or joins an identical one in flight.
+
+        Yields the same items as streaming.iter_turn(): each piece of answer
+        text, and finally the turn's TurnTimings. Errors of a shared turn are
+        raised in every turn that joined it.
+        """
+        resolved = await self.coalescing_key(user_id, session_id, message)
+        if resolved is None:
+            async for item in iter_turn(
+                self.runner, user_id, session_id, message, answer_authors=self.answer_authors
+            ):
+                yield item
+            return
+
+        key, student_context = resolved
+        roles = []
+
+        def joined(started: bool) -> None:
+            role = 'leader' if started else 'follower'
+            roles.append(role)
+            self.metrics.increment('rag_coalesced_turns_total', role=role)
+            if not started:
+                logger.info('Session %s joined an identical turn in flight', session_id)
+
+        start = self._clock()
+        first_token = None
+        pieces = []
+        timings = None
+        async for item in self.flights.stream(
+            key,
+            lambda: iter_turn(self.runner, user_id, session_id, message, answer_authors=self.answer_authors),
+            on_join=joined,
+        ):
+            if isinstance(item, TurnTimings):
+                timings = item
+                continue
+            if first_token is None:
+                first_token = self._clock() - start
+            pieces.append(item)
+            yield item
+
+        if roles == ['follower']:
+            # The turn ran in the leader's session; record it in this one too.
+            answer = ''.join(pieces)
+            await append_turn(
+                self.runner,
+                user_id,
+                session_id,
+                message,
+                answer,
+                state_delta=shared_answer_state(student_context, answer),
+            )
+            total = self._clock() - start
+            timings = TurnTimings(total=total, time_to_first_token=first_token, stages={'coalesced': total})
+        yield timings
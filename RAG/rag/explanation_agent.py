@@ -24,20 +24,49 @@ The sequential workflow consists of:
 
 The SequentialAgent executes these sub-agents in a fixed order, passing data between
 them through shared state using output keys.
+
+Greetings, thanks and other small talk are answered with a short reply by an
+intent gate in front of the stages, so only academic questions run them.
+Optionally, a semantic answer cache in front of the stages returns a stored
+explanation for questions similar to one already answered for the same board,
+grade, subject and explanation style, without running any stage.
+
+In long sessions, the LLM stages see the earlier turns compacted into a running
+summary, keeping only the last few verbatim (see
+rag/shared_libraries/history_compaction.py).
 """
 
+import functools
+
 from google.adk.agents import SequentialAgent
+from google.adk.models import BaseLlm
 
 from .agents import (
     create_context_extractor_agent,
     create_explanation_generator_agent,
     create_rag_retrieval_agent,
 )
+from .callbacks import create_answer_cache_callbacks, create_intent_gate_callback
+from .shared_libraries.context_packer import ContextPacker
+from .shared_libraries.environment import configure_environment
+from .shared_libraries.history_compaction import HistoryCompactor, get_history_compactor
+from .shared_libraries.semantic_cache import SemanticCache, get_semantic_cache
+from .shared_libraries.stage_config import EXPLANATION_GENERATOR, StageConfig
+from .tools import TextbookRagRetrieval
 
 
 def create_explanation_agent(
-    model: str = 'gemini-2.5-flash',
+    model: str | BaseLlm = 'gemini-2.5-flash',
     name: str = 'explanation_agent',
+    use_direct_retrieval: bool = True,
+    use_context_fast_path: bool = True,
+    answer_cache: SemanticCache | None = None,
+    retrieval_tool: TextbookRagRetrieval | None = None,
+    use_intent_gate: bool = True,
+    context_extractor_config: StageConfig | None = None,
+    rag_retrieval_config: StageConfig | None = None,
+    explanation_generator_config: StageConfig | None = None,
+    history_compactor: HistoryCompactor | None = None,
 ) -> SequentialAgent:
     """Creates and returns a Sequential Explanation Agent.
     
@@ -47,12 +76,17 @@ def create_explanation_agent(
        - Education Board (e.g., CBSE, ICSE, State Board, IB, etc.)
        - Grade Level (e.g., Grade 10, Class 9, etc.)
        - Subject (e.g., Mathematics, Science, English, etc.)
-       Stores this in state['student_context']
+       Explicit mentions are parsed without an LLM call; the model is only used
+       when the rule-based parser is not confident.
+       Stores the validated StudentContext (canonical board, grade, subject and
+       term) in state['student_context']
     
     2. **RAG Retrieval Agent**: Uses the extracted context to retrieve relevant
        textbook content from the RAG corpus. Constructs targeted queries like:
        "CBSE Grade 10 Science: What is photosynthesis?"
-       Stores retrieved content in state['retrieved_content']
+       By default the query is built and run without an LLM call.
+       Stores retrieved content in state['retrieved_content'] and the raw chunks
+       with their sources in state['retrieved_chunks']
     
     3. **Explanation Generator Agent**: Synthesizes the retrieved content into
        clear, age-appropriate explanations tailored to the student's grade level.
@@ -61,10 +95,42 @@ def create_explanation_agent(
     The SequentialAgent ensures these agents execute in the specified order and
     share the same InvocationContext, allowing data to be passed between stages
     through the shared state.
+
+    Messages classified as small talk (greetings, thanks, goodbyes) are answered
+    with a short reply before any stage runs.
+
+    When an answer cache is configured, a question that names the student's
+    context and an explanation style is first looked up in it, and a cached
+    explanation for a similar question is returned before any stage runs.
     
     Args:
-        model: The model name to use for all sub-agents. Defaults to 'gemini-2.5-flash'.
+        model: The model (name or BaseLlm instance) of the sub-agents whose
+            stage config does not name one. Defaults to 'gemini-2.5-flash'.
         name: The name of the sequential agent. Defaults to 'explanation_agent'.
+        use_direct_retrieval: Whether the retrieval stage calls the RAG Engine
+            directly instead of through an LLM agent. Defaults to True.
+        use_context_fast_path: Whether the context extractor tries the rule-based
+            parser and the session context before calling the LLM. Defaults to
+            True.
+        answer_cache: Semantic cache for explanations. Defaults to the
+            process-wide cache configured by the SEMANTIC_CACHE_* environment
+            variables, which is disabled unless SEMANTIC_CACHE_ENABLED is set.
+        retrieval_tool: The retrieval tool of the RAG Retrieval stage. Defaults to
+            the textbook retrieval tool for the RAG_CORPUS corpus.
+        use_intent_gate: Whether to answer small talk without running the
+            stages. Defaults to True.
+        context_extractor_config: Model, max output tokens, temperature and
+            thinking budget of the Context Extractor. Defaults to the
+            CONTEXT_EXTRACTOR_* environment variables.
+        rag_retrieval_config: The same for the LLM-driven RAG Retrieval agent
+            (RAG_RETRIEVAL_*).
+        explanation_generator_config: The same for the Explanation Generator
+            (EXPLANATION_GENERATOR_*).
+        history_compactor: Compacts the conversation history the LLM stages
+            see once the earlier turns exceed a token threshold. Defaults to the
+            compactor configured by the HISTORY_COMPACTION_* environment
+            variables, which is enabled unless HISTORY_COMPACTION_ENABLED is
+            "false".
     
     Returns:
         SequentialAgent: A configured Sequential Explanation Agent instance.
@@ -80,11 +146,40 @@ def create_explanation_agent(
         The RAG agent is specifically designed for retrieving information from
         textbooks in the corpus, not for general knowledge queries.
     """
+    configure_environment()
+
     # Create sub-agents in the order they will execute
-    context_extractor = create_context_extractor_agent(model=model)
-    rag_retrieval = create_rag_retrieval_agent(model=model)
-    explanation_generator = create_explanation_generator_agent(model=model)
+    if explanation_generator_config is None:
+        explanation_generator_config = StageConfig.from_env(EXPLANATION_GENERATOR)
+    history_compactor = history_compactor if history_compactor is not None else get_history_compactor()
+    context_extractor = create_context_extractor_agent(
+        model=model,
+        use_fast_path=use_context_fast_path,
+        config=context_extractor_config,
+        history_compactor=history_compactor,
+    )
+    rag_retrieval = create_rag_retrieval_agent(
+        model=model,
+        use_direct_retrieval=use_direct_retrieval,
+        retrieval_tool=retrieval_tool,
+        # The retrieved content is sized for the generator's model.
+        context_packer=ContextPacker.for_model(explanation_generator_config.resolve_model(model)),
+        config=rag_retrieval_config,
+        history_compactor=history_compactor,
+    )
+    explanation_generator = create_explanation_generator_agent(
+        model=model, config=explanation_generator_config, history_compactor=history_compactor
+    )
     
+    before_callbacks, after_callbacks = [], []
+    if use_intent_gate:
+        before_callbacks.append(create_intent_gate_callback())
+    answer_cache = answer_cache if answer_cache is not None else get_semantic_cache()
+    if answer_cache is not None:
+        serve_cached_answer, store_answer = create_answer_cache_callbacks(answer_cache)
+        before_callbacks.append(serve_cached_answer)
+        after_callbacks.append(store_answer)
+
     # Create the sequential agent with sub-agents in execution order
     sequential_agent = SequentialAgent(
         name=name,
@@ -98,11 +193,24 @@ def create_explanation_agent(
             rag_retrieval,
             explanation_generator,
         ],
+        # Unpacked so the lists take the wider callback type ADK expects.
+        before_agent_callback=[*before_callbacks] or None,
+        after_agent_callback=[*after_callbacks] or None,
     )
     
     return sequential_agent
 
 
-# Create the default explanation agent instance
-explanation_agent = create_explanation_agent()
+@functools.cache
+def get_explanation_agent() -> SequentialAgent:
+    """Returns the default explanation agent, building it on first use."""
+    return create_explanation_agent()
+
+
+def __getattr__(name: str) -> SequentialAgent:
+    # The default `explanation_agent` instance is built on first access rather
+    # than at import, so importing this module stays cheap.
+    if name == 'explanation_agent':
+        return get_explanation_agent()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
@@ -0,0 +1,405 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local HTTP gateway that streams agent answers as server-sent events.
+
+Game and classroom clients otherwise call Agent Engine directly, and each
+question costs them an access token fetch, a session creation request and a
+parse of the raw event stream before any agent work starts. The gateway keeps
+that work in one long-lived process instead:
+
+- One ADK runner per agent (root_agent as "rag", explanation_agent as
+  "explanation_agent"), built once at startup. The model clients, with their
+  cached credentials and pooled HTTP connections, are created then and reused by
+  every request.
+- A pool of sessions created ahead of time for each agent, so starting a
+  conversation does not wait for the session service.
+- Server-sent events carrying only the text of the final answer; context
+  extraction and retrieval output stay inside the gateway.
+- Identical questions asked at the same time, e.g. by a class answering the
+  question on the board, run once and share the answer stream.
+
+Endpoints:
+    GET  /healthz                  The agents served.
+    POST /apps/{app}/sessions      A new session: {"session_id": ...}.
+    POST /apps/{app}/stream        {"message": ..., "session_id": optional}. Streams
+                                   a "session" event with the session ID, "text"
+                                   events with answer text, then "done" with the
+                                   turn's timings, or "error".
+
+Sessions belong to the gateway's own user ID, so the gateway should only be
+reachable by trusted clients. Run it with:
+
+    python -m rag.gateway --port 8080
+"""
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import json
+import logging
+from collections.abc import AsyncGenerator, Mapping
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService, InMemorySessionService
+from pydantic import BaseModel, Field
+
+from .agents import ContextExtractorAgent
+from .callbacks import MetricsPlugin
+from .coalescing import TurnCoalescer
+from .shared_libraries.metrics import get_metrics
+from .shared_libraries.shared_turns import find_sub_agent
+from .shared_libraries.streaming import DEFAULT_ANSWER_AUTHORS, TurnTimings, iter_turn
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_USER_ID = 'gateway'
+DEFAULT_SESSION_POOL_SIZE = 16
+# Seconds to wait before retrying after the session service failed.
+_POOL_RETRY_SECONDS = 5.0
+
+
+class SessionPool:
+    """Sessions created ahead of time, handed out one per new conversation.
+
+    A background task keeps `size` sessions ready; when the pool is empty,
+    acquire() creates a session directly.
+
+    Args:
+        session_service: Where sessions are created.
+        app_name: The app the sessions belong to.
+        user_id: The user the sessions belong to.
+        size: Number of sessions kept ready.
+    """
+
+    def __init__(
+        self,
+        session_service: BaseSessionService,
+        app_name: str,
+        user_id: str = GATEWAY_USER_ID,
+        size: int = DEFAULT_SESSION_POOL_SIZE,
+    ):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.user_id = user_id
+        self.size = size
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._wanted = asyncio.Event()
+        self._refill_task: asyncio.Task | None = None
+
+    @property
+    def available(self) -> int:
+        """Number of sessions ready to be handed out."""
+        return self._ready.qsize()
+
+    async def start(self) -> None:
+        """Fills the pool and starts keeping it filled."""
+        if self._refill_task is None and self.size > 0:
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def close(self) -> None:
+        """Stops refilling the pool."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._refill_task
+            self._refill_task = None
+
+    async def acquire(self) -> str:
+        """Returns the ID of a new, unused session."""
+        try:
+            session_id = self._ready.get_nowait()
+        except asyncio.QueueEmpty:
+            session_id = await self._create()
+        self._wanted.set()
+        return session_id
+
+    async def _create(self) -> str:
+        session = await self.session_service.create_session(app_name=self.app_name, user_id=self.user_id)
+        return session.id
+
+    async def _refill(self) -> None:
+        while True:
+            self._wanted.clear()
+            try:
+                while self._ready.qsize() < self.size:
+                    self._ready.put_nowait(await self._create())
+            except Exception as e:
+                logger.warning('Could not pre-create a %s session: %s', self.app_name, e)
+                await asyncio.sleep(_POOL_RETRY_SECONDS)
+                continue
+            await self._wanted.wait()
+
+
+class UnknownAppError(KeyError):
+    """Raised for an app name the gateway does not serve."""
+
+
+class UnknownSessionError(KeyError):
+    """Raised for a session ID that does not exist."""
+
+
+@dataclasses.dataclass(frozen=True)
+class ServerSentEvent:
+    """One server-sent event: an event name and a JSON payload."""
+
+    event: str
+    data: dict
+
+    def encode(self) -> str:
+        return f'event: {self.event}\ndata: {json.dumps(self.data)}\n\n'
+
+
+def _warm_up(agent: BaseAgent) -> None:
+    """Creates the model clients of `agent` and its sub-agents ahead of the first request."""
+    if isinstance(agent, LlmAgent):
+        with contextlib.suppress(Exception):
+            getattr(agent.canonical_model, 'api_client', None)
+    for sub_agent in agent.sub_agents:
+        _warm_up(sub_agent)
+
+
+class AgentGateway:
+    """Runners, session pools and answer streaming for the agents behind the gateway.
+
+    Args:
+        agents: The agents to serve, by app name.
+        session_service: Where sessions are kept. Defaults to in memory.
+        session_pool_size: Sessions kept ready per agent.
+        user_id: The user ID of the gateway's sessions.
+        coalesce: Whether identical questions asked at the same time in different
+            sessions share one run of the agent (see rag/coalescing.py). Only
+            applies to agents with a Context Extractor.
+    """
+
+    def __init__(
+        self,
+        agents: Mapping[str, BaseAgent],
+        session_service: BaseSessionService | None = None,
+        session_pool_size: int = DEFAULT_SESSION_POOL_SIZE,
+        user_id: str = GATEWAY_USER_ID,
+        coalesce: bool = True,
+    ):
+        self.session_service = session_service or InMemorySessionService()
+        self.user_id = user_id
+        self.runners = {
+            app_name: Runner(
+                app_name=app_name,
+                agent=agent,
+                session_service=self.session_service,
+                plugins=[MetricsPlugin()] if get_metrics().enabled else [],
+            )
+            for app_name, agent in agents.items()
+        }
+        self.pools = {
+            app_name: SessionPool(self.session_service, app_name, user_id, session_pool_size)
+            for app_name in self.runners
+        }
+        self.coalescers = {
+            app_name: TurnCoalescer(runner)
+            for app_name, runner in self.runners.items()
+            if coalesce and find_sub_agent(runner.agent, ContextExtractorAgent) is not None
+        }
+
+    async def start(self) -> None:
+        """Creates the model clients and starts filling the session pools."""
+        for runner in self.runners.values():
+            _warm_up(runner.agent)
+        for pool in self.pools.values():
+            await pool.start()
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            await pool.close()
+
+    def runner(self, app_name: str) -> Runner:
+        try:
+            return self.runners[app_name]
+        except KeyError:
+            raise UnknownAppError(app_name) from None
+
+    async def new_session(self, app_name: str) -> str:
+        """Returns the ID of a new session of an app."""
+        self.runner(app_name)
+        return await self.pools[app_name].acquire()
+
+    async def check_session(self, app_name: str, session_id: str) -> None:
+        """Raises UnknownSessionError if the session does not exist."""
+        session = await self.session_service.get_session(
+            app_name=app_name, user_id=self.user_id, session_id=session_id
+        )
+        if session is None:
+            raise UnknownSessionError(session_id)
+
+    async def stream(
+        self, app_name: str, session_id: str, message: str
+    ) -> AsyncGenerator[ServerSentEvent, None]:
+        """Runs one turn and yields its answer as server-sent events.
+
+        Yields a "session" event, a "text" event per piece of answer text, and
+        finally "done" with the turn's timings, or "error" if the turn failed or
+        ended without timings.
+        Closing the generator cancels the turn.
+        """
+        runner = self.runner(app_name)
+        coalescer = self.coalescers.get(app_name)
+        if coalescer is not None:
+            turn = coalescer.iter_turn(self.user_id, session_id, message)
+        else:
+            turn = iter_turn(
+                runner,
+                self.user_id,
+                session_id,
+                message,
+                answer_authors=(*DEFAULT_ANSWER_AUTHORS, runner.agent.name),
+            )
+
+        yield ServerSentEvent('session', {'session_id': session_id})
+        timings = None
+        try:
+            async for item in turn:
+                if isinstance(item, TurnTimings):
+                    timings = item
+                else:
+                    yield ServerSentEvent('text', {'text': item})
+        except Exception as e:
+            logger.exception('Turn failed in %s session %s', app_name, session_id)
+            yield ServerSentEvent('error', {'error': str(e)})
+            return
+        finally:
+            await turn.aclose()
+        if timings is None:
+            logger.error('Turn in %s session %s ended without timings', app_name, session_id)
+            yield ServerSentEvent('error', {'error': 'The turn ended before it completed.'})
+            return
+        yield ServerSentEvent('done', {'timings': dataclasses.asdict(timings)})
+
+
+class StreamRequest(BaseModel):
+    """Body of POST /apps/{app}/stream."""
+
+    message: str = Field(min_length=1)
+    session_id: str | None = None
+
+
+def create_gateway_app(gateway: AgentGateway) -> FastAPI:
+    """Creates the FastAPI application serving `gateway`.
+
+    Args:
+        gateway: The agents to serve. It is started and closed with the
+            application.
+
+    Returns:
+        FastAPI: The ASGI application.
+
+    Example:
+        >>> app = create_gateway_app(AgentGateway({'explanation_agent': get_explanation_agent()}))
+        >>> uvicorn.run(app, port=8080)
+    """
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+        await gateway.start()
+        try:
+            yield
+        finally:
+            await gateway.close()
+
+    app = FastAPI(title='Student Educational RAG Agent gateway', lifespan=lifespan)
+
+    @app.get('/healthz')
+    async def healthz() -> dict:
+        return {'status': 'ok', 'apps': sorted(gateway.runners)}
+
+    @app.post('/apps/{app_name}/sessions')
+    async def create_session(app_name: str) -> dict:
+        try:
+            return {'session_id': await gateway.new_session(app_name)}
+        except UnknownAppError:
+            raise HTTPException(404, f'Unknown app: {app_name}') from None
+
+    @app.post('/apps/{app_name}/stream')
+    async def stream(app_name: str, request: StreamRequest) -> StreamingResponse:
+        try:
+            if request.session_id is None:
+                session_id = await gateway.new_session(app_name)
+            else:
+                session_id = request.session_id
+                gateway.runner(app_name)
+                await gateway.check_session(app_name, session_id)
+        except UnknownAppError:
+            raise HTTPException(404, f'Unknown app: {app_name}') from None
+        except UnknownSessionError:
+            raise HTTPException(404, f'Unknown session: {request.session_id}') from None
+
+        async def events() -> AsyncGenerator[str, None]:
+            async for event in gateway.stream(app_name, session_id, request.message):
+                yield event.encode()
+
+        return StreamingResponse(
+            events(),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    return app
+
+
+def default_agents(app_names: list[str]) -> dict[str, BaseAgent]:
+    """Builds the agents to serve: "rag" (root_agent) and/or "explanation_agent"."""
+    agents: dict[str, BaseAgent] = {}
+    for app_name in app_names:
+        if app_name == 'rag':
+            from .agent import get_root_agent
+
+            agents[app_name] = get_root_agent()
+        elif app_name == 'explanation_agent':
+            from .explanation_agent import get_explanation_agent
+
+            agents[app_name] = get_explanation_agent()
+        else:
+            raise ValueError(f'Unknown app: {app_name!r}')
+    return agents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument(
+        '--apps', default='rag,explanation_agent', help='Comma-separated agents to serve.'
+    )
+    parser.add_argument(
+        '--session-pool-size',
+        type=int,
+        default=DEFAULT_SESSION_POOL_SIZE,
+        help='Sessions kept ready per agent.',
+    )
+    args = parser.parse_args()
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    gateway = AgentGateway(
+        default_agents([name.strip() for name in args.apps.split(',') if name.strip()]),
+        session_pool_size=args.session_pool_size,
+    )
+    uvicorn.run(create_gateway_app(gateway), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
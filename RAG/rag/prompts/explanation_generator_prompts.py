@@ -19,6 +19,8 @@ The explanation generator agent creates age-appropriate, curriculum-aligned expl
 the retrieved textbook content and the student's grade level.
 """
 
+from ..shared_libraries.student_context import StudentContext
+
 
 def return_instructions_explanation_generator() -> str:
     """Returns the instruction prompt for the explanation generator agent.
@@ -38,11 +40,7 @@ def return_instructions_explanation_generator() -> str:
         You will receive information from previous agents in the workflow:
         
         1. **Student Context** (from Context Extractor Agent):
-           The student context contains:
-           - Education Board (e.g., CBSE, ICSE, State Board, IB, etc.)
-           - Grade Level (e.g., Grade 10, Class 9, etc.)
-           - Subject (e.g., Mathematics, Science, English, etc.)
-           This may be in JSON format like: {{"board": "CBSE", "grade": "Grade 10", "subject": "Science"}}
+           The student's board, grade, subject and term are listed under "Student Context" below.
         
         2. **Retrieved Content** (from RAG Retrieval Agent):
            - Relevant textbook content retrieved from the RAG corpus
@@ -195,3 +193,48 @@ def return_instructions_explanation_generator() -> str:
     
     return instruction_prompt
 
+
+def return_student_context_instructions(
+    student_context: StudentContext, pending_question: str | None = None
+) -> str:
+    """Returns the "Student Context" section of the explanation generator prompt.
+
+    The section lists the fields of the resolved StudentContext. When board,
+    grade or subject is missing, it tells the generator to ask the student for
+    them before explaining in full, which the context extractor used to do.
+    Once the student has given them, it points the generator back at the
+    question they asked before.
+
+    Args:
+        student_context: The context resolved for the current turn.
+        pending_question: The question asked while the context was incomplete,
+            if any (state['pending_question']).
+
+    Returns:
+        str: The section, to be appended to the explanation generator instructions.
+    """
+    section = f"""
+        **Student Context:**
+        - Board: {student_context.board}
+        - Grade: {student_context.grade}
+        - Subject: {student_context.subject}
+        - Term: {student_context.term or 'Not Specified'}
+    """
+    if student_context.is_complete:
+        if pending_question:
+            section += f"""
+        The student's last message gives the details you asked for. Answer the question they
+        asked before it: "{pending_question}"
+    """
+        return section
+    return section + """
+        The student has not told you their full context yet, so any content above was retrieved
+        without knowing their textbook. Do not give a full explanation yet. If content was
+        retrieved, you may answer in one or two sentences from it. Then ask the student politely:
+        "Hi! I'd be happy to help you with your studies. To provide you with the most accurate answers from your textbook, could you please tell me:
+        - Your education board (e.g., CBSE, ICSE, Tamil Nadu State Board, etc.)
+        - Your grade level (e.g., Grade 4, Grade 9, etc.)
+        - The subject you're studying (e.g., Science, Mathematics, etc.)"
+        Only ask for the details listed as "Not Specified" above.
+    """
+
@@ -0,0 +1,170 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""BM25 lexical index over textbook chunks, and reciprocal rank fusion.
+
+Questions often name exact terms, e.g. a chapter title ("MY LITTLE PICTIONARY")
+or a formula, that embeddings do not match reliably. BM25Index ranks chunks by
+the Okapi BM25 score of the query terms, from an inverted index built once when
+the chunks are indexed. reciprocal_rank_fusion() combines its ranking with the
+vector search ranking.
+
+The postings are stored CSR-style in flat NumPy arrays: the postings of term t are
+doc_ids[indptr[t]:indptr[t + 1]], with the BM25 term-frequency weight of each
+precomputed, so a search adds one weighted slice per query term to a score array.
+"""
+
+import math
+import re
+from collections import Counter
+from collections.abc import Iterable, Mapping, Sequence
+
+import numpy as np
+
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+DEFAULT_RRF_K = 60
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase alphanumeric terms."""
+    return _TOKEN.findall((text or '').lower())
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks.
+
+    Args:
+        terms: The vocabulary; term i's postings are at indptr[i]:indptr[i + 1].
+        idf: Inverse document frequency of each term.
+        indptr: Offsets of each term's postings.
+        doc_ids: Chunk positions of the postings.
+        weights: BM25 term-frequency weight of each posting.
+        n_docs: Number of chunks.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        idf: np.ndarray,
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        n_docs: int,
+    ):
+        self.terms = list(terms)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.n_docs = n_docs
+        self._term_ids = {term: i for i, term in enumerate(self.terms)}
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> 'BM25Index':
+        """Builds the inverted index of a list of chunks."""
+        counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for doc_id, doc_counts in enumerate(counts):
+            for term, tf in doc_counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, weights, idf = [], [], []
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            indptr[i + 1] = indptr[i] + len(entries)
+            df = len(entries)
+            idf.append(math.log(1 + (len(counts) - df + 0.5) / (df + 0.5)))
+            for doc_id, tf in entries:
+                norm = k1 * (1 - b + b * lengths[doc_id] / average_length)
+                doc_ids.append(doc_id)
+                weights.append(tf * (k1 + 1) / (tf + norm))
+        return cls(terms, np.array(idf), indptr, np.array(doc_ids), np.array(weights), len(counts))
+
+    def scores(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every chunk for a query."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            scores[self.doc_ids[start:end]] += self.idf[term_id] * self.weights[start:end]
+        return scores
+
+    def search(
+        self, query: str, top_k: int, rows: np.ndarray | None = None
+    ) -> list[tuple[int, float]]:
+        """Returns the (chunk position, score) of the best matching chunks.
+
+        Args:
+            query: The query text.
+            top_k: Maximum number of chunks to return. Chunks sharing no term with
+                the query are never returned.
+            rows: Only consider these chunk positions. All chunks when None.
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores) if rows is None else rows[scores[rows] > 0]
+        if not len(candidates):
+            return []
+        if top_k < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], top_k)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(row), float(scores[row])) for row in candidates]
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Returns the index as arrays, for saving with NumPy (see from_arrays)."""
+        return {
+            'bm25_idf': self.idf,
+            'bm25_indptr': self.indptr,
+            'bm25_doc_ids': self.doc_ids,
+            'bm25_weights': self.weights,
+        }
+
+    @classmethod
+    def from_arrays(cls, terms: Sequence[str], arrays: Mapping[str, np.ndarray], n_docs: int) -> 'BM25Index':
+        """Rebuilds an index from its vocabulary and to_arrays() output."""
+        return cls(
+            terms,
+            arrays['bm25_idf'],
+            arrays['bm25_indptr'],
+            arrays['bm25_doc_ids'],
+            arrays['bm25_weights'],
+            n_docs,
+        )
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[int]], k: int = DEFAULT_RRF_K
+) -> list[tuple[int, float]]:
+    """Fuses rankings of the same items with reciprocal rank fusion.
+
+    Each item scores the sum of 1 / (k + rank) over the rankings it appears in,
+    rank starting at 1, so items ranked well by several retrievers come first.
+
+    Returns:
+        (item, fused score) pairs, best first.
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda pair: -pair[1])
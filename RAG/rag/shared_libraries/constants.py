@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Session state keys shared by the agents and tools."""
+
+# The extractor's output for the current turn: a StudentContext, stored as its
+# {'board', 'grade', 'subject', 'term'} dict (see student_context.py).
+STUDENT_CONTEXT_KEY = 'student_context'
+
+# The context resolved earlier in the session, in the same form. Unlike
+# state['student_context'], it is merged across turns and survives turns where
+# extraction is skipped.
+SESSION_CONTEXT_KEY = 'session_student_context'
+
+# The retrieved textbook content, formatted as text for the Explanation Generator.
+RETRIEVED_CONTENT_KEY = 'retrieved_content'
+
+# The retrieved chunks with their source metadata, as a list of dicts with
+# 'text', 'source_uri', 'source_display_name' and 'distance'.
+RETRIEVED_CHUNKS_KEY = 'retrieved_chunks'
+
+# The student's question from a turn whose context was incomplete, e.g. "Explain
+# Newton's laws" before they named their board. Kept until a later turn completes
+# the context; on that turn, if the message only gives the missing details
+# ("CBSE"), the question is answered then, and it is cleared on the turn after.
+# None otherwise.
+PENDING_QUESTION_KEY = 'pending_question'
+
+# The Explanation Generator's response for the current turn.
+FINAL_EXPLANATION_KEY = 'final_explanation'
+
+# Set when the Explanation Generator offered the student a choice of explanation
+# styles: {'question', 'retrieved_content', 'retrieved_chunks'} of that turn, so
+# that the reply ("1", "story") is answered from the same content without
+# retrieving again. None otherwise.
+PENDING_STYLE_CHOICE_KEY = 'pending_style_choice'
+
+# The running summary of the turns compacted out of the conversation history, as
+# {'turns', 'lines', 'last_question'} (see history_compaction.py).
+CONVERSATION_SUMMARY_KEY = 'conversation_summary'
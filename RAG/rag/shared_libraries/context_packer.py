@@ -0,0 +1,168 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fits retrieved chunks into a token budget for the Explanation Generator.
+
+Everything the retrieval stage returns is otherwise passed to the generator, so
+its input (and with it latency and cost) grows with the size of the chunks.
+ContextPacker keeps the most relevant chunks that fit in a budget:
+
+- Chunks are taken in the order the retriever returns them, most relevant
+  first. That order is not always by vector distance: hybrid retrieval ranks
+  chunks by reciprocal rank fusion of the vector and BM25 results.
+- A chunk that does not fit whole is cut at a sentence boundary, if enough of it
+  fits to be useful; otherwise its text is dropped.
+- Chunks whose text is dropped keep their citation metadata (source, chapter,
+  section, pages), so the generator can still point the student to them.
+
+Tokens are estimated from the text length by default (about four characters per
+token for Gemini models on English text); pass `count_tokens` to count exactly.
+The budget depends on the generator model, see token_budget_for().
+"""
+
+import dataclasses
+import math
+import os
+import re
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from google.adk.models import BaseLlm
+
+# Context tokens per generator model, for the retrieved content alone (the
+# instructions and conversation come on top). Override with CONTEXT_TOKEN_BUDGET.
+MODEL_TOKEN_BUDGETS = {
+    'gemini-2.5-flash-lite': 2000,
+    'gemini-2.5-flash': 3000,
+    'gemini-2.5-pro': 6000,
+}
+DEFAULT_TOKEN_BUDGET = 3000
+CHARS_PER_TOKEN = 4
+# Tokens taken by the "[n] Source: ..." line of each chunk.
+CHUNK_OVERHEAD_TOKENS = 16
+# A chunk is only cut if at least this many tokens of it fit.
+DEFAULT_MIN_CHUNK_TOKENS = 48
+
+CITATION_KEYS = (
+    'source_uri', 'source_display_name', 'chapter', 'section', 'page_start', 'page_end', 'distance'
+)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens of `text`."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text: str) -> list[str]:
+    """Splits text after sentence-ending punctuation, keeping the punctuation."""
+    return [s for s in _SENTENCE_END.split(text.strip()) if s]
+
+
+def token_budget_for(model: str | BaseLlm) -> int:
+    """Returns the context token budget for a generator model (name or BaseLlm).
+
+    CONTEXT_TOKEN_BUDGET, if set, applies to every model.
+    """
+    if os.environ.get('CONTEXT_TOKEN_BUDGET'):
+        return int(os.environ['CONTEXT_TOKEN_BUDGET'])
+    name = model if isinstance(model, str) else getattr(model, 'model', '')
+    # Longest prefix first, so "gemini-2.5-flash-lite-001" is not taken for flash.
+    for prefix in sorted(MODEL_TOKEN_BUDGETS, key=len, reverse=True):
+        if name.startswith(prefix):
+            return MODEL_TOKEN_BUDGETS[prefix]
+    return DEFAULT_TOKEN_BUDGET
+
+
+@dataclasses.dataclass
+class PackedContext:
+    """The chunks that fit, and the citations of those that did not.
+
+    Attributes:
+        chunks: Chunks to pass to the generator, most relevant first. A chunk cut
+            to fit has 'truncated': True.
+        omitted: Citation metadata of the chunks whose text was dropped.
+        tokens: Estimated tokens of the packed chunks.
+    """
+
+    chunks: list[dict]
+    omitted: list[dict]
+    tokens: int
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a token budget.
+
+    Args:
+        token_budget: Maximum tokens of packed chunk text, including a per-chunk
+            allowance for its source line.
+        count_tokens: Returns the number of tokens of a text.
+        min_chunk_tokens: Minimum tokens of a chunk worth including when it has
+            to be cut.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        min_chunk_tokens: int = DEFAULT_MIN_CHUNK_TOKENS,
+    ):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+
+    @classmethod
+    def for_model(cls, model: str | BaseLlm, **kwargs: Any) -> 'ContextPacker':
+        """Returns a packer with the budget of a generator model, see token_budget_for()."""
+        return cls(token_budget_for(model), **kwargs)
+
+    def pack(self, chunks: Iterable[dict]) -> PackedContext:
+        """Returns the chunks that fit in the budget, in the order given.
+
+        Args:
+            chunks: Retrieved chunks, most relevant first.
+        """
+        packed, omitted = [], []
+        remaining = self.token_budget
+        for chunk in chunks:
+            available = remaining - CHUNK_OVERHEAD_TOKENS
+            text = chunk.get('text', '')
+            tokens = self.count_tokens(text)
+            if tokens <= available:
+                packed.append(chunk)
+                remaining -= tokens + CHUNK_OVERHEAD_TOKENS
+                continue
+            truncated, tokens = self._truncate(text, available)
+            if truncated is None:
+                omitted.append({key: chunk[key] for key in CITATION_KEYS if key in chunk})
+                continue
+            packed.append({**chunk, 'text': truncated, 'truncated': True})
+            remaining -= tokens + CHUNK_OVERHEAD_TOKENS
+        return PackedContext(packed, omitted, self.token_budget - remaining)
+
+    def _truncate(self, text: str, available: int) -> tuple[str | None, int]:
+        """Returns the leading sentences of `text` that fit, and their tokens."""
+        if available < self.min_chunk_tokens:
+            return None, 0
+        kept, tokens = [], 0
+        for sentence in split_sentences(text):
+            sentence_tokens = self.count_tokens(sentence + ' ')
+            if tokens + sentence_tokens > available:
+                break
+            kept.append(sentence)
+            tokens += sentence_tokens
+        if tokens < self.min_chunk_tokens:
+            return None, 0
+        return ' '.join(kept), tokens
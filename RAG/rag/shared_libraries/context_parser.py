@@ -0,0 +1,507 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic extraction of board, grade and subject from student queries.
+
+Most student queries state their context explicitly ("I'm studying CBSE Grade 10
+Science..."). This module recognises those mentions with a small lexicon and a
+few regular expressions so that the Context Extractor Agent only needs to call
+the LLM when the query is ambiguous.
+
+Every extracted field carries a confidence score:
+- 1.0 for an exact mention ("CBSE", "Grade 10", "Science")
+- 0.95 for the same words written differently ("tamilnadu", "Grade10")
+- 0.8 for a typo-tolerant (fuzzy) match ("Mathematcs")
+- lower values for weak or ambiguous signals (a bare "4th", two subjects)
+
+The overall confidence of a parse is the lowest confidence of its three fields,
+so a query is only handled without the LLM when all of board, grade and subject
+were recognised reliably.
+"""
+
+import dataclasses
+import difflib
+import json
+import re
+from typing import Any
+
+NOT_SPECIFIED = 'Not Specified'
+
+# Parses at or above this confidence are used without calling the LLM.
+DEFAULT_CONFIDENCE_THRESHOLD = 0.75
+
+EXACT_CONFIDENCE = 1.0
+COMPACT_CONFIDENCE = 0.95
+FUZZY_CONFIDENCE = 0.8
+IMPLIED_CONFIDENCE = 0.7
+WEAK_CONFIDENCE = 0.6
+AMBIGUOUS_CONFIDENCE = 0.5
+
+# Minimum similarity (difflib ratio) for a typo-tolerant match, and the minimum
+# alias length it applies to. Short aliases such as "IB" or "CBSE" must match
+# exactly, otherwise ordinary words would be mistaken for them.
+_FUZZY_RATIO = 0.85
+_FUZZY_MIN_LENGTH = 5
+
+# Longest alias (in words) looked for in a query.
+_MAX_ALIAS_WORDS = 4
+
+NATIONAL_BOARDS = {
+    'CBSE': ['cbse', 'central board of secondary education', 'ncert'],
+    'ICSE': ['icse', 'cisce'],
+    'ISC': ['isc'],
+    'IB': ['ib', 'international baccalaureate'],
+    'IGCSE': ['igcse', 'cambridge igcse', 'cambridge'],
+    'NIOS': ['nios', 'national institute of open schooling'],
+}
+
+STATE_NAMES = {
+    'Tamil Nadu': ['tamil nadu', 'samacheer kalvi', 'samacheer'],
+    'Maharashtra': ['maharashtra', 'msbshse'],
+    'Kerala': ['kerala', 'scert kerala'],
+    'Karnataka': ['karnataka', 'ktbs'],
+    'Andhra Pradesh': ['andhra pradesh', 'andhra'],
+    'Telangana': ['telangana'],
+    'West Bengal': ['west bengal', 'wbbse'],
+    'Uttar Pradesh': ['uttar pradesh', 'upmsp'],
+    'Madhya Pradesh': ['madhya pradesh', 'mpbse'],
+    'Gujarat': ['gujarat', 'gseb'],
+    'Rajasthan': ['rajasthan', 'rbse'],
+    'Punjab': ['punjab', 'pseb'],
+    'Haryana': ['haryana', 'hbse'],
+    'Bihar': ['bihar', 'bseb'],
+    'Odisha': ['odisha', 'orissa'],
+    'Assam': ['assam', 'seba'],
+}
+
+GENERIC_STATE_BOARD = 'State Board'
+
+SUBJECTS = {
+    'Mathematics': ['mathematics', 'maths', 'math'],
+    'Science': ['science', 'general science'],
+    'Physics': ['physics'],
+    'Chemistry': ['chemistry'],
+    'Biology': ['biology', 'bio', 'botany', 'zoology'],
+    'English': ['english'],
+    'Tamil': ['tamil'],
+    'Hindi': ['hindi'],
+    'Social Science': ['social science', 'social studies', 'sst', 'social'],
+    'History': ['history'],
+    'Geography': ['geography'],
+    'Civics': ['civics', 'political science'],
+    'Economics': ['economics'],
+    'Environmental Studies': ['environmental studies', 'evs'],
+    'Computer Science': ['computer science', 'computers', 'computer'],
+}
+
+# Topics that strongly imply a subject without naming it. These are only
+# weak evidence, so on their own they keep the parse below the threshold.
+IMPLIED_SUBJECTS = {
+    'Mathematics': [
+        'algebra', 'geometry', 'trigonometry', 'arithmetic', 'calculus',
+        'quadratic equation', 'fractions',
+    ],
+    'Physics': ['newton s laws', 'newtons laws', 'laws of motion'],
+}
+
+_GRADE_KEYWORDS = r'grade|class|std|standard'
+_NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5, 'sixth': 6,
+    'seventh': 7, 'eighth': 8, 'ninth': 9, 'tenth': 10, 'eleventh': 11,
+    'twelfth': 12,
+}
+# "Class I" is left out on purpose: "class i am ..." is far more common.
+_ROMAN_NUMERALS = {
+    'ii': 2, 'iii': 3, 'iv': 4, 'v': 5, 'vi': 6, 'vii': 7, 'viii': 8,
+    'ix': 9, 'x': 10, 'xi': 11, 'xii': 12,
+}
+_ORDINAL_WORDS = '|'.join(
+    word for word, _ in _NUMBER_WORDS.items() if word.endswith(('st', 'nd', 'rd', 'th'))
+)
+_CARDINAL_WORDS = '|'.join(
+    word for word, _ in _NUMBER_WORDS.items() if not word.endswith(('st', 'nd', 'rd', 'th'))
+)
+_ORDINAL = rf'(?:\d{{1,2}}(?:st|nd|rd|th)|{_ORDINAL_WORDS})'
+_NUMBER = rf'(?:\d{{1,2}}(?:st|nd|rd|th)?|{_ORDINAL_WORDS}|{_CARDINAL_WORDS}|{"|".join(_ROMAN_NUMERALS)})'
+
+# (pattern, confidence) pairs, tried in order. Group "kw" holds the grade
+# keyword when there is one and group "num" the grade number.
+_GRADE_PATTERNS = [
+    (re.compile(rf'\b(?P<kw>{_GRADE_KEYWORDS})\s*(?P<num>{_NUMBER})\b'), EXACT_CONFIDENCE),
+    (re.compile(rf'\b(?P<num>{_ORDINAL})\s+(?P<kw>{_GRADE_KEYWORDS})\b'), EXACT_CONFIDENCE),
+    (re.compile(rf'\b(?:in|studying)\s+(?P<num>{_ORDINAL})\b'), 0.9),
+    (re.compile(rf'\b(?P<num>{_ORDINAL})\b'), WEAK_CONFIDENCE),
+]
+
+# Some state boards split a year's textbooks into terms ("Term 1").
+_TERM_PATTERN = re.compile(r'\bterm\s*(?P<num>[1-3]|one|two|three|i{1,3})\b')
+_TERM_NUMBERS = {'one': 1, 'two': 2, 'three': 3, 'i': 1, 'ii': 2, 'iii': 3}
+
+
+@dataclasses.dataclass(frozen=True)
+class ParsedStudentContext:
+    """Board, grade and subject recognised in a query, with per-field confidence.
+
+    Fields that were not found are None and have a confidence of 0. The term is
+    optional extra detail and does not count towards confidence or completeness.
+    """
+
+    board: str | None = None
+    grade: str | None = None
+    subject: str | None = None
+    term: int | None = None
+    board_confidence: float = 0.0
+    grade_confidence: float = 0.0
+    subject_confidence: float = 0.0
+
+    @property
+    def confidence(self) -> float:
+        """The lowest confidence across board, grade and subject."""
+        return min(self.board_confidence, self.grade_confidence, self.subject_confidence)
+
+    @property
+    def mentions_context(self) -> bool:
+        """Whether the query mentioned board, grade or subject.
+
+        Weak signals such as a bare ordinal ("Newton's 1st law") do not count, so
+        they do not trigger a new extraction on follow-up turns.
+        """
+        return max(self.board_confidence, self.grade_confidence, self.subject_confidence) > WEAK_CONFIDENCE
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether board, grade and subject are all known."""
+        return all((self.board, self.grade, self.subject))
+
+    def is_confident(self, threshold: float = DEFAULT_CONFIDENCE_THRESHOLD) -> bool:
+        """Whether all three fields were recognised at or above `threshold`."""
+        return self.confidence >= threshold
+
+    def to_dict(self) -> dict:
+        """Returns the context in the extractor's output format."""
+        return {
+            'board': self.board or NOT_SPECIFIED,
+            'grade': self.grade or NOT_SPECIFIED,
+            'subject': self.subject or NOT_SPECIFIED,
+        }
+
+    def to_json(self) -> str:
+        """Returns the context as the JSON string the LLM extractor would produce."""
+        return json.dumps(self.to_dict())
+
+    def merged_onto(self, previous: 'ParsedStudentContext') -> 'ParsedStudentContext':
+        """Returns `previous` updated with the fields this parse mentions.
+
+        Used on follow-up turns: "Actually, I'm in Grade 11 now" changes the grade
+        and keeps the board and subject from earlier in the session.
+        """
+        merged = {}
+        for field in ('board', 'grade', 'subject'):
+            confidence = getattr(self, f'{field}_confidence')
+            source = self if getattr(self, field) and confidence > WEAK_CONFIDENCE else previous
+            merged[field] = getattr(source, field)
+            merged[f'{field}_confidence'] = getattr(source, f'{field}_confidence')
+        merged['term'] = self.term if self.term is not None else previous.term
+        return ParsedStudentContext(**merged)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ParsedStudentContext':
+        """Builds a context from an already resolved dict, e.g. from session state.
+
+        Resolved fields are trusted fully; "Not Specified" values are treated as
+        missing.
+        """
+        fields: dict[str, Any] = {}
+        for field in ('board', 'grade', 'subject'):
+            value = data.get(field)
+            if isinstance(value, str) and value.strip() and value.strip() != NOT_SPECIFIED:
+                fields[field] = value.strip()
+                fields[f'{field}_confidence'] = EXACT_CONFIDENCE
+        term = data.get('term')
+        fields['term'] = term if isinstance(term, int) else term_number(term or '')
+        return cls(**fields)
+
+
+@dataclasses.dataclass(frozen=True)
+class _Match:
+    value: str
+    start: int
+    end: int
+    confidence: float
+
+
+def _normalize(text: str) -> list[str]:
+    text = text.lower().replace('&', ' and ')
+    return re.sub(r'[^a-z0-9]+', ' ', text).split()
+
+
+def _compile_lexicon(lexicon: dict[str, list[str]]) -> list[tuple[str, str, int]]:
+    """Flattens a lexicon into (canonical, compact alias, alias word count)."""
+    compiled = []
+    for canonical, aliases in lexicon.items():
+        for alias in aliases:
+            words = _normalize(alias)
+            compiled.append((canonical, ''.join(words), len(words)))
+    return compiled
+
+
+_BOARD_LEXICON = _compile_lexicon(NATIONAL_BOARDS)
+_STATE_LEXICON = _compile_lexicon(STATE_NAMES)
+_SUBJECT_LEXICON = _compile_lexicon(SUBJECTS)
+_IMPLIED_SUBJECT_LEXICON = _compile_lexicon(IMPLIED_SUBJECTS)
+
+
+def _find_matches(
+    tokens: list[str],
+    lexicon: list[tuple[str, str, int]],
+    allow_fuzzy: bool = True,
+) -> list[_Match]:
+    """Finds lexicon aliases in `tokens`, tolerating spacing and small typos.
+
+    Overlapping matches are resolved in favour of the most confident and then
+    the longest one, so that "social science" is not also reported as "science".
+    """
+    candidates = []
+    for start in range(len(tokens)):
+        for size in range(1, min(_MAX_ALIAS_WORDS, len(tokens) - start) + 1):
+            window = ''.join(tokens[start:start + size])
+            for canonical, alias, alias_words in lexicon:
+                if window == alias:
+                    confidence = EXACT_CONFIDENCE if size == alias_words else COMPACT_CONFIDENCE
+                elif (
+                    allow_fuzzy
+                    and size in (1, alias_words)
+                    and len(alias) >= _FUZZY_MIN_LENGTH
+                    and abs(len(window) - len(alias)) <= 2
+                    and difflib.SequenceMatcher(None, window, alias).ratio() >= _FUZZY_RATIO
+                ):
+                    confidence = FUZZY_CONFIDENCE
+                else:
+                    continue
+                candidates.append(_Match(canonical, start, start + size, confidence))
+
+    candidates.sort(key=lambda m: (-m.confidence, -(m.end - m.start), m.start))
+    selected: list[_Match] = []
+    for match in candidates:
+        if all(match.end <= s.start or match.start >= s.end for s in selected):
+            selected.append(match)
+    return sorted(selected, key=lambda m: m.start)
+
+
+def _pick(matches: list[_Match]) -> tuple[str | None, float]:
+    """Picks the best match; different values in the same query are ambiguous."""
+    if not matches:
+        return None, 0.0
+    best = max(matches, key=lambda m: m.confidence)
+    if len({m.value for m in matches}) > 1:
+        return best.value, min(best.confidence, AMBIGUOUS_CONFIDENCE)
+    return best.value, best.confidence
+
+
+def _extract_board(tokens: list[str]) -> tuple[str | None, float, list[_Match]]:
+    """Returns the board, its confidence and the matches it was read from."""
+    matches = _find_matches(tokens, _BOARD_LEXICON)
+    board, confidence = _pick(matches)
+    if board:
+        return board, confidence, matches
+
+    matches = _find_matches(tokens, _STATE_LEXICON)
+    state, confidence = _pick(matches)
+    if state:
+        # A state name without the word "board" is weaker evidence.
+        if not any(t.endswith('board') for t in tokens):
+            confidence = min(confidence, FUZZY_CONFIDENCE)
+        return f'{state} {GENERIC_STATE_BOARD}', confidence, matches
+
+    if re.search(r'\bstate\s*board\b', ' '.join(tokens)):
+        return GENERIC_STATE_BOARD, 0.9, []
+    return None, 0.0, []
+
+
+def _grade_number(value: str) -> int | None:
+    value = re.sub(r'(?<=\d)(st|nd|rd|th)$', '', value)
+    number: int | None
+    if value.isdigit():
+        number = int(value)
+    else:
+        number = _NUMBER_WORDS.get(value) or _ROMAN_NUMERALS.get(value)
+    if number is None or not 1 <= number <= 12:
+        return None
+    return number
+
+
+def _extract_grade(tokens: list[str]) -> tuple[str | None, float]:
+    text = ' '.join(tokens)
+    matches = []
+    consumed: list[tuple[int, int]] = []
+    for pattern, confidence in _GRADE_PATTERNS:
+        for m in pattern.finditer(text):
+            if any(m.start() < end and m.end() > start for start, end in consumed):
+                continue
+            number = _grade_number(m.group('num'))
+            if number is None:
+                continue
+            keyword = m.groupdict().get('kw')
+            label = 'Class' if keyword == 'class' else 'Grade'
+            matches.append(_Match(f'{label} {number}', m.start(), m.end(), confidence))
+            consumed.append((m.start(), m.end()))
+
+    if not matches:
+        return None, 0.0
+    best = max(matches, key=lambda m: m.confidence)
+    numbers = {m.value.split()[-1] for m in matches if m.confidence >= best.confidence}
+    if len(numbers) > 1:
+        return best.value, min(best.confidence, AMBIGUOUS_CONFIDENCE)
+    return best.value, best.confidence
+
+
+def _mask(tokens: list[str], matches: list[_Match]) -> list[str]:
+    """Blanks out matched tokens.
+
+    Words that named the board cannot also name the subject
+    ("Tamil Nadu State Board" is not a Tamil textbook).
+    """
+    masked = list(tokens)
+    for match in matches:
+        masked[match.start:match.end] = ['_'] * (match.end - match.start)
+    return masked
+
+
+def _extract_subject(tokens: list[str]) -> tuple[str | None, float]:
+    subject, confidence = _pick(_find_matches(tokens, _SUBJECT_LEXICON))
+    if subject:
+        return subject, confidence
+
+    subject, confidence = _pick(_find_matches(tokens, _IMPLIED_SUBJECT_LEXICON, allow_fuzzy=False))
+    return subject, min(confidence, IMPLIED_CONFIDENCE)
+
+
+def find_subjects(text: str) -> list[str]:
+    """Returns every subject named in `text`, in order of first appearance.
+
+    Unlike parse_student_context(), several subjects are not treated as
+    ambiguous; this is used for textbooks that cover more than one subject.
+    """
+    tokens = _normalize(text)
+    _, _, board_matches = _extract_board(tokens)
+    subjects: list[str] = []
+    for match in _find_matches(_mask(tokens, board_matches), _SUBJECT_LEXICON, allow_fuzzy=False):
+        if match.value not in subjects:
+            subjects.append(match.value)
+    return subjects
+
+
+def strip_student_context(text: str) -> str:
+    """Returns `text` normalized, without the words naming a board, grade or subject.
+
+    This lets questions be compared by topic alone, e.g. "I'm studying CBSE
+    Grade 10 Science. What is photosynthesis?" -> "i m studying what is photosynthesis".
+    """
+    tokens = _normalize(text)
+    _, _, board_matches = _extract_board(tokens)
+    tokens = _mask(tokens, board_matches)
+    tokens = _mask(tokens, _find_matches(tokens, _SUBJECT_LEXICON))
+    text = ' '.join(tokens)
+    for pattern, confidence in _GRADE_PATTERNS:
+        if confidence > WEAK_CONFIDENCE:
+            text = pattern.sub(' ', text)
+    text = re.sub(r'\bstate\s*board\b', ' ', text)
+    return ' '.join(token for token in text.split() if token != '_')
+
+
+# Words that can surround a context in a reply such as "I'm in CBSE board, Class
+# 9, Science please" without making it a question.
+_CONTEXT_REPLY_WORDS = frozenset(
+    'i m im am my we re our in of for from the a an and it its s is this that '
+    'study studying student board grade class std standard subject syllabus textbook '
+    'book school term semester ok okay yes sure please thanks thank you'.split()
+)
+
+
+def mentions_topic(text: str) -> bool:
+    """Whether `text` asks about something besides the student's context.
+
+    False for replies that only give a board, grade, subject or term, e.g. "CBSE
+    Grade 10 Science" or "I'm in ICSE board, class 9".
+    """
+    return any(
+        token not in _CONTEXT_REPLY_WORDS and not token.isdigit()
+        for token in strip_student_context(text).split()
+    )
+
+
+def grade_number(grade: str) -> int | None:
+    """Returns the number in a grade label such as "Grade 4", "Class X" or "4th"."""
+    label, _ = _extract_grade(_normalize(grade or ''))
+    return int(label.split()[-1]) if label else None
+
+
+def term_number(text: str) -> int | None:
+    """Returns the term named in `text` ("Term 2", "term II"), if any."""
+    match = _TERM_PATTERN.search(' '.join(_normalize(text)))
+    if not match:
+        return None
+    value = match.group('num')
+    return int(value) if value.isdigit() else _TERM_NUMBERS[value]
+
+
+def parse_context_json(text: str) -> dict | None:
+    """Reads the JSON object from an extractor response, if there is one.
+
+    The LLM extractor is asked for bare JSON but sometimes wraps it in a code
+    fence or a sentence. Returns None when the response contains no object with
+    board, grade or subject, e.g. when it asks the student for their details.
+    """
+    match = re.search(r'\{.*\}', text or '', re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not {'board', 'grade', 'subject'} & data.keys():
+        return None
+    return data
+
+
+def parse_student_context(query: str) -> ParsedStudentContext:
+    """Extracts board, grade and subject from a student query without an LLM.
+
+    Args:
+        query: The student's message.
+
+    Returns:
+        ParsedStudentContext: The recognised fields and their confidence.
+
+    Example:
+        >>> parsed = parse_student_context(
+        ...     'i am studing in 4th science in tamilnadu state board')
+        >>> parsed.to_dict()
+        {'board': 'Tamil Nadu State Board', 'grade': 'Grade 4', 'subject': 'Science'}
+    """
+    tokens = _normalize(query or '')
+    board, board_confidence, board_matches = _extract_board(tokens)
+    grade, grade_confidence = _extract_grade(tokens)
+    subject, subject_confidence = _extract_subject(_mask(tokens, board_matches))
+    return ParsedStudentContext(
+        board=board,
+        grade=grade,
+        subject=subject,
+        board_confidence=board_confidence,
+        grade_confidence=grade_confidence,
+        subject_confidence=subject_confidence,
+        term=term_number(query or ''),
+    )
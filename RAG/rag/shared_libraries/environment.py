@@ -0,0 +1,43 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process environment set-up shared by the agent entry points.
+
+Authentication is deferred until an agent is first built, and happens at most
+once per process, so that importing the package stays cheap.
+"""
+
+import functools
+import os
+
+from dotenv import load_dotenv
+
+
+@functools.cache
+def configure_environment() -> None:
+    """Loads .env and fills in the Google Cloud defaults the agents rely on.
+
+    google.auth.default() is only called when GOOGLE_CLOUD_PROJECT is not set
+    (neither in the environment nor in .env), since it can take seconds when it
+    has to query the metadata server.
+    """
+    load_dotenv()
+    if not os.environ.get('GOOGLE_CLOUD_PROJECT'):
+        import google.auth
+
+        _, project_id = google.auth.default()
+        if project_id:
+            os.environ['GOOGLE_CLOUD_PROJECT'] = project_id
+    os.environ.setdefault('GOOGLE_CLOUD_LOCATION', 'global')
+    os.environ.setdefault('GOOGLE_GENAI_USE_VERTEXAI', 'True')
@@ -0,0 +1,115 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rule-based detection of the explanation style a student asked for.
+
+The styles and phrases match the ones the Explanation Generator Agent is
+instructed to recognise (see rag/prompts/explanation_generator_prompts.py),
+including the short replies ("1", "two", "story") to the menu of styles it
+offers when the student did not ask for one.
+"""
+
+import re
+
+STORY = 'story'
+MEMORY_TECHNIQUE = 'memory_technique'
+SIMPLE_EXAMPLES = 'simple_examples'
+
+_STYLE_PATTERNS = [
+    (STORY, re.compile(r'\b(like a story|as a story|tell me a story|story)\b')),
+    (MEMORY_TECHNIQUE, re.compile(r'\b(memory techniques?|mnemonics?|help me (remember|memori[sz]e))\b')),
+    (SIMPLE_EXAMPLES, re.compile(
+        r'\b(simple examples?|explain (it |this |that )?simply|child can (easily )?understand)\b'
+    )),
+]
+
+# A reply to the generator's style menu is the whole message: a numbered option
+# ("2", "the first one", "option 3 please") or a style ("story", "memory
+# technique"), with filler words around it. Anything else, e.g. "first law of
+# motion?" or "what is a simple machine?", is a new question.
+_REPLY_CHOICES = {
+    '1': STORY, 'one': STORY, 'first': STORY,
+    '2': MEMORY_TECHNIQUE, 'two': MEMORY_TECHNIQUE, 'second': MEMORY_TECHNIQUE,
+    '3': SIMPLE_EXAMPLES, 'three': SIMPLE_EXAMPLES, 'third': SIMPLE_EXAMPLES,
+}
+_REPLY_STYLES = {
+    'story': STORY, 'stories': STORY,
+    'memory': MEMORY_TECHNIQUE, 'memory technique': MEMORY_TECHNIQUE,
+    'memory techniques': MEMORY_TECHNIQUE, 'mnemonic': MEMORY_TECHNIQUE, 'mnemonics': MEMORY_TECHNIQUE,
+    'simple': SIMPLE_EXAMPLES, 'simple example': SIMPLE_EXAMPLES, 'simple examples': SIMPLE_EXAMPLES,
+    'examples': SIMPLE_EXAMPLES,
+}
+_STYLE_REPLY = re.compile(
+    r'^(?:(?:ok|okay|yes|please) )?'
+    r'(?:(?:i ll|i will|i want|i choose|i pick|i d like|let s go with|go with|take|choose|pick) )*'
+    r'(?:(?:the|a) )?'
+    r'(?:'
+    r'(?:(?:option|choice|number|no) )?(?P<choice>' + '|'.join(_REPLY_CHOICES) + r')(?: one| option)?'
+    r'|(?:explain )?(?:(?:it|using|with|like|as|in) )*(?:a )?'
+    r'(?P<style>' + '|'.join(sorted(_REPLY_STYLES, key=len, reverse=True)) + r')(?: one| option| way| style)?'
+    r')'
+    r'(?: please| pls| thanks| thank you)?$'
+)
+_MENU_PATTERN = re.compile(r'\b1\.\s*explain like a story\b.*\b2\.\s*explain using memory', re.DOTALL)
+
+
+def detect_explanation_style(text: str) -> str | None:
+    """Returns the explanation style requested in `text`, or None.
+
+    Example:
+        >>> detect_explanation_style('Explain photosynthesis like a story')
+        'story'
+    """
+    text = (text or '').lower()
+    for style, pattern in _STYLE_PATTERNS:
+        if pattern.search(text):
+            return style
+    return None
+
+
+def strip_explanation_style(text: str) -> str:
+    """Returns `text` without the phrases that request an explanation style."""
+    text = (text or '').lower()
+    for _, pattern in _STYLE_PATTERNS:
+        text = pattern.sub(' ', text)
+    return ' '.join(text.split())
+
+
+def parse_style_reply(text: str) -> str | None:
+    """Returns the style chosen by a reply to the style menu, or None.
+
+    The whole message must be the choice, so that a new question that starts
+    like one ("first law of motion?") or asks for a style ("explain refraction
+    like a story") is not mistaken for a reply.
+
+    Example:
+        >>> parse_style_reply('2')
+        'memory_technique'
+        >>> parse_style_reply('Option 3 please')
+        'simple_examples'
+        >>> parse_style_reply('What is a simple machine?') is None
+        True
+    """
+    text = ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').lower()).split())
+    match = _STYLE_REPLY.match(text)
+    if match is None:
+        return None
+    if match.group('choice'):
+        return _REPLY_CHOICES[match.group('choice')]
+    return _REPLY_STYLES[match.group('style')]
+
+
+def asks_for_style(response: str) -> bool:
+    """Whether a generator response offers the student the menu of styles."""
+    return bool(_MENU_PATTERN.search((response or '').lower()))
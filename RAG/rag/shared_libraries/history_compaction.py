@@ -0,0 +1,290 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rolling compaction of the conversation history sent to the model.
+
+Every LLM stage sees the whole session history, including the textbook content
+retrieved for earlier turns, so a long homework session sends more input tokens
+(and waits longer for the first token) with every turn. HistoryCompactor keeps
+the history within a budget:
+
+- The last `keep_turns` earlier turns are always kept verbatim.
+- While the turns before them fit in `token_threshold` tokens, nothing changes.
+- Above it, those older turns are replaced by one summary: the student's context
+  (board, grade, subject, term) and a line per turn with the student's message
+  and the start of the answer.
+
+The summary is built without a model call. It is a running summary: it is kept
+in session state and extended with the turns that age out of the window, so
+earlier turns are not summarized again. When it outgrows its own budget, the
+oldest lines are dropped.
+
+A turn starts with a message from the student; the contents up to the next one
+(other agents' outputs, tool calls, the answer) belong to it.
+"""
+
+import dataclasses
+import itertools
+import os
+import re
+from collections.abc import Sequence
+
+from google.genai import types
+
+from .context_packer import estimate_tokens, split_sentences
+from .context_parser import NOT_SPECIFIED
+from .student_context import StudentContext
+
+DEFAULT_TOKEN_THRESHOLD = 4000
+DEFAULT_KEEP_TURNS = 2
+DEFAULT_SUMMARY_TOKEN_BUDGET = 500
+# Tokens of a question or answer kept in its summary line.
+EXCERPT_TOKENS = 50
+
+# ADK passes other agents' messages as user contents that start with this part.
+_OTHER_AGENT_PREFIX = 'For context:'
+_AGENT_SAID = re.compile(r'^\[[^\]]+\] said: ')
+_AGENT_USED_TOOL = re.compile(r'^\[[^\]]+\] (called tool `|`[^`]*` tool returned result)')
+
+
+@dataclasses.dataclass
+class HistoryTurn:
+    """One turn of the conversation: the student's message and what followed it."""
+
+    contents: list[types.Content]
+
+    @property
+    def question(self) -> str:
+        return _text(self.contents[0])
+
+    @property
+    def answer(self) -> str:
+        """The last text of the turn, i.e. the answer the student saw."""
+        for content in reversed(self.contents[1:]):
+            texts = [
+                _AGENT_SAID.sub('', text)
+                for text in _texts(content)
+                if text != _OTHER_AGENT_PREFIX and not _AGENT_USED_TOOL.match(text)
+            ]
+            if texts:
+                return texts[-1]
+        return ''
+
+
+@dataclasses.dataclass
+class CompactedHistory:
+    """The result of compacting a request's contents.
+
+    Attributes:
+        contents: The contents to send instead.
+        summary: The running summary to keep in session state.
+        tokens_removed: Estimated tokens saved.
+    """
+
+    contents: list[types.Content]
+    summary: dict
+    tokens_removed: int
+
+
+def _texts(content: types.Content) -> list[str]:
+    return [part.text for part in content.parts or () if part.text and not part.thought]
+
+
+def _text(content: types.Content) -> str:
+    return ' '.join(_texts(content)).strip()
+
+
+def _is_student_message(content: types.Content) -> bool:
+    if content.role != 'user' or not content.parts:
+        return False
+    if any(part.function_response for part in content.parts):
+        return False
+    texts = _texts(content)
+    return bool(texts) and texts[0] != _OTHER_AGENT_PREFIX
+
+
+def content_tokens(content: types.Content) -> int:
+    """Estimates the tokens of a content, counting tool calls and results as text."""
+    tokens = 0
+    for part in content.parts or ():
+        if part.text:
+            tokens += estimate_tokens(part.text)
+        elif part.function_call:
+            tokens += estimate_tokens(str(part.function_call.args))
+        elif part.function_response:
+            tokens += estimate_tokens(str(part.function_response.response))
+    return tokens
+
+
+def split_turns(
+    contents: Sequence[types.Content],
+) -> tuple[list[types.Content], list[HistoryTurn], list[types.Content]]:
+    """Splits a request's contents into turns.
+
+    Returns:
+        The contents before the first student message, the earlier turns, and
+        the contents of the current turn.
+    """
+    starts = [i for i, content in enumerate(contents) if _is_student_message(content)]
+    if not starts:
+        return list(contents), [], []
+    turns = [HistoryTurn(list(contents[start:end])) for start, end in itertools.pairwise([*starts, len(contents)])]
+    return list(contents[:starts[0]]), turns[:-1], turns[-1].contents
+
+
+def _excerpt(text: str, max_tokens: int = EXCERPT_TOKENS) -> str:
+    """Returns the first sentences of `text` that fit in `max_tokens`."""
+    text = ' '.join(text.split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    excerpt = ''
+    for sentence in split_sentences(text):
+        candidate = f'{excerpt} {sentence}'.strip()
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        excerpt = candidate
+    if not excerpt:
+        # The first sentence alone is too long: cut it at a word boundary.
+        excerpt = text[:max_tokens * 4].rsplit(' ', 1)[0]
+    return excerpt + ' ...'
+
+
+def summarize_turn(turn: HistoryTurn) -> str:
+    """Returns the summary line of a turn."""
+    line = f'- Student: {_excerpt(turn.question)}'
+    answer = turn.answer
+    if answer:
+        line += f'\n  Answer: {_excerpt(answer)}'
+    return line
+
+
+def describe_student_context(student_context: StudentContext | None) -> str:
+    """Returns the known parts of a context, e.g. "CBSE, Grade 10, Science"."""
+    if student_context is None:
+        return ''
+    values = (student_context.board, student_context.grade, student_context.subject, student_context.term)
+    return ', '.join(value for value in values if value and value != NOT_SPECIFIED)
+
+
+class HistoryCompactor:
+    """Replaces all but the last turns of a long history with a running summary.
+
+    Args:
+        token_threshold: Estimated tokens of the turns before the last
+            `keep_turns` above which they are compacted.
+        keep_turns: Earlier turns kept verbatim, most recent first.
+        summary_token_budget: Maximum estimated tokens of the summary lines; the
+            oldest lines are dropped beyond it.
+    """
+
+    def __init__(
+        self,
+        token_threshold: int = DEFAULT_TOKEN_THRESHOLD,
+        keep_turns: int = DEFAULT_KEEP_TURNS,
+        summary_token_budget: int = DEFAULT_SUMMARY_TOKEN_BUDGET,
+    ):
+        if keep_turns < 0:
+            raise ValueError('keep_turns must not be negative')
+        self.token_threshold = token_threshold
+        self.keep_turns = keep_turns
+        self.summary_token_budget = summary_token_budget
+
+    def compact(
+        self,
+        contents: Sequence[types.Content],
+        student_context: StudentContext | None = None,
+        summary: dict | None = None,
+    ) -> CompactedHistory | None:
+        """Compacts the earlier turns of a request's contents.
+
+        Args:
+            contents: The request's contents, oldest first.
+            student_context: The context to state at the top of the summary.
+            summary: The running summary from session state, if any.
+
+        Returns:
+            The compacted history, or None if the turns to fold are within the
+            threshold or would not get shorter.
+        """
+        leading, turns, current = split_turns(contents)
+        if len(turns) <= self.keep_turns:
+            return None
+        folded, kept = turns[:len(turns) - self.keep_turns], turns[len(turns) - self.keep_turns:]
+        folded_tokens = sum(content_tokens(c) for turn in folded for c in turn.contents)
+        if folded_tokens <= self.token_threshold:
+            return None
+
+        summary = self._extend(summary, folded)
+        summary_content = self._summary_content(summary, student_context, len(kept))
+        tokens_removed = folded_tokens - content_tokens(summary_content)
+        if tokens_removed <= 0:
+            return None
+        compacted = [*leading, summary_content, *(c for turn in kept for c in turn.contents), *current]
+        return CompactedHistory(contents=compacted, summary=summary, tokens_removed=tokens_removed)
+
+    def _extend(self, summary: dict | None, folded: list[HistoryTurn]) -> dict:
+        """Returns the running summary of the `folded` turns, reusing `summary`."""
+        summary = summary or {}
+        summarized = summary.get('turns', 0)
+        lines = list(summary.get('lines', ()))
+        # The stored summary only applies to this history if it ends with the
+        # same turn; otherwise (a different or rewound conversation) start over.
+        if not 0 < summarized <= len(folded) or summary.get('last_question') != folded[summarized - 1].question:
+            summarized, lines = 0, []
+        lines.extend(summarize_turn(turn) for turn in folded[summarized:])
+        while len(lines) > 1 and sum(estimate_tokens(line) for line in lines) > self.summary_token_budget:
+            lines.pop(0)
+        return {'turns': len(folded), 'lines': lines, 'last_question': folded[-1].question}
+
+    def _summary_content(
+        self, summary: dict, student_context: StudentContext | None, kept_turns: int
+    ) -> types.Content:
+        header = f'Summary of the first {summary["turns"]} turns of this conversation'
+        header += f' (the last {kept_turns} follow in full):' if kept_turns else ':'
+        lines = [header]
+        described = describe_student_context(student_context)
+        if described:
+            lines.append(f'Student context: {described}')
+        omitted = summary['turns'] - len(summary['lines'])
+        if omitted:
+            lines.append(f'({omitted} earlier turns not shown)')
+        lines.extend(summary['lines'])
+        return types.Content(
+            role='user',
+            parts=[types.Part(text=_OTHER_AGENT_PREFIX), types.Part(text='\n'.join(lines))],
+        )
+
+
+def get_history_compactor() -> HistoryCompactor | None:
+    """Returns a history compactor configured from the environment.
+
+    Environment variables:
+        HISTORY_COMPACTION_ENABLED: "false" to send the whole history. Defaults
+            to "true".
+        HISTORY_COMPACTION_TOKEN_THRESHOLD: Defaults to 4000.
+        HISTORY_COMPACTION_KEEP_TURNS: Defaults to 2.
+        HISTORY_COMPACTION_SUMMARY_TOKENS: Defaults to 500.
+
+    Returns:
+        The compactor, or None if compaction is disabled.
+    """
+    if os.environ.get('HISTORY_COMPACTION_ENABLED', 'true').lower() not in ('1', 'true', 'yes'):
+        return None
+    return HistoryCompactor(
+        token_threshold=int(os.environ.get('HISTORY_COMPACTION_TOKEN_THRESHOLD', DEFAULT_TOKEN_THRESHOLD)),
+        keep_turns=int(os.environ.get('HISTORY_COMPACTION_KEEP_TURNS', DEFAULT_KEEP_TURNS)),
+        summary_token_budget=int(
+            os.environ.get('HISTORY_COMPACTION_SUMMARY_TOKENS', DEFAULT_SUMMARY_TOKEN_BUDGET)
+        ),
+    )
@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rule-based detection of messages that are not academic questions.
+
+Greetings ("Hi, how are you?"), thanks and goodbyes need a one-line reply, not
+context extraction, retrieval and generation. classify_intent() recognises
+them with a short list of phrases: a message is small talk only if, once those
+phrases and a few filler words are removed, nothing is left. Anything else,
+including any message that names a board, grade, subject or explanation style,
+is treated as an academic question, so a misclassification can only send small
+talk through the full workflow, never skip a real question.
+"""
+
+import re
+
+from .context_parser import ParsedStudentContext, parse_student_context
+from .explanation_style import detect_explanation_style
+
+ACADEMIC = 'academic'
+GREETING = 'greeting'
+SMALL_TALK = 'small_talk'
+THANKS = 'thanks'
+FAREWELL = 'farewell'
+
+# Intents answered with a short reply instead of the explanation workflow.
+SHORT_REPLY_INTENTS = (GREETING, SMALL_TALK, THANKS, FAREWELL)
+
+# Checked in this order; when a message matches several, the first one decides
+# the reply ("Thanks, goodbye!" is a farewell).
+_INTENT_PATTERNS = [
+    (FAREWELL, re.compile(
+        r'\b(good ?bye|bye( bye)?|see (you|ya)( later| soon| tomorrow)?|good night|take care|'
+        r'thats all( for (now|today))?|i m done|im done)\b'
+    )),
+    (THANKS, re.compile(
+        r'\b(thank you( so much| very much)?|thanks( a lot| so much)?|thankyou|thx|ty|'
+        r'much appreciated|that (helps|helped|was (very )?helpful)|'
+        r'i (got|have) (all )?(the )?(information|info|answers?) i need(ed)?)\b'
+    )),
+    (SMALL_TALK, re.compile(
+        r'\b(how are you( doing)?( today)?|how (is|s) it going|whats up|wassup|'
+        r'who are you|what (is|s) your name|whats your name|what can you do|'
+        r'are you (a )?(robot|bot|human|ai)|tell me a joke)\b'
+    )),
+    (GREETING, re.compile(
+        r'\b(hi+|hello+|hey+|hiya|greetings|namaste|vanakkam|good (morning|afternoon|evening))( there)?\b'
+    )),
+]
+
+_FILLER_WORDS = {
+    'a', 'again', 'and', 'am', 'fine', 'friend', 'good', 'great', 'i', 'im', 'it', 'ok', 'okay',
+    'please', 'sir', 'madam', 'miss', 'teacher', 'so', 'then', 'too', 'very', 'well', 'for', 'the',
+    'help', 'your', 'you', 'all', 'everyone', 'buddy', 'bot', 'oh', 'wow', 'nice', 'cool', 'awesome',
+}
+
+# Longer messages always go through the full workflow.
+_MAX_SMALL_TALK_WORDS = 16
+
+
+def _normalize(text: str) -> str:
+    text = (text or '').lower().replace("'", '').replace('\u2019', '')
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+def classify_intent(text: str) -> str:
+    """Returns the intent of a student message: ACADEMIC or one of SHORT_REPLY_INTENTS.
+
+    Example:
+        >>> classify_intent('Hi, how are you?')
+        'small_talk'
+        >>> classify_intent('Hi! What is photosynthesis?')
+        'academic'
+    """
+    remaining = _normalize(text)
+    if not remaining or len(remaining.split()) > _MAX_SMALL_TALK_WORDS:
+        return ACADEMIC
+    if detect_explanation_style(text) or parse_student_context(text).mentions_context:
+        return ACADEMIC
+
+    found = []
+    for intent, pattern in _INTENT_PATTERNS:
+        if pattern.search(remaining):
+            found.append(intent)
+            remaining = pattern.sub(' ', remaining)
+    if not found or any(word not in _FILLER_WORDS for word in remaining.split()):
+        return ACADEMIC
+    return found[0]
+
+
+def short_reply(intent: str, student_context: ParsedStudentContext | None = None) -> str:
+    """Returns the reply to a message of one of SHORT_REPLY_INTENTS."""
+    if intent == FAREWELL:
+        return 'Goodbye, and happy studying! Come back any time you have a question.'
+    if intent == THANKS:
+        return "You're welcome! Let me know if there's anything else you'd like to understand."
+
+    if student_context is not None and student_context.is_complete:
+        textbook = f'{student_context.board} {student_context.grade} {student_context.subject}'
+        invitation = f'What would you like to learn from your {textbook} textbook?'
+    else:
+        invitation = (
+            "Tell me your board, grade and subject (for example, \"CBSE Grade 10 Science\") "
+            'and what you would like to learn.'
+        )
+    opening = 'Hello!' if intent == GREETING else "I'm your study helper!"
+    return (
+        f'{opening} I can explain topics from your textbook as a story, with memory techniques '
+        f'or with simple examples. {invitation}'
+    )
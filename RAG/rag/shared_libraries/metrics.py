@@ -0,0 +1,312 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Latency, token and cache metrics for the explanation pipeline.
+
+Metrics are recorded through a Metrics recorder and handed to one or more
+exporters:
+- InMemoryExporter aggregates them in the process, for tests and benchmarks
+- PrometheusExporter aggregates them and renders the Prometheus text format
+- OpenTelemetryExporter records them on OpenTelemetry instruments, which the
+  configured MeterProvider exports (e.g. to Cloud Monitoring)
+
+Durations are histograms in seconds, token and chunk counts are histograms, and
+cache lookups are counters. Labels are kept to low-cardinality values such as
+agent, model and tool names.
+
+The process-wide recorder, get_metrics(), is configured by METRICS_EXPORTER and
+records nothing unless it is set.
+"""
+
+import abc
+import bisect
+import contextlib
+import dataclasses
+import math
+import os
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+# Histogram bucket upper bounds. Histograms whose name ends in "_seconds" use
+# DURATION_BUCKETS; the others count things (tokens, chunks).
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def buckets_for(name: str) -> Sequence[float]:
+    """Returns the histogram buckets for a metric name."""
+    return DURATION_BUCKETS if name.endswith('_seconds') else COUNT_BUCKETS
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+@dataclasses.dataclass
+class Histogram:
+    """Distribution of observed values over fixed buckets.
+
+    counts[i] is the number of values <= buckets[i] and > buckets[i - 1]; the last
+    count is for values above every bucket.
+    """
+
+    buckets: Sequence[float]
+    counts: list[int] = dataclasses.field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsExporter(abc.ABC):
+    """Receives every recorded value. Subclasses must be thread-safe."""
+
+    @abc.abstractmethod
+    def record_histogram(self, name: str, value: float, labels: Labels) -> None:
+        """Records one value of the histogram `name`."""
+
+    @abc.abstractmethod
+    def record_counter(self, name: str, value: float, labels: Labels) -> None:
+        """Adds `value` to the counter `name`."""
+
+
+class InMemoryExporter(MetricsExporter):
+    """Aggregates metrics in memory.
+
+    Example:
+        >>> exporter = InMemoryExporter()
+        >>> metrics = Metrics([exporter])
+        >>> metrics.observe('rag_agent_duration_seconds', 0.3, agent='RagRetrievalAgent')
+        >>> exporter.histogram('rag_agent_duration_seconds', agent='RagRetrievalAgent').count
+        1
+    """
+
+    def __init__(self) -> None:
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self._lock = threading.Lock()
+
+    def record_histogram(self, name: str, value: float, labels: Labels) -> None:
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if labels not in series:
+                series[labels] = Histogram(buckets_for(name))
+            series[labels].observe(value)
+
+    def record_counter(self, name: str, value: float, labels: Labels) -> None:
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + value
+
+    def histogram(self, name: str, **labels: str) -> Histogram | None:
+        """Returns the histogram of one label combination, or None."""
+        return self.histograms.get(name, {}).get(_labels(labels))
+
+    def counter(self, name: str, **labels: str) -> float:
+        """Returns the value of one counter label combination."""
+        return self.counters.get(name, {}).get(_labels(labels), 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class PrometheusExporter(InMemoryExporter):
+    """Aggregates metrics in memory and renders them in the Prometheus text format.
+
+    Serve render() from a /metrics endpoint for Prometheus to scrape.
+    """
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted(self.counters):
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(self.counters[name].items()):
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for name in sorted(self.histograms):
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(self.histograms[name].items()):
+                    cumulative = 0
+                    bounds = [*histogram.buckets, math.inf]
+                    for bound, bucket_count in zip(bounds, histogram.counts, strict=True):
+                        cumulative += bucket_count
+                        le = (('le', _format_value(bound)),)
+                        lines.append(f'{name}_bucket{_format_labels(labels, le)} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetryExporter(MetricsExporter):
+    """Records metrics on OpenTelemetry instruments.
+
+    The values are exported by whatever MeterProvider the application configured,
+    e.g. a PeriodicExportingMetricReader with the Cloud Monitoring exporter.
+
+    Args:
+        meter_name: The name of the OpenTelemetry meter.
+    """
+
+    def __init__(self, meter_name: str = 'rag.explanation_agent'):
+        try:
+            from opentelemetry import metrics
+        except ImportError as e:
+            raise ImportError(
+                'OpenTelemetryExporter requires the opentelemetry-api package'
+            ) from e
+        self._meter = metrics.get_meter(meter_name)
+        self._instruments: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _instrument(self, name: str, kind: str) -> Any:
+        with self._lock:
+            instrument = self._instruments.get(name)
+            if instrument is None:
+                if kind == 'histogram':
+                    instrument = self._meter.create_histogram(
+                        name,
+                        unit='s' if name.endswith('_seconds') else '1',
+                        explicit_bucket_boundaries_advisory=list(buckets_for(name)),
+                    )
+                else:
+                    instrument = self._meter.create_counter(name)
+                self._instruments[name] = instrument
+            return instrument
+
+    def record_histogram(self, name: str, value: float, labels: Labels) -> None:
+        self._instrument(name, 'histogram').record(value, attributes=dict(labels))
+
+    def record_counter(self, name: str, value: float, labels: Labels) -> None:
+        self._instrument(name, 'counter').add(value, attributes=dict(labels))
+
+
+class Metrics:
+    """Records metrics and passes them to exporters.
+
+    With no exporters, recording does nothing, so instrumented code does not need
+    to check whether metrics are enabled.
+
+    Args:
+        exporters: The exporters to pass every value to.
+    """
+
+    def __init__(self, exporters: Sequence[MetricsExporter] = ()):
+        self.exporters = list(exporters)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Records a value in the histogram `name`."""
+        if not self.exporters:
+            return
+        key = _labels(labels)
+        for exporter in self.exporters:
+            exporter.record_histogram(name, value, key)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """Adds `value` to the counter `name`."""
+        if not self.exporters:
+            return
+        key = _labels(labels)
+        for exporter in self.exporters:
+            exporter.record_counter(name, value, key)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Records the wall time of a block in the histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+
+_metrics: Metrics | None = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Returns the process-wide metrics recorder configured from the environment.
+
+    Environment variables:
+        METRICS_EXPORTER: Comma-separated exporters: "memory", "prometheus" or
+            "otel". Defaults to none, in which case nothing is recorded.
+
+    Returns:
+        The shared Metrics recorder.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            exporters: list[MetricsExporter] = []
+            for kind in os.environ.get('METRICS_EXPORTER', '').lower().split(','):
+                kind = kind.strip()
+                if kind == 'memory':
+                    exporters.append(InMemoryExporter())
+                elif kind == 'prometheus':
+                    exporters.append(PrometheusExporter())
+                elif kind in ('otel', 'opentelemetry'):
+                    exporters.append(OpenTelemetryExporter())
+                elif kind and kind != 'none':
+                    raise ValueError(f'Unknown METRICS_EXPORTER: {kind!r}')
+            _metrics = Metrics(exporters)
+        return _metrics
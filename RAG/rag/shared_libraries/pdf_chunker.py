@@ -0,0 +1,359 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Page-parallel text extraction and chunking of textbook PDFs.
+
+The RAG Engine parses and chunks uploaded PDFs itself, and returns no page or
+chapter information with retrieved chunks. This module does that work locally:
+
+- Pages are extracted with pypdf in a process pool, a batch of pages per task.
+  Only a bounded number of batches is in flight and pages are yielded in order,
+  so memory stays flat however long the textbook is.
+- Chapters come from the PDF outline (bookmarks) when it has one, and otherwise
+  from headings such as "Chapter 3" or "Unit 2: ..." at the start of a line.
+  Numbered headings such as "3.2 Reflection of light" start a new section.
+- Chunks of about `max_words` words never span two chapters, overlap by
+  `overlap_words`, and record their chapter, section and pages.
+
+The output is a JSONL chunk file, one chunk per line, which can be uploaded or
+indexed locally (see vector_index.py). A single chapter can be reprocessed on its
+own; its chunks are replaced in the existing chunk file.
+
+Usage:
+    python -m rag.shared_libraries.pdf_chunker textbook.pdf --output chunks.jsonl \\
+        [--display-name CBSE_Grade10_Science.pdf] [--chapter "Chapter 3"] [--workers 4]
+"""
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+DEFAULT_MAX_WORDS = 300
+DEFAULT_OVERLAP_WORDS = 50
+DEFAULT_PAGES_PER_TASK = 8
+
+_CHAPTER_HEADING = re.compile(r'^\s*((?:chapter|unit|lesson|part)\s+[0-9ivxlc]+\b.*)$', re.IGNORECASE)
+_SECTION_HEADING = re.compile(r'^\s*(\d+\.\d+(?:\.\d+)*\s+[A-Z].{2,80})$')
+
+
+@dataclasses.dataclass
+class Page:
+    """The text of one page; `number` starts at 1."""
+
+    number: int
+    text: str
+    chapter: str | None = None
+
+
+@dataclasses.dataclass
+class Chunk:
+    """A piece of a textbook with the location it comes from."""
+
+    text: str
+    display_name: str
+    chapter: str | None
+    section: str | None
+    page_start: int
+    page_end: int
+
+    @property
+    def id(self) -> str:
+        digest = hashlib.sha1(self.text.encode('utf-8')).hexdigest()[:8]
+        return f'{self.display_name}#p{self.page_start}-{self.page_end}-{digest}'
+
+
+# Each worker process keeps the last PDF it opened, so consecutive batches of a
+# textbook do not parse its cross-reference table again. The key includes the
+# modification time, so a rewritten file is opened afresh.
+_open_reader: tuple[tuple | None, PdfReader | None] = (None, None)
+
+
+def _reader(pdf_path: str) -> PdfReader:
+    global _open_reader
+    stat = os.stat(pdf_path)
+    key = (pdf_path, stat.st_mtime_ns, stat.st_size)
+    open_key, reader = _open_reader
+    if reader is None or open_key != key:
+        reader = PdfReader(pdf_path)
+        _open_reader = (key, reader)
+    return reader
+
+
+def extract_pages(pdf_path: str, first: int, last: int) -> list[tuple[int, str]]:
+    """Returns the (number, text) of pages first..last (inclusive, from 1)."""
+    reader = _reader(pdf_path)
+    return [(number, reader.pages[number - 1].extract_text() or '') for number in range(first, last + 1)]
+
+
+def outline_chapters(pdf_path: str) -> list[tuple[int, str]]:
+    """Returns the (first page, title) of the top-level outline entries, in order."""
+    reader = PdfReader(pdf_path)
+    chapters = []
+    try:
+        outline = reader.outline
+    except Exception:
+        return []
+    for item in outline:
+        if isinstance(item, list):  # children of the previous entry
+            continue
+        try:
+            number = reader.get_destination_page_number(item)
+            title = str(item.title).strip()
+        except Exception:
+            continue
+        if number is not None:
+            chapters.append((number + 1, title))
+    return sorted(chapters)
+
+
+def page_count(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def find_chapter(pdf_path: str, chapter: str) -> tuple[str, int, int]:
+    """Returns the full title, first page and last page of a chapter.
+
+    Args:
+        pdf_path: The PDF file.
+        chapter: The start of the chapter's title in the PDF outline, e.g.
+            "Chapter 3".
+
+    Raises:
+        ValueError: If no outline entry's title starts with `chapter`.
+    """
+    chapters = outline_chapters(pdf_path)
+    for i, (first, title) in enumerate(chapters):
+        if title.lower().startswith(chapter.lower()):
+            last = chapters[i + 1][0] - 1 if i + 1 < len(chapters) else page_count(pdf_path)
+            return title, first, max(first, last)
+    raise ValueError(f'No chapter starting with {chapter!r} in the outline of {pdf_path}')
+
+
+def iter_pages(
+    pdf_path: str,
+    executor: Executor | None = None,
+    first: int = 1,
+    last: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    max_pending: int | None = None,
+) -> Iterator[Page]:
+    """Yields the pages of a PDF in order, extracting batches in parallel.
+
+    Args:
+        pdf_path: The PDF file.
+        executor: Runs the extraction; typically a ProcessPoolExecutor, since
+            text extraction is CPU-bound. Without one, pages are extracted in
+            this process.
+        first: The first page to extract, from 1.
+        last: The last page to extract. Defaults to the last page of the PDF.
+        pages_per_task: Pages extracted per task.
+        max_pending: Maximum number of batches in flight. Defaults to twice the
+            executor's workers.
+
+    Yields:
+        Page: Each page, with its chapter when the PDF outline has one.
+    """
+    last = last or page_count(pdf_path)
+    chapters = outline_chapters(pdf_path)
+    batches = deque((start, min(start + pages_per_task - 1, last)) for start in range(first, last + 1, pages_per_task))
+
+    def chapter_of(number: int) -> str | None:
+        title = None
+        for start, name in chapters:
+            if start > number:
+                break
+            title = name
+        return title
+
+    def emit(extracted: list[tuple[int, str]]) -> Iterator[Page]:
+        for number, text in extracted:
+            yield Page(number=number, text=text, chapter=chapter_of(number))
+
+    if executor is None:
+        for start, end in batches:
+            yield from emit(extract_pages(pdf_path, start, end))
+        return
+
+    max_pending = max_pending or 2 * (getattr(executor, '_max_workers', None) or os.cpu_count() or 1)
+    pending: deque[Future[list[tuple[int, str]]]] = deque()
+    while batches or pending:
+        while batches and len(pending) < max_pending:
+            pending.append(executor.submit(extract_pages, pdf_path, *batches.popleft()))
+        yield from emit(pending.popleft().result())
+
+
+def chunk_pages(
+    pages: Iterable[Page],
+    display_name: str,
+    max_words: int = DEFAULT_MAX_WORDS,
+    overlap_words: int = DEFAULT_OVERLAP_WORDS,
+) -> Iterator[Chunk]:
+    """Splits pages into overlapping chunks that stay within one chapter.
+
+    Pages are consumed one at a time, so only the current chunk is held in memory.
+    The chapter of a page is taken from the PDF outline when it has one, and
+    otherwise from chapter headings in its text.
+    """
+    words: list[tuple[str, int]] = []  # (word, page number)
+    chapter = section = chunk_section = None
+
+    def flush(keep_overlap: bool) -> Iterator[Chunk]:
+        nonlocal words, chunk_section
+        if words:
+            yield Chunk(
+                text=' '.join(word for word, _ in words),
+                display_name=display_name,
+                chapter=chapter,
+                section=chunk_section,
+                page_start=words[0][1],
+                page_end=words[-1][1],
+            )
+        words = words[-overlap_words:] if keep_overlap and overlap_words else []
+        chunk_section = section
+
+    def start_chapter(title: str) -> Iterator[Chunk]:
+        nonlocal chapter, section, chunk_section
+        yield from flush(keep_overlap=False)
+        chapter, section, chunk_section = title, None, None
+
+    for page in pages:
+        if page.chapter and page.chapter != chapter:
+            yield from start_chapter(page.chapter)
+        for line in page.text.splitlines():
+            heading = None if page.chapter else _CHAPTER_HEADING.match(line)
+            if heading and ' '.join(heading.group(1).split()) != chapter:
+                yield from start_chapter(' '.join(heading.group(1).split()))
+            section_heading = _SECTION_HEADING.match(line)
+            if section_heading:
+                section = ' '.join(section_heading.group(1).split())
+                if chunk_section is None:
+                    chunk_section = section
+            for word in line.split():
+                words.append((word, page.number))
+                if len(words) >= max_words:
+                    yield from flush(keep_overlap=True)
+    yield from flush(keep_overlap=False)
+
+
+def chunk_to_json(chunk: Chunk) -> dict:
+    return {'id': chunk.id, **dataclasses.asdict(chunk)}
+
+
+def write_chunks(chunks: Iterable[Chunk], output_path: str, replace_chapter: str | None = None) -> int:
+    """Writes chunks to a JSONL file, atomically.
+
+    Args:
+        chunks: The chunks to write.
+        output_path: The chunk file.
+        replace_chapter: If set, the other chunks already in the file are kept,
+            and only those of this chapter are replaced.
+
+    Returns:
+        The number of chunks written from `chunks`.
+    """
+    directory = os.path.dirname(os.path.abspath(output_path))
+    written = 0
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, delete=False, suffix='.tmp') as f:
+        try:
+            if replace_chapter is not None and os.path.exists(output_path):
+                with open(output_path, encoding='utf-8') as existing:
+                    for line in existing:
+                        if line.strip() and json.loads(line).get('chapter') != replace_chapter:
+                            f.write(line)
+            for chunk in chunks:
+                f.write(json.dumps(chunk_to_json(chunk), ensure_ascii=False) + '\n')
+                written += 1
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, output_path)
+    return written
+
+
+def read_chunks(path: str) -> Iterator[dict]:
+    """Yields the chunks of a JSONL chunk file, ordered by page."""
+    with open(path, encoding='utf-8') as f:
+        chunks = [json.loads(line) for line in f if line.strip()]
+    yield from sorted(chunks, key=lambda c: (c['page_start'], c['page_end']))
+
+
+def chunk_pdf(
+    pdf_path: str,
+    output_path: str,
+    display_name: str | None = None,
+    executor: Executor | None = None,
+    chapter: str | None = None,
+    max_words: int = DEFAULT_MAX_WORDS,
+    overlap_words: int = DEFAULT_OVERLAP_WORDS,
+) -> int:
+    """Extracts and chunks a PDF into a JSONL chunk file.
+
+    Args:
+        pdf_path: The PDF file.
+        output_path: The chunk file to write.
+        display_name: The textbook's display name. Defaults to the PDF file name.
+        executor: Runs page extraction, e.g. a ProcessPoolExecutor.
+        chapter: Only (re)process this chapter, named as in the PDF outline. Its
+            chunks replace the chapter's chunks in `output_path`.
+        max_words: Target chunk length in words.
+        overlap_words: Words shared by consecutive chunks of a chapter.
+
+    Returns:
+        The number of chunks written.
+    """
+    display_name = display_name or os.path.basename(pdf_path)
+    title, first, last = find_chapter(pdf_path, chapter) if chapter else (None, 1, None)
+    pages = iter_pages(pdf_path, executor=executor, first=first, last=last)
+    chunks = chunk_pages(pages, display_name, max_words=max_words, overlap_words=overlap_words)
+    if title is not None:
+        # The first page of the chapter may end the previous one.
+        chunks = (c for c in chunks if c.chapter == title)
+    return write_chunks(chunks, output_path, replace_chapter=title)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Extract and chunk a textbook PDF into a JSONL chunk file.')
+    parser.add_argument('pdf', help='The textbook PDF.')
+    parser.add_argument('--output', required=True, help='The JSONL chunk file to write.')
+    parser.add_argument('--display-name', help='Display name of the textbook. Defaults to the file name.')
+    parser.add_argument('--chapter', help='Only reprocess this chapter (as named in the PDF outline).')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Extraction processes.')
+    parser.add_argument('--max-words', type=int, default=DEFAULT_MAX_WORDS)
+    parser.add_argument('--overlap-words', type=int, default=DEFAULT_OVERLAP_WORDS)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        written = chunk_pdf(
+            args.pdf,
+            args.output,
+            display_name=args.display_name,
+            executor=executor,
+            chapter=args.chapter,
+            max_words=args.max_words,
+            overlap_words=args.overlap_words,
+        )
+    print(f'Wrote {written} chunk(s) to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resumable, pooled downloader for textbook PDFs.
+
+Textbooks are fetched from Cloud Storage or Firebase Storage, and downloading
+them is usually the slowest part of ingestion. PdfDownloader:
+
+- shares one requests.Session with a connection pool, so concurrent downloads
+  from the same host reuse connections, and retries connection errors and
+  429/5xx responses;
+- streams to a `.part` file in 1 MiB blocks and records its progress next to
+  it, so an interrupted download resumes with an HTTP Range request instead of
+  starting over (If-Range makes the server send the whole file if it changed);
+- asks for the first byte of a file before downloading it, which tells its size
+  and whether the server accepts ranges without transferring the body, and
+  downloads large files as several byte ranges in parallel when it does;
+- sends If-None-Match / If-Modified-Since for files it already downloaded, and
+  keeps the local copy when the server answers 304 Not Modified;
+- checks the size, the MD5 that Cloud Storage reports in x-goog-hash, and an
+  expected sha256 if one is given.
+
+The state of each download is kept in `<output_path>.download.json`, so it
+survives across runs when the output directory does.
+"""
+
+import base64
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = (10.0, 120.0)  # (connect, read) seconds
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Files of at least 2 * DEFAULT_MIN_SEGMENT_BYTES are fetched in up to
+# DEFAULT_SEGMENTS parallel ranges.
+DEFAULT_SEGMENTS = 4
+DEFAULT_MIN_SEGMENT_BYTES = 8 << 20
+# Attempts per download when a transfer breaks off midway; each one resumes.
+DEFAULT_MAX_ATTEMPTS = 4
+# Progress is saved every this many blocks of a segment.
+_SAVE_EVERY_BLOCKS = 16
+
+_TRANSFER_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+
+class ChecksumMismatch(Exception):
+    """The downloaded file does not have the expected size or checksum."""
+
+
+class _Restart(Exception):
+    """The file changed on the server while resuming; start over."""
+
+
+@dataclasses.dataclass
+class DownloadResult:
+    """What download() did.
+
+    Attributes:
+        path: The downloaded file.
+        status: "downloaded", "resumed" (a partial download was completed) or
+            "not_modified" (the local copy is current).
+        bytes_transferred: Body bytes received in this call.
+        sha256: Hex digest of the file.
+        etag: The server's ETag for the file, if any.
+        last_modified: The server's Last-Modified for the file, if any.
+    """
+
+    path: str
+    status: str
+    bytes_transferred: int
+    sha256: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+@dataclasses.dataclass
+class _Segment:
+    start: int
+    end: int  # inclusive; -1 when the size is unknown
+    done: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.end >= 0 and self.start + self.done > self.end
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = 3) -> requests.Session:
+    """Returns a session with a connection pool of `pool_size` per host.
+
+    Connection errors and 429/5xx responses are retried with exponential backoff
+    before any body is read.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _expected_md5(headers: Mapping[str, str]) -> str | None:
+    """Returns the hex MD5 from a Cloud Storage x-goog-hash header, if any."""
+    for value in headers.get('x-goog-hash', '').split(','):
+        kind, _, digest = value.strip().partition('=')
+        if kind == 'md5' and digest:
+            return base64.b64decode(digest).hex()
+    return None
+
+
+def _file_digests(path: str) -> tuple[str, str]:
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DEFAULT_BLOCK_SIZE), b''):
+            sha256.update(block)
+            md5.update(block)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+class _State:
+    """The progress of one download, saved to `<output_path>.download.json`."""
+
+    def __init__(self, output_path: str, url: str):
+        self.path = output_path + '.download.json'
+        self.url = url
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.size: int | None = None
+        self.md5: str | None = None
+        self.sha256: str | None = None
+        self.segments: list[_Segment] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, output_path: str, url: str) -> '_State':
+        state = cls(output_path, url)
+        try:
+            with open(state.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return state
+        if data.get('url') != url:
+            return state
+        state.etag = data.get('etag')
+        state.last_modified = data.get('last_modified')
+        state.size = data.get('size')
+        state.md5 = data.get('md5')
+        state.sha256 = data.get('sha256')
+        state.segments = [_Segment(**s) for s in data.get('segments', [])]
+        return state
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                'url': self.url,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'size': self.size,
+                'md5': self.md5,
+                'sha256': self.sha256,
+                'segments': [dataclasses.asdict(s) for s in self.segments],
+            }
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+
+    def same_version(self, headers: Mapping[str, str]) -> bool:
+        """Whether `headers` describe the file this state was recorded for."""
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if etag or self.etag:
+            return etag == self.etag
+        return bool(last_modified) and last_modified == self.last_modified
+
+    def validator(self) -> str | None:
+        return self.etag or self.last_modified
+
+
+class PdfDownloader:
+    """Downloads files with pooled connections, resume and parallel ranges.
+
+    One downloader can be shared by several threads.
+
+    Args:
+        session: The session to download with. Defaults to create_session().
+        segments: Maximum number of byte ranges a file is fetched in.
+        min_segment_bytes: Minimum size of a range; smaller files are fetched in
+            a single request.
+        block_size: Bytes read and written at a time.
+        timeout: (connect, read) timeout of each request, in seconds.
+        max_attempts: Attempts per download when the transfer breaks off.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        segments: int = DEFAULT_SEGMENTS,
+        min_segment_bytes: int = DEFAULT_MIN_SEGMENT_BYTES,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.session = session or create_session()
+        self.segments = max(1, segments)
+        self.min_segment_bytes = min_segment_bytes
+        self.block_size = block_size
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+    def download(self, url: str, output_path: str, expected_sha256: str | None = None) -> DownloadResult:
+        """Downloads `url` to `output_path`, reusing what is already on disk.
+
+        Args:
+            url: The file to download.
+            output_path: Where to write it.
+            expected_sha256: The sha256 the file must have, if known.
+
+        Returns:
+            A DownloadResult.
+
+        Raises:
+            requests.HTTPError: The server answered with an error status.
+            ChecksumMismatch: The file has the wrong size or checksum; the
+                download is discarded.
+        """
+        part_path = output_path + '.part'
+        state = _State.load(output_path, url)
+
+        response: requests.Response | None
+        if os.path.exists(output_path) and state.sha256 and state.validator():
+            response = self._probe(url, headers={
+                k: v for k, v in (('If-None-Match', state.etag), ('If-Modified-Since', state.last_modified)) if v
+            })
+            if response.status_code == 304:
+                response.close()
+                if expected_sha256 and expected_sha256 != state.sha256:
+                    raise ChecksumMismatch(f'{output_path} is not modified but its sha256 is {state.sha256}')
+                logger.info('%s is not modified; keeping %s', url, output_path)
+                return DownloadResult(output_path, 'not_modified', 0, state.sha256, state.etag, state.last_modified)
+        else:
+            response = self._probe(url)
+
+        resumed = False
+        transferred = 0
+        for attempt in range(self.max_attempts):
+            if response is None:
+                response = self._probe(url)
+            try:
+                # A 206 answer to the probe holds one byte; the file is then
+                # fetched with range requests. Servers that ignore ranges send
+                # the whole file, which is streamed from the probe itself.
+                ranges = response.status_code == 206
+                headers = response.headers
+                body: requests.Response | None = None
+                if ranges:
+                    response.raw.read()  # the one byte, so that the connection is reused
+                    response.close()
+                else:
+                    body = response
+                response = None
+                resuming = ranges and os.path.exists(part_path) and state.segments and state.same_version(headers)
+                if not resuming:
+                    self._start(state, headers, ranges, part_path)
+                else:
+                    resumed = True
+                transferred += self._fetch(url, state, part_path, body)
+                break
+            except _Restart:
+                logger.info('%s changed on the server; restarting its download', url)
+                state.segments = []
+            except _TRANSFER_ERRORS as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                logger.info('Download of %s interrupted (%s); resuming', url, e)
+            finally:
+                if body is not None:
+                    body.close()
+                state.save()
+
+        sha256, md5 = _file_digests(part_path)
+        size = os.path.getsize(part_path)
+        try:
+            if state.size is not None and size != state.size:
+                raise ChecksumMismatch(f'{url}: got {size} bytes, expected {state.size}')
+            if state.md5 and md5 != state.md5:
+                raise ChecksumMismatch(f'{url}: MD5 {md5} does not match x-goog-hash {state.md5}')
+            if expected_sha256 and sha256 != expected_sha256:
+                raise ChecksumMismatch(f'{url}: sha256 {sha256} does not match the expected {expected_sha256}')
+        except ChecksumMismatch:
+            os.remove(part_path)
+            os.remove(state.path)
+            raise
+
+        os.replace(part_path, output_path)
+        state.sha256 = sha256
+        state.segments = []
+        state.save()
+        logger.info('Downloaded %s to %s (%d bytes)', url, output_path, size)
+        return DownloadResult(
+            output_path, 'resumed' if resumed else 'downloaded', transferred, sha256, state.etag, state.last_modified
+        )
+
+    def _get(self, url: str, headers: dict | None = None) -> requests.Response:
+        response = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        return response
+
+    def _probe(self, url: str, headers: dict | None = None) -> requests.Response:
+        """Asks for the first byte of `url`, to learn its size and range support."""
+        response = self.session.get(
+            url, headers={**(headers or {}), 'Range': 'bytes=0-0'}, stream=True, timeout=self.timeout
+        )
+        if response.status_code == 416:  # an empty file has no first byte
+            response.close()
+            return self._get(url, headers=headers)
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        return response
+
+    def _start(self, state: _State, headers: Mapping[str, str], ranges: bool, part_path: str) -> None:
+        """Plans a fresh download from the headers of the probe response.
+
+        With `ranges`, the headers are those of a 206 response, whose
+        Content-Range gives the size; otherwise of a full 200 response.
+        """
+        if ranges:
+            total = headers.get('Content-Range', '').rpartition('/')[2]
+            size = int(total) if total.isdigit() else None
+        else:
+            length = headers.get('Content-Length')
+            encoded = headers.get('Content-Encoding', 'identity') != 'identity'
+            size = int(length) if length and not encoded else None
+        state.size = size
+        state.etag = headers.get('ETag')
+        state.last_modified = headers.get('Last-Modified')
+        state.md5 = _expected_md5(headers)
+        state.sha256 = None
+
+        if size is None:
+            state.segments = [_Segment(0, -1)]
+        else:
+            count = 1
+            if ranges and size >= 2 * self.min_segment_bytes:
+                count = min(self.segments, size // self.min_segment_bytes)
+            bounds = [size * i // count for i in range(count + 1)]
+            state.segments = [_Segment(bounds[i], bounds[i + 1] - 1) for i in range(count)]
+        with open(part_path, 'wb') as f:
+            if size:
+                f.truncate(size)
+
+    def _fetch(self, url: str, state: _State, part_path: str, response: requests.Response | None) -> int:
+        """Fetches the unfinished segments; the first one may use `response`."""
+        pending = [s for s in state.segments if not s.complete]
+        if response is not None and pending and (pending[0].start != 0 or pending[0].done):
+            response.close()
+            response = None
+        if len(pending) <= 1:
+            return sum(self._fetch_segment(url, state, part_path, s, response) for s in pending)
+        if response is not None:
+            response.close()
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='range') as executor:
+            futures = [executor.submit(self._fetch_segment, url, state, part_path, s, None) for s in pending]
+            return sum(f.result() for f in futures)
+
+    def _fetch_segment(
+        self,
+        url: str,
+        state: _State,
+        part_path: str,
+        segment: _Segment,
+        response: requests.Response | None,
+    ) -> int:
+        if response is None:
+            end = '' if segment.end < 0 else segment.end
+            headers = {'Range': f'bytes={segment.start + segment.done}-{end}'}
+            validator = state.validator()
+            if validator:
+                headers['If-Range'] = validator
+            response = self._get(url, headers=headers)
+            if response.status_code != 206:
+                response.close()
+                raise _Restart()
+
+        transferred = 0
+        try:
+            with open(part_path, 'r+b') as f:
+                f.seek(segment.start + segment.done)
+                remaining = None if segment.end < 0 else segment.end + 1 - segment.start - segment.done
+                for count, block in enumerate(response.iter_content(chunk_size=self.block_size), start=1):
+                    if remaining is not None:
+                        block = block[:remaining]
+                        remaining -= len(block)
+                    f.write(block)
+                    segment.done += len(block)
+                    transferred += len(block)
+                    if count % _SAVE_EVERY_BLOCKS == 0:
+                        f.flush()
+                        state.save()
+                    if remaining == 0:
+                        break
+        finally:
+            response.close()
+        if segment.end < 0:
+            segment.end = segment.start + segment.done - 1
+        return transferred
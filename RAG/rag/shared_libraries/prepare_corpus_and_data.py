@@ -18,8 +18,20 @@ import vertexai
 from vertexai.preview import rag
 import os
 from dotenv import load_dotenv, set_key
-import requests
 import tempfile
+import argparse
+import contextlib
+import dataclasses
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tabulate import tabulate
+
+from .pdf_downloader import PdfDownloader
+from .retrieval_cache import RetrievalCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -74,6 +86,39 @@ TEXTBOOKS = [
 
 ENV_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".env"))
 
+# Records which PDF (by sha256) each uploaded textbook came from, so re-runs only
+# upload new or changed textbooks. Override with INGESTION_MANIFEST_PATH.
+INGESTION_MANIFEST_PATH = os.getenv(
+    "INGESTION_MANIFEST_PATH",
+    os.path.join(os.path.dirname(ENV_FILE_PATH), "ingestion_manifest.json"),
+)
+
+# --- Ingestion Configuration ---
+# Downloads and uploads run in separate thread pools, so a textbook is uploaded as
+# soon as it has been downloaded while the next ones are still downloading.
+# Uploads are kept low because the embedding model quota is usually the limit.
+DEFAULT_DOWNLOAD_WORKERS = 4
+DEFAULT_UPLOAD_WORKERS = 2
+# Downloads share one connection pool; large PDFs are fetched in parallel byte
+# ranges and interrupted downloads resume (see pdf_downloader.py).
+DEFAULT_DOWNLOAD_SEGMENTS = 4
+# Uploads that fail with ResourceExhausted (429) are retried with exponential
+# backoff and full jitter: attempt n waits a random time in [0, min(max, base * 2^n)].
+UPLOAD_MAX_ATTEMPTS = 6
+UPLOAD_BACKOFF_BASE_SECONDS = 2.0
+UPLOAD_BACKOFF_MAX_SECONDS = 60.0
+# With --chunks-dir, each downloaded PDF is also extracted and chunked locally
+# (see pdf_chunker.py), its pages spread over this many processes.
+DEFAULT_CHUNK_WORKERS = os.cpu_count() or 1
+
+# Keeps progress lines from concurrent workers from interleaving mid-line.
+_print_lock = threading.Lock()
+
+
+def log(message: str) -> None:
+  with _print_lock:
+    print(message, flush=True)
+
 
 # --- Start of the script ---
 def initialize_vertex_ai():
@@ -105,41 +150,79 @@ def create_or_get_corpus():
   return corpus
 
 
-def download_pdf_from_url(url, output_path):
-  """Downloads a PDF file from the specified URL."""
-  print(f"Downloading PDF from {url}...")
-  response = requests.get(url, stream=True)
-  response.raise_for_status()  # Raise an exception for HTTP errors
-  
-  with open(output_path, 'wb') as f:
-    for chunk in response.iter_content(chunk_size=8192):
-      f.write(chunk)
-  
-  print(f"PDF downloaded successfully to {output_path}")
+_downloader: PdfDownloader | None = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader(segments: int = DEFAULT_DOWNLOAD_SEGMENTS) -> PdfDownloader:
+  """Returns the downloader shared by all download threads."""
+  global _downloader
+  with _downloader_lock:
+    if _downloader is None:
+      _downloader = PdfDownloader(segments=segments)
+    return _downloader
+
+
+def download_pdf_from_url(url: str, output_path: str, expected_sha256: str | None = None,
+                          downloader: PdfDownloader | None = None) -> str:
+  """Downloads a PDF file from the specified URL.
+
+  A partial download left at `output_path` by an earlier run is resumed, and a
+  complete one is kept if the server reports it unchanged.
+  """
+  log(f"Downloading PDF from {url}...")
+  result = (downloader or get_downloader()).download(url, output_path, expected_sha256=expected_sha256)
+  if result.status == "not_modified":
+    log(f"PDF at {output_path} is up to date")
+  else:
+    log(f"PDF {result.status} successfully to {output_path} ({result.bytes_transferred / 1e6:.1f} MB)")
   return output_path
 
 
-def upload_pdf_to_corpus(corpus_name, pdf_path, display_name, description):
-  """Uploads a PDF file to the specified corpus."""
-  print(f"Uploading {display_name} to corpus...")
-  try:
-    rag_file = rag.upload_file(
-        corpus_name=corpus_name,
-        path=pdf_path,
-        display_name=display_name,
-        description=description,
-    )
-    print(f"Successfully uploaded {display_name} to corpus")
-    return rag_file
-  except ResourceExhausted as e:
-    print(f"Error uploading file {display_name}: {e}")
-    print("\nThis error suggests that you have exceeded the API quota for the embedding model.")
-    print("This is common for new Google Cloud projects.")
-    print("Please see the 'Troubleshooting' section in the README.md for instructions on how to request a quota increase.")
-    return None
-  except Exception as e:
-    print(f"Error uploading file {display_name}: {e}")
-    return None
+def backoff_delay(attempt: int, base: float = UPLOAD_BACKOFF_BASE_SECONDS,
+                  maximum: float = UPLOAD_BACKOFF_MAX_SECONDS) -> float:
+  """Returns a random delay before retry `attempt` (0-based), with full jitter."""
+  return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def upload_pdf_to_corpus(corpus_name: str, pdf_path: str, display_name: str, description: str,
+                         max_attempts: int = UPLOAD_MAX_ATTEMPTS,
+                         stats: dict[str, int] | None = None) -> rag.RagFile | None:
+  """Uploads a PDF file to the specified corpus.
+
+  ResourceExhausted errors are retried up to `max_attempts` times in total with
+  exponential backoff and jitter. If `stats` is a dict, the number of attempts
+  is recorded in stats["attempts"].
+  """
+  for attempt in range(max_attempts):
+    if stats is not None:
+      stats["attempts"] = attempt + 1
+    log(f"Uploading {display_name} to corpus...")
+    try:
+      rag_file = rag.upload_file(
+          corpus_name=corpus_name,
+          path=pdf_path,
+          display_name=display_name,
+          description=description,
+      )
+      log(f"Successfully uploaded {display_name} to corpus")
+      return rag_file
+    except ResourceExhausted as e:
+      if attempt + 1 < max_attempts:
+        delay = backoff_delay(attempt)
+        log(f"Quota exceeded uploading {display_name}; retrying in {delay:.1f}s "
+            f"(attempt {attempt + 2}/{max_attempts})")
+        time.sleep(delay)
+        continue
+      log(f"Error uploading file {display_name}: {e}")
+      log("\nThis error suggests that you have exceeded the API quota for the embedding model.")
+      log("This is common for new Google Cloud projects.")
+      log("Please see the 'Troubleshooting' section in the README.md for instructions on how to request a quota increase.")
+      return None
+    except Exception as e:
+      log(f"Error uploading file {display_name}: {e}")
+      return None
+  return None
 
 def update_env_file(corpus_name, env_file_path):
     """Updates the .env file with the corpus name."""
@@ -149,56 +232,323 @@ def update_env_file(corpus_name, env_file_path):
     except Exception as e:
         print(f"Error updating .env file: {e}")
 
-def list_corpus_files(corpus_name):
-  """Lists files in the specified corpus."""
+def list_corpus_files(corpus_name: str, verbose: bool = True) -> list:
+  """Lists files in the specified corpus and returns them."""
   files = list(rag.list_files(corpus_name=corpus_name))
-  print(f"Total files in corpus: {len(files)}")
+  if verbose:
+    print(f"Total files in corpus: {len(files)}")
+    for file in files:
+      print(f"File: {file.display_name} - {file.name}")
+  return files
+
+
+def file_sha256(path: str) -> str:
+  """Returns the sha256 hex digest of a file."""
+  digest = hashlib.sha256()
+  with open(path, "rb") as f:
+    for block in iter(lambda: f.read(1 << 20), b""):
+      digest.update(block)
+  return digest.hexdigest()
+
+
+class IngestionManifest:
+  """Persistent record of the RAG file uploaded for each textbook.
+
+  Maps each textbook display name to the sha256 of the PDF it was uploaded from
+  and the resulting RAG file. The manifest is saved after every change, so it
+  doubles as a checkpoint: an interrupted run resumes by skipping the textbooks
+  that were already uploaded.
+  """
+
+  def __init__(self, path: str, corpus_name: str) -> None:
+    self.path = path
+    self.corpus_name = corpus_name
+    self.textbooks: dict[str, dict] = {}
+    self._lock = threading.Lock()
+    if os.path.exists(path):
+      with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+      if data.get("corpus") == corpus_name:
+        self.textbooks = data.get("textbooks", {})
+      else:
+        log(f"Ignoring ingestion manifest {path}: it was written for corpus {data.get('corpus')}")
+
+  def get(self, display_name: str) -> dict | None:
+    with self._lock:
+      return self.textbooks.get(display_name)
+
+  def rag_file_name(self, display_name: str) -> str | None:
+    """Returns the RAG file recorded for a textbook, or None if there is none."""
+    entry = self.get(display_name)
+    return entry["rag_file_name"] if entry is not None else None
+
+  def record(self, display_name: str, sha256: str | None, rag_file_name: str | None) -> None:
+    with self._lock:
+      self.textbooks[display_name] = {
+          "sha256": sha256,
+          "rag_file_name": rag_file_name,
+          "uploaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+      }
+      self._save()
+
+  def forget(self, display_name: str) -> None:
+    with self._lock:
+      self.textbooks.pop(display_name, None)
+      self._save()
+
+  def _save(self) -> None:
+    tmp_path = f"{self.path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+      json.dump({"corpus": self.corpus_name, "textbooks": self.textbooks}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, self.path)
+
+
+def group_files_by_display_name(files: list) -> dict[str, list[str]]:
+  """Returns {display_name: [RAG file resource names]} for a list of RAG files."""
+  grouped: dict[str, list[str]] = {}
   for file in files:
-    print(f"File: {file.display_name} - {file.name}")
+    grouped.setdefault(file.display_name, []).append(file.name)
+  return grouped
+
+
+def is_up_to_date(manifest: IngestionManifest, remote_files: dict[str, list], display_name: str,
+                  sha256: str | None) -> bool:
+  """Whether the corpus already holds this exact PDF for the textbook."""
+  entry = manifest.get(display_name)
+  return (
+      entry is not None
+      and entry["sha256"] == sha256
+      and entry["rag_file_name"] in remote_files.get(display_name, [])
+  )
+
+
+def delete_rag_files(names: list[str]) -> None:
+  """Deletes RAG files, logging (not raising) failures."""
+  for name in names:
+    try:
+      rag.delete_file(name=name)
+      log(f"Deleted {name}")
+    except Exception as e:
+      log(f"Error deleting {name}: {e}")
 
 
-def process_textbook(corpus_name, textbook, temp_dir=None):
-    """Process a single textbook: download if needed and upload to corpus."""
+def remove_stale_copies(remote_files: dict[str, list], display_name: str, keep_name: str | None) -> None:
+  """Deletes every RAG file for a textbook except `keep_name`.
+
+  This removes the previous version of a changed textbook as well as duplicates
+  left by earlier runs, or by a run interrupted after an upload but before the
+  manifest was saved.
+  """
+  delete_rag_files([name for name in remote_files.get(display_name, []) if name != keep_name])
+
+
+def prune_removed_textbooks(manifest: IngestionManifest, textbooks: list[dict],
+                            remote_files: dict[str, list]) -> list[str]:
+  """Deletes the RAG files of textbooks that are no longer configured.
+
+  Only textbooks recorded in the manifest are pruned, so files uploaded by other
+  means are left alone. Returns the display names that were pruned.
+  """
+  configured = {textbook_names(t)[0] for t in textbooks}
+  removed = [name for name in list(manifest.textbooks) if name not in configured]
+  for display_name in removed:
+    log(f"{display_name} is no longer configured; removing it from the corpus")
+    delete_rag_files(remote_files.get(display_name, []))
+    manifest.forget(display_name)
+  return removed
+
+
+def textbook_names(textbook: dict) -> tuple[str, str]:
+    """Returns the display name and description of a textbook entry."""
     board = textbook.get("board", "Unknown")
     grade = textbook.get("grade", "Unknown")
     subject = textbook.get("subject", "Unknown")
     display_name = textbook.get("display_name", f"{board}_{grade}_{subject}.pdf")
     description = textbook.get("description", f"{board} {grade} {subject} Textbook")
+    return display_name, description
+
+
+def resolve_textbook_pdf(textbook: dict, temp_dir: str | None = None) -> str | None:
+    """Returns the local path of a textbook's PDF, downloading it if needed.
+
+    Returns None (after printing why) if the PDF is not available.
+    """
+    display_name, _ = textbook_names(textbook)
     pdf_url = textbook.get("pdf_url")
     pdf_path = textbook.get("pdf_path")
-    
-    # Determine the source PDF path
+
     if pdf_path:
         # Use local file
         if not os.path.exists(pdf_path):
-            print(f"Warning: Local file not found at {pdf_path}. Skipping {display_name}.")
+            log(f"Warning: Local file not found at {pdf_path}. Skipping {display_name}.")
             return None
-        source_pdf_path = pdf_path
-    elif pdf_url:
+        return pdf_path
+    if pdf_url:
         # Download from URL
         if temp_dir is None:
             raise ValueError("temp_dir must be provided when downloading from URL")
         downloaded_path = os.path.join(temp_dir, display_name)
         try:
-            download_pdf_from_url(pdf_url, downloaded_path)
-            source_pdf_path = downloaded_path
+            return download_pdf_from_url(pdf_url, downloaded_path, expected_sha256=textbook.get("sha256"))
         except Exception as e:
-            print(f"Error downloading {display_name} from URL: {e}. Skipping.")
+            log(f"Error downloading {display_name} from URL: {e}. Skipping.")
             return None
-    else:
-        print(f"Warning: No pdf_url or pdf_path provided for {display_name}. Skipping.")
-        return None
-    
-    # Upload to corpus
-    return upload_pdf_to_corpus(
-        corpus_name=corpus_name,
-        pdf_path=source_pdf_path,
-        display_name=display_name,
-        description=description
-    )
+    log(f"Warning: No pdf_url or pdf_path provided for {display_name}. Skipping.")
+    return None
+
+
+@dataclasses.dataclass
+class IngestionResult:
+  """Outcome and timing of one textbook."""
+  display_name: str
+  status: str = "pending"
+  download_seconds: float = 0.0
+  upload_seconds: float = 0.0
+  chunk_seconds: float = 0.0
+  chunks: int | None = None
+  attempts: int = 0
+  rag_file: object | None = None
+
+
+def chunk_file_path(chunks_dir: str, display_name: str) -> str:
+  """Returns the path of a textbook's JSONL chunk file in `chunks_dir`."""
+  return os.path.join(chunks_dir, os.path.splitext(display_name)[0] + ".jsonl")
+
+
+def ingest_textbooks(corpus_name: str, textbooks: list[dict], temp_dir: str | None,
+                     download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+                     upload_workers: int = DEFAULT_UPLOAD_WORKERS,
+                     manifest: IngestionManifest | None = None,
+                     remote_files: dict[str, list] | None = None,
+                     chunks_dir: str | None = None,
+                     chunk_executor: Executor | None = None) -> list[IngestionResult]:
+  """Downloads and uploads textbooks concurrently.
+
+  Downloads run on `download_workers` threads and uploads on `upload_workers`
+  threads. Each textbook is queued for upload as soon as its download finishes.
+
+  With a manifest (and `remote_files`, the corpus files grouped by display
+  name), textbooks whose PDF is unchanged are not uploaded again, and older
+  copies of changed textbooks are deleted once the new version is uploaded.
+
+  With `chunks_dir`, each PDF is also chunked into `chunks_dir` alongside its
+  upload, its pages extracted on `chunk_executor` (e.g. a ProcessPoolExecutor).
+  Unchanged textbooks that already have a chunk file are not chunked again.
+
+  Returns:
+    A list of IngestionResult, in the order of `textbooks`.
+  """
+  results = [IngestionResult(textbook_names(t)[0]) for t in textbooks]
+  remote_files = remote_files or {}
+
+  def download(index: int) -> tuple[str | None, str | None]:
+    start = time.perf_counter()
+    path = resolve_textbook_pdf(textbooks[index], temp_dir)
+    sha256 = file_sha256(path) if path and manifest is not None else None
+    results[index].download_seconds = time.perf_counter() - start
+    return path, sha256
+
+  def upload(index: int, path: str, sha256: str | None) -> None:
+    display_name, description = textbook_names(textbooks[index])
+    replaces = bool(remote_files.get(display_name))
+    stats: dict[str, int] = {}
+    start = time.perf_counter()
+    rag_file = upload_pdf_to_corpus(corpus_name, path, display_name, description, stats=stats)
+    results[index].upload_seconds = time.perf_counter() - start
+    results[index].attempts = stats.get("attempts", 0)
+    results[index].rag_file = rag_file
+    if not rag_file:
+      results[index].status = "upload failed"
+      return
+    results[index].status = "replaced" if replaces else "uploaded"
+    if manifest is not None:
+      manifest.record(display_name, sha256, rag_file.name)
+      remove_stale_copies(remote_files, display_name, rag_file.name)
+
+  def chunk(index: int, path: str, output_path: str) -> None:
+    from .pdf_chunker import chunk_pdf
+
+    start = time.perf_counter()
+    try:
+      results[index].chunks = chunk_pdf(path, output_path,
+                                        display_name=results[index].display_name, executor=chunk_executor)
+    except Exception as e:
+      log(f"Error chunking {results[index].display_name}: {e}")
+    results[index].chunk_seconds = time.perf_counter() - start
+
+  if chunks_dir:
+    os.makedirs(chunks_dir, exist_ok=True)
+  with ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="download") as downloads, \
+       ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="upload") as uploads, \
+       ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunk") as chunking:
+    pending_downloads = {downloads.submit(download, i): i for i in range(len(textbooks))}
+    pending_work: list[Future[None]] = []
+    for future in as_completed(pending_downloads):
+      index = pending_downloads[future]
+      display_name = results[index].display_name
+      try:
+        path, sha256 = future.result()
+      except Exception as e:
+        # Leave the other textbooks running, as a failed upload does.
+        log(f"Error downloading {display_name}: {e}")
+        results[index].status = "download failed"
+        continue
+      if path is None:
+        results[index].status = "unavailable"
+        continue
+      unchanged = manifest is not None and is_up_to_date(manifest, remote_files, display_name, sha256)
+      if chunks_dir and not (unchanged and os.path.exists(chunk_file_path(chunks_dir, display_name))):
+        pending_work.append(chunking.submit(chunk, index, path, chunk_file_path(chunks_dir, display_name)))
+      if unchanged and manifest is not None:
+        results[index].status = "unchanged"
+        remove_stale_copies(remote_files, display_name, manifest.rag_file_name(display_name))
+        continue
+      results[index].status = "uploading"
+      pending_work.append(uploads.submit(upload, index, path, sha256))
+    for work in as_completed(pending_work):
+      work.result()
+
+  return results
+
+
+def print_ingestion_report(results: list[IngestionResult], elapsed_seconds: float) -> None:
+  """Prints per-file timing and the overall throughput."""
+  rows = [
+      [r.display_name, r.status, f"{r.download_seconds:.1f}", f"{r.upload_seconds:.1f}", r.attempts,
+       "" if r.chunks is None else r.chunks, f"{r.chunk_seconds:.1f}"]
+      for r in results
+  ]
+  print(tabulate(rows, headers=["textbook", "status", "download s", "upload s", "upload attempts",
+                                "chunks", "chunk s"]))
+  serial_seconds = sum(r.download_seconds + r.upload_seconds + r.chunk_seconds for r in results)
+  print(f"\nWall time: {elapsed_seconds:.1f}s (serial equivalent: {serial_seconds:.1f}s)")
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Create the RAG corpus and upload the configured textbooks.")
+  parser.add_argument("--download-workers", type=int, default=DEFAULT_DOWNLOAD_WORKERS,
+                      help="Number of concurrent downloads.")
+  parser.add_argument("--download-segments", type=int, default=DEFAULT_DOWNLOAD_SEGMENTS,
+                      help="Maximum number of parallel byte ranges per large PDF download.")
+  parser.add_argument("--download-dir",
+                      help="Keep downloaded PDFs in this directory instead of a temporary one, so "
+                           "later runs resume partial downloads and skip unchanged files.")
+  parser.add_argument("--upload-workers", type=int, default=DEFAULT_UPLOAD_WORKERS,
+                      help="Number of concurrent uploads. Lower this if you hit embedding quota limits.")
+  parser.add_argument("--manifest", default=INGESTION_MANIFEST_PATH,
+                      help="Path of the ingestion manifest used to skip unchanged textbooks.")
+  parser.add_argument("--keep-removed", action="store_true",
+                      help="Do not delete textbooks that were removed from TEXTBOOKS.")
+  parser.add_argument("--chunks-dir",
+                      help="Also extract and chunk each PDF into a JSONL chunk file in this directory, "
+                           "with chapter, section and page metadata.")
+  parser.add_argument("--chunk-workers", type=int, default=DEFAULT_CHUNK_WORKERS,
+                      help="Number of processes extracting PDF pages for --chunks-dir.")
+  return parser.parse_args()
 
 
 def main():
+  args = parse_args()
   initialize_vertex_ai()
   corpus = create_or_get_corpus()
 
@@ -214,18 +564,47 @@ def main():
   # Process all textbooks
   print(f"\nProcessing {len(TEXTBOOKS)} textbook(s)...")
   
+  # Reconcile the configured textbooks with what the corpus already holds
+  manifest = IngestionManifest(args.manifest, corpus.name)
+  remote_files = group_files_by_display_name(list_corpus_files(corpus.name, verbose=False))
+
   # Create a temporary directory for downloaded PDFs
-  with tempfile.TemporaryDirectory() as temp_dir:
-      uploaded_count = 0
-      for i, textbook in enumerate(TEXTBOOKS, 1):
-          print(f"\n[{i}/{len(TEXTBOOKS)}] Processing: {textbook.get('display_name', 'Unknown')}")
-          result = process_textbook(corpus.name, textbook, temp_dir)
-          if result:
-              uploaded_count += 1
-  
+  start = time.perf_counter()
+  get_downloader(segments=args.download_segments)
+  if args.download_dir:
+      os.makedirs(args.download_dir, exist_ok=True)
+  # Only start the page extraction processes when chunking is asked for.
+  chunk_pool = (ProcessPoolExecutor(max_workers=args.chunk_workers) if args.chunks_dir
+                else contextlib.nullcontext())
+  with tempfile.TemporaryDirectory() as temp_dir, chunk_pool as chunk_executor:
+      temp_dir = args.download_dir or temp_dir
+      results = ingest_textbooks(
+          corpus.name,
+          TEXTBOOKS,
+          temp_dir,
+          download_workers=args.download_workers,
+          upload_workers=args.upload_workers,
+          manifest=manifest,
+          remote_files=remote_files,
+          chunks_dir=args.chunks_dir,
+          chunk_executor=chunk_executor,
+      )
+  uploaded_count = sum(1 for r in results if r.rag_file)
+  unchanged_count = sum(1 for r in results if r.status == "unchanged")
+  removed = [] if args.keep_removed else prune_removed_textbooks(manifest, TEXTBOOKS, remote_files)
+
   print(f"\n{'='*60}")
-  print(f"Upload complete: {uploaded_count}/{len(TEXTBOOKS)} textbook(s) uploaded successfully")
+  print_ingestion_report(results, time.perf_counter() - start)
   print(f"{'='*60}")
+  print(f"Upload complete: {uploaded_count}/{len(TEXTBOOKS)} textbook(s) uploaded successfully, "
+        f"{unchanged_count} unchanged, {len(removed)} removed")
+  print(f"{'='*60}")
+
+  # The corpus changed, so cached retrieval results for it are stale.
+  retrieval_cache_dir = os.getenv("RETRIEVAL_CACHE_DIR")
+  if (uploaded_count or removed) and retrieval_cache_dir:
+      RetrievalCache(cache_dir=retrieval_cache_dir).invalidate_corpus(corpus.name)
+      print(f"Invalidated cached retrieval results in {retrieval_cache_dir}")
   
   # List all files in the corpus
   print("\nFiles in corpus:")
@@ -0,0 +1,350 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process cache for RAG retrieval results.
+
+A class of students asking about "photosynthesis" should not hit the RAG Engine
+once per student. RetrievalCache keeps recent retrieval results in memory with
+LRU eviction and a TTL, and can optionally persist them to a directory so that
+they survive restarts and are shared between worker processes on one machine.
+
+Entries are keyed on the normalized query plus everything else that changes the
+result: the corpus, similarity_top_k and vector_distance_threshold. When textbooks
+are added to or removed from a corpus, call invalidate_corpus() (the corpus
+preparation script does this) so stale results are not served. With a cache
+directory, the invalidation is recorded there too, and other processes sharing
+the directory drop their in-memory entries for the corpus when they next check
+for invalidations (at most every `invalidation_check_seconds`).
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_INVALIDATION_CHECK_SECONDS = 5.0
+
+# Subdirectory of the cache directory holding one file per invalidated corpus,
+# named like the corpus directory and containing the time of the invalidation.
+_INVALIDATIONS_DIR = 'invalidations'
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a query so trivially different phrasings share a cache entry."""
+    query = re.sub(r'\s+', ' ', (query or '').lower()).strip()
+    return query.rstrip('?!. ')
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters describing how the cache has been used."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclasses.dataclass
+class _Entry:
+    corpus: str
+    value: Any
+    stored_at: float
+
+
+class RetrievalCache:
+    """LRU + TTL cache for retrieval results, optionally backed by a directory.
+
+    The cache is safe to share between threads. Values must be JSON-serializable
+    when a cache directory is used.
+
+    Args:
+        max_entries: Maximum number of entries kept in memory. The least recently
+            used entry is evicted when the limit is reached.
+        ttl_seconds: How long an entry stays valid. Expired entries are treated
+            as misses and removed.
+        cache_dir: Optional directory to persist entries in. Entries found on disk
+            are loaded into memory on first use.
+        clock: Returns the current time in seconds. Wall-clock time is used so
+            that on-disk entries expire correctly across processes.
+        invalidation_check_seconds: How often to look in the cache directory for
+            corpora invalidated by other processes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        cache_dir: str | None = None,
+        clock: Callable[[], float] = time.time,
+        invalidation_check_seconds: float = DEFAULT_INVALIDATION_CHECK_SECONDS,
+    ):
+        if max_entries <= 0:
+            raise ValueError('max_entries must be positive')
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self.stats = CacheStats()
+        self._clock = clock
+        self.invalidation_check_seconds = invalidation_check_seconds
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        # Corpus directory name -> time of its last invalidation.
+        self._invalidated_at: dict[str, float] = {}
+        self._invalidations_checked_at = -math.inf
+
+    @staticmethod
+    def make_key(
+        query: str,
+        corpus: str,
+        similarity_top_k: int | None = None,
+        vector_distance_threshold: float | None = None,
+        **extra: Any,
+    ) -> str:
+        """Builds the cache key for a retrieval request.
+
+        Any `extra` keyword arguments (e.g. a file filter) are included as well.
+        """
+        parts = {
+            'query': normalize_query(query),
+            'corpus': corpus,
+            'similarity_top_k': similarity_top_k,
+            'vector_distance_threshold': vector_distance_threshold,
+            **extra,
+        }
+        encoded = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, corpus: str | None = None) -> Any | None:
+        """Returns the cached value for `key`, or None on a miss.
+
+        Passing the `corpus` the key was stored for saves searching every
+        corpus directory of the disk tier on a miss.
+        """
+        self._refresh_invalidations()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            # Disk reads happen outside the lock, so that a slow disk does not
+            # hold up lookups that hit memory.
+            entry = self._load(key, corpus)
+        with self._lock:
+            if entry is not None and self._is_invalidated(entry):
+                self._remove(key, entry.corpus)
+                entry = None
+            if entry is not None and self._is_expired(entry):
+                self._remove(key, entry.corpus)
+                self.stats.expirations += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.stats.hits += 1
+            return entry.value
+
+    def put(self, key: str, value: Any, corpus: str) -> None:
+        """Stores `value` for `key`. `corpus` is used for invalidation."""
+        with self._lock:
+            entry = _Entry(corpus=corpus, value=value, stored_at=self._clock())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        # As in get(), disk IO happens outside the lock.
+        self._store(key, entry)
+
+    def invalidate_corpus(self, corpus: str) -> None:
+        """Drops every entry retrieved from `corpus`, in memory and on disk.
+
+        Other processes sharing the cache directory drop their in-memory entries
+        for the corpus too, the next time they check for invalidations.
+        """
+        now = self._clock()
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.corpus == corpus]
+            for key in stale:
+                del self._entries[key]
+            self._invalidated_at[_corpus_id(corpus)] = now
+            if self.cache_dir:
+                shutil.rmtree(self._corpus_dir(corpus), ignore_errors=True)
+                self._record_invalidation(corpus, now)
+            self.stats.invalidations += 1
+        logger.info('Invalidated %d cached retrieval(s) for corpus %s', len(stale), corpus)
+
+    def clear(self) -> None:
+        """Drops every entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            if self.cache_dir:
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _is_expired(self, entry: _Entry) -> bool:
+        return self._clock() - entry.stored_at > self.ttl_seconds
+
+    def _is_invalidated(self, entry: _Entry) -> bool:
+        return entry.stored_at <= self._invalidated_at.get(_corpus_id(entry.corpus), -math.inf)
+
+    def _evict(self) -> None:
+        # Only the in-memory copy is evicted; the disk tier is bounded by the TTL.
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str, corpus: str) -> None:
+        self._entries.pop(key, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._entry_path(key, corpus))
+            except OSError:
+                pass
+
+    # --- On-disk tier ---
+    # Entries are stored as <cache_dir>/<sha256(corpus)>/<key>.json so that a
+    # corpus can be invalidated by removing its directory.
+
+    def _corpus_dir(self, corpus: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, _corpus_id(corpus))
+
+    def _record_invalidation(self, corpus: str, when: float) -> None:
+        assert self.cache_dir is not None
+        path = os.path.join(self.cache_dir, _INVALIDATIONS_DIR, _corpus_id(corpus))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(repr(when))
+        except OSError as e:
+            logger.warning('Could not record the invalidation of %s: %s', corpus, e)
+
+    def _refresh_invalidations(self) -> None:
+        """Reads the invalidations recorded by other processes, if it is time to."""
+        if not self.cache_dir:
+            return
+        now = self._clock()
+        with self._lock:
+            if now - self._invalidations_checked_at < self.invalidation_check_seconds:
+                return
+            self._invalidations_checked_at = now
+        directory = os.path.join(self.cache_dir, _INVALIDATIONS_DIR)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        invalidated_at = {}
+        for name in names:
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    invalidated_at[name] = float(f.read())
+            except (OSError, ValueError):
+                continue
+        with self._lock:
+            for name, when in invalidated_at.items():
+                if when > self._invalidated_at.get(name, -math.inf):
+                    self._invalidated_at[name] = when
+
+    def _entry_path(self, key: str, corpus: str) -> str:
+        return os.path.join(self._corpus_dir(corpus), f'{key}.json')
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        if not self.cache_dir:
+            return
+        path = self._entry_path(key, entry.corpus)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dataclasses.asdict(entry), f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning('Could not persist retrieval cache entry: %s', e)
+
+    def _load(self, key: str, corpus: str | None = None) -> _Entry | None:
+        if not self.cache_dir:
+            return None
+        if corpus is not None:
+            corpus_dirs = [_corpus_id(corpus)]
+        else:
+            try:
+                corpus_dirs = [name for name in os.listdir(self.cache_dir) if name != _INVALIDATIONS_DIR]
+            except OSError:
+                return None
+        for corpus_dir in corpus_dirs:
+            path = os.path.join(self.cache_dir, corpus_dir, f'{key}.json')
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    return _Entry(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning('Ignoring unreadable retrieval cache entry %s: %s', path, e)
+                return None
+        return None
+
+
+def _corpus_id(corpus: str) -> str:
+    """Names the corpus's directory in the disk tier."""
+    return hashlib.sha256(corpus.encode('utf-8')).hexdigest()[:16]
+
+
+_retrieval_cache: RetrievalCache | None = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache | None:
+    """Returns the process-wide retrieval cache configured from the environment.
+
+    Environment variables:
+        RETRIEVAL_CACHE_ENABLED: "true" to enable caching. Defaults to "false".
+        RETRIEVAL_CACHE_MAX_ENTRIES: In-memory entry limit. Defaults to 1024.
+        RETRIEVAL_CACHE_TTL_SECONDS: Entry lifetime. Defaults to 3600.
+        RETRIEVAL_CACHE_DIR: Optional directory to persist entries in.
+
+    Returns:
+        The shared RetrievalCache, or None if caching is disabled.
+    """
+    global _retrieval_cache
+    if os.environ.get('RETRIEVAL_CACHE_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache(
+                max_entries=int(os.environ.get('RETRIEVAL_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.environ.get('RETRIEVAL_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+                cache_dir=os.environ.get('RETRIEVAL_CACHE_DIR') or None,
+            )
+        return _retrieval_cache
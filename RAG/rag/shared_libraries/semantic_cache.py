@@ -0,0 +1,301 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Semantic cache for generated explanations.
+
+Students in a class ask the same question in different words ("explain
+photosynthesis", "what is photosynthesis?"). SemanticCache stores answers under a
+partition, e.g. (board, grade, subject, explanation style), together with the
+embedding of the question, and returns a stored answer when a new question in the
+same partition is similar enough.
+
+Each partition is a NumPy matrix of unit-length embeddings, so a lookup is one
+matrix-vector product. Entries are evicted least recently used first and expire
+after a TTL. All entries for a textbook can be dropped with invalidate_textbook().
+"""
+
+import dataclasses
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .retrieval_cache import CacheStats, normalize_query
+
+if TYPE_CHECKING:
+    from google import genai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 24 * 3600.0
+DEFAULT_EMBEDDING_MODEL = 'text-embedding-005'
+
+# Recently embedded questions are remembered so that storing an answer after a
+# miss does not embed the question a second time.
+_EMBEDDING_MEMO_SIZE = 256
+
+Embedder = Callable[[str], Sequence[float]]
+Partition = tuple[str, ...]
+
+
+class VertexAiEmbedder:
+    """Embeds text with a Vertex AI text embedding model.
+
+    Args:
+        model: The embedding model.
+        task_type: What the embeddings are used for, e.g. SEMANTIC_SIMILARITY,
+            or RETRIEVAL_DOCUMENT and RETRIEVAL_QUERY for a search index.
+    """
+
+    # Texts per embed_content request in embed_many().
+    BATCH_SIZE = 100
+
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, task_type: str = 'SEMANTIC_SIMILARITY'):
+        self.model = model
+        self.task_type = task_type
+        self._client: genai.Client | None = None
+
+    def __call__(self, text: str) -> list[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: Sequence[str]) -> list[list[float]]:
+        """Embeds several texts, in batches of BATCH_SIZE per request."""
+        from google import genai
+        from google.genai import types
+
+        if self._client is None:
+            self._client = genai.Client(
+                vertexai=True,
+                project=os.environ.get('GOOGLE_CLOUD_PROJECT'),
+                location=os.environ.get('GOOGLE_CLOUD_LOCATION'),
+            )
+        embeddings: list[list[float]] = []
+        for start in range(0, len(texts), self.BATCH_SIZE):
+            response = self._client.models.embed_content(
+                model=self.model,
+                contents=list(texts[start:start + self.BATCH_SIZE]),
+                config=types.EmbedContentConfig(task_type=self.task_type),
+            )
+            embeddings.extend(embedding.values or [] for embedding in response.embeddings or [])
+        return embeddings
+
+
+@dataclasses.dataclass
+class _Entry:
+    question: str
+    value: str
+    stored_at: float
+
+
+class _PartitionIndex:
+    """The embeddings and entries of one partition, row i belonging to ids[i]."""
+
+    def __init__(self, dimensions: int):
+        self.embeddings = np.empty((0, dimensions), dtype=np.float32)
+        self.ids: list[int] = []
+
+    def add(self, entry_id: int, embedding: np.ndarray) -> None:
+        self.embeddings = np.vstack([self.embeddings, embedding[np.newaxis, :]])
+        self.ids.append(entry_id)
+
+    def remove(self, entry_id: int) -> None:
+        row = self.ids.index(entry_id)
+        self.embeddings = np.delete(self.embeddings, row, axis=0)
+        del self.ids[row]
+
+
+class SemanticCache:
+    """Similarity-based cache of answers, partitioned by exact keys.
+
+    Only questions in the same partition are compared, so an answer for CBSE
+    Grade 10 Science is never served for ICSE Grade 9 Science, however similar
+    the questions are. The cache is safe to share between threads.
+
+    Args:
+        embed_fn: Returns the embedding of a text. Defaults to Vertex AI
+            text-embedding-005.
+        similarity_threshold: Minimum cosine similarity between two questions for
+            one's answer to be served for the other.
+        max_entries: Maximum number of answers kept. The least recently used
+            answer is evicted when the limit is reached.
+        ttl_seconds: How long an answer stays valid.
+        clock: Returns the current time in seconds.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Embedder | None = None,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_entries <= 0:
+            raise ValueError('max_entries must be positive')
+        self.embed_fn = embed_fn or VertexAiEmbedder()
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[int, tuple[Partition, _Entry]] = OrderedDict()
+        self._partitions: dict[Partition, _PartitionIndex] = {}
+        self._embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, question: str, partition: Partition) -> str | None:
+        """Returns the answer to the most similar cached question, or None.
+
+        This embeds the question, which is a blocking call; run it in a thread
+        from async code.
+        """
+        embedding = self._embed(question)
+        with self._lock:
+            index = self._partitions.get(partition)
+            if index is None or not index.ids:
+                self.stats.misses += 1
+                return None
+
+            similarities = index.embeddings @ embedding
+            while True:
+                row = int(np.argmax(similarities))
+                if similarities[row] < self.similarity_threshold:
+                    self.stats.misses += 1
+                    return None
+                entry_id = index.ids[row]
+                _, entry = self._entries[entry_id]
+                if self._clock() - entry.stored_at <= self.ttl_seconds:
+                    break
+                similarities = np.delete(similarities, row)
+                self._remove(entry_id)
+                self.stats.expirations += 1
+                if not index.ids:
+                    self.stats.misses += 1
+                    return None
+
+            self._entries.move_to_end(entry_id)
+            self.stats.hits += 1
+            logger.debug('Semantic cache hit: %r ~ %r', question, entry.question)
+            return entry.value
+
+    def put(self, question: str, partition: Partition, value: str) -> None:
+        """Stores the answer to a question."""
+        embedding = self._embed(question)
+        with self._lock:
+            index = self._partitions.get(partition)
+            if index is None:
+                index = self._partitions[partition] = _PartitionIndex(len(embedding))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                partition,
+                _Entry(question=question, value=value, stored_at=self._clock()),
+            )
+            index.add(entry_id, embedding)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate_textbook(self, board: str, grade: str, subject: str) -> None:
+        """Drops every answer whose partition starts with (board, grade, subject)."""
+        prefix = (board, grade, subject)
+        with self._lock:
+            stale = [
+                entry_id
+                for entry_id, (partition, _) in self._entries.items()
+                if partition[:len(prefix)] == prefix
+            ]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.stats.invalidations += 1
+        logger.info('Invalidated %d cached answer(s) for %s %s %s', len(stale), *prefix)
+
+    def clear(self) -> None:
+        """Drops every answer and every remembered question embedding."""
+        with self._lock:
+            self._entries.clear()
+            self._partitions.clear()
+            self._embeddings.clear()
+
+    def _remove(self, entry_id: int) -> None:
+        partition, _ = self._entries.pop(entry_id)
+        index = self._partitions[partition]
+        index.remove(entry_id)
+        if not index.ids:
+            del self._partitions[partition]
+
+    def _embed(self, question: str) -> np.ndarray:
+        key = normalize_query(question)
+        with self._lock:
+            embedding = self._embeddings.get(key)
+            if embedding is not None:
+                self._embeddings.move_to_end(key)
+                return embedding
+
+        embedding = np.asarray(self.embed_fn(question), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+
+        with self._lock:
+            self._embeddings[key] = embedding
+            while len(self._embeddings) > _EMBEDDING_MEMO_SIZE:
+                self._embeddings.popitem(last=False)
+        return embedding
+
+
+_semantic_cache: SemanticCache | None = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache | None:
+    """Returns the process-wide answer cache configured from the environment.
+
+    Environment variables:
+        SEMANTIC_CACHE_ENABLED: "true" to enable caching. Defaults to "false".
+        SEMANTIC_CACHE_SIMILARITY_THRESHOLD: Defaults to 0.92.
+        SEMANTIC_CACHE_MAX_ENTRIES: Defaults to 2048.
+        SEMANTIC_CACHE_TTL_SECONDS: Defaults to 86400.
+        SEMANTIC_CACHE_EMBEDDING_MODEL: Defaults to text-embedding-005.
+
+    Returns:
+        The shared SemanticCache, or None if caching is disabled.
+    """
+    global _semantic_cache
+    if os.environ.get('SEMANTIC_CACHE_ENABLED', 'false').lower() not in ('1', 'true', 'yes'):
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache(
+                embed_fn=VertexAiEmbedder(
+                    os.environ.get('SEMANTIC_CACHE_EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL)
+                ),
+                similarity_threshold=float(
+                    os.environ.get('SEMANTIC_CACHE_SIMILARITY_THRESHOLD', DEFAULT_SIMILARITY_THRESHOLD)
+                ),
+                max_entries=int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.environ.get('SEMANTIC_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+            )
+        return _semantic_cache
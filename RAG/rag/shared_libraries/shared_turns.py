@@ -0,0 +1,87 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers for answering a turn with work done for another session.
+
+Batches (rag/batch.py) and coalesced turns (rag/coalescing.py) resolve each
+question's student context up front, without an LLM, to tell which questions can
+share an answer, and record the shared answer in every session that asked it.
+"""
+
+from typing import TypeVar
+
+from google.adk.agents import BaseAgent
+
+from .constants import (
+    FINAL_EXPLANATION_KEY,
+    PENDING_STYLE_CHOICE_KEY,
+    SESSION_CONTEXT_KEY,
+    STUDENT_CONTEXT_KEY,
+)
+from .context_parser import (
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    ParsedStudentContext,
+    parse_student_context,
+)
+from .student_context import StudentContext
+
+AgentT = TypeVar('AgentT', bound=BaseAgent)
+
+
+def find_sub_agent(agent: BaseAgent, agent_type: type[AgentT]) -> AgentT | None:
+    """Returns the first agent of `agent_type` in the tree rooted at `agent`."""
+    if isinstance(agent, agent_type):
+        return agent
+    for sub_agent in agent.sub_agents:
+        found = find_sub_agent(sub_agent, agent_type)
+        if found is not None:
+            return found
+    return None
+
+
+def shared_answer_state(student_context: StudentContext, explanation: str) -> dict:
+    """Returns the state a turn answered with a shared explanation leaves behind."""
+    context = student_context.to_state()
+    return {
+        STUDENT_CONTEXT_KEY: context,
+        SESSION_CONTEXT_KEY: context,
+        FINAL_EXPLANATION_KEY: explanation,
+        PENDING_STYLE_CHOICE_KEY: None,
+    }
+
+
+def resolve_student_context(
+    question: str,
+    state: dict,
+    confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+) -> StudentContext | None:
+    """Resolves a question's student context without an LLM, as the extractor would.
+
+    Args:
+        question: The student's message.
+        state: The state of the session the question is asked in.
+        confidence_threshold: The Context Extractor's confidence threshold.
+
+    Returns:
+        The complete context, or None if the Context Extractor would have to
+        call the LLM (or ask the student) to resolve it.
+    """
+    previous = ParsedStudentContext.from_dict(state.get(SESSION_CONTEXT_KEY) or {})
+    parsed = parse_student_context(question)
+    if previous.is_complete and not parsed.mentions_context:
+        return StudentContext.from_parsed(previous)
+    merged = parsed.merged_onto(previous)
+    if merged.is_confident(confidence_threshold):
+        return StudentContext.from_parsed(merged)
+    return None
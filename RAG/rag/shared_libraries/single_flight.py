@@ -0,0 +1,147 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Single-flight coalescing of identical concurrent work.
+
+When a teacher projects a question, dozens of students submit it within seconds.
+SingleFlight runs the work for a key once: the first caller starts it, and
+callers that arrive while it is in flight subscribe to the same execution. Each
+subscriber receives every item the execution produces, including the ones
+produced before it subscribed, so a stream can be shared as well as a result.
+
+- An error raised by the execution is raised in every subscriber.
+- A subscriber that stops listening (its client disconnected, its task was
+  cancelled) only unsubscribes; the execution is cancelled once no subscriber
+  is left.
+- Nothing is kept after the execution finishes: a later call with the same key
+  starts a new execution. Caching finished answers is the semantic cache's job.
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class _Flight:
+    """One execution and the queues of its subscribers."""
+
+    # Set by SingleFlight.stream() right after the flight is created.
+    task: asyncio.Task
+
+    def __init__(self) -> None:
+        self.items: list = []
+        self.subscribers: list[asyncio.Queue] = []
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in self.items:
+            queue.put_nowait(item)
+        self.subscribers.append(queue)
+        return queue
+
+    def publish(self, item: Any) -> None:
+        self.items.append(item)
+        for queue in self.subscribers:
+            queue.put_nowait(item)
+
+
+class SingleFlight(Generic[T]):
+    """Shares one execution of `producer` among concurrent callers with the same key.
+
+    Example:
+        >>> flights = SingleFlight()
+        >>> async for text in flights.stream(key, lambda: generate(question)):
+        ...     send(text)
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether an execution for `key` is running."""
+        return key in self._flights
+
+    async def stream(
+        self,
+        key: Hashable,
+        producer: Callable[[], AsyncIterator[T]],
+        on_join: Callable[[bool], None] | None = None,
+    ) -> AsyncGenerator[T, None]:
+        """Yields the items of the execution for `key`, starting it if needed.
+
+        Args:
+            key: Identifies identical work.
+            producer: Starts the work; only called when no execution for `key`
+                is in flight.
+            on_join: Called with True when this call started the execution and
+                False when it joined one in flight.
+
+        Yields:
+            Every item the execution produces, in order.
+
+        Raises:
+            Exception: Whatever the execution raised.
+        """
+        flight = self._flights.get(key)
+        started = flight is None
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._run(key, flight, producer))
+        if on_join is not None:
+            on_join(started)
+
+        queue = flight.subscribe()
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            flight.subscribers.remove(queue)
+            if not flight.subscribers and not flight.task.done():
+                # Nobody is listening any more: stop the work, and let the next
+                # caller start afresh instead of joining a cancelled execution.
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _run(self, key: Hashable, flight: _Flight, producer: Callable[[], AsyncIterator[T]]) -> None:
+        try:
+            async for item in producer():
+                flight.publish(item)
+            flight.publish(_END)
+        except asyncio.CancelledError:
+            flight.publish(_Failure(asyncio.CancelledError()))
+            raise
+        except Exception as e:
+            logger.debug('Single-flight execution for %r failed: %s', key, e)
+            flight.publish(_Failure(e))
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
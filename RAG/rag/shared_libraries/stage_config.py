@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Model and generation settings of each stage of the explanation workflow.
+
+The three stages have different needs: the context extractor writes a few words
+of JSON and the LLM-driven retrieval agent only decides to call a tool, while
+the explanation generator writes the answer the student reads. StageConfig lets
+each stage have its own model, output length, temperature and thinking budget, so
+the first two can run on a smaller model with little or no thinking.
+
+Settings are passed to the agent factories, or read from the environment with
+the stage's prefix:
+
+    CONTEXT_EXTRACTOR_MODEL=gemini-2.5-flash-lite
+    CONTEXT_EXTRACTOR_THINKING_BUDGET=0
+    CONTEXT_EXTRACTOR_MAX_OUTPUT_TOKENS=256
+    RAG_RETRIEVAL_MODEL=gemini-2.5-flash-lite
+    EXPLANATION_GENERATOR_TEMPERATURE=0.7
+
+Unset fields keep the model's defaults, and an unset model falls back to the
+model passed to the factory.
+"""
+
+import dataclasses
+import os
+from collections.abc import Callable
+from typing import Any
+
+from google.adk.models import BaseLlm
+from google.adk.planners import BuiltInPlanner
+from google.genai import types
+
+CONTEXT_EXTRACTOR = 'context_extractor'
+RAG_RETRIEVAL = 'rag_retrieval'
+EXPLANATION_GENERATOR = 'explanation_generator'
+
+
+@dataclasses.dataclass(frozen=True)
+class StageConfig:
+    """Model and generation settings of one stage.
+
+    Attributes:
+        model: The model (name or BaseLlm instance). None for the factory's model.
+        max_output_tokens: Maximum tokens of a response.
+        temperature: Sampling temperature.
+        thinking_budget: Thinking tokens per response; 0 turns thinking off on
+            models that allow it, and -1 lets the model decide.
+    """
+
+    model: str | BaseLlm | None = None
+    max_output_tokens: int | None = None
+    temperature: float | None = None
+    thinking_budget: int | None = None
+
+    @classmethod
+    def from_env(cls, stage: str) -> 'StageConfig':
+        """Reads the settings of `stage` from <STAGE>_MODEL, <STAGE>_TEMPERATURE, etc."""
+        prefix = stage.upper()
+
+        def get(name: str, convert: Callable[[str], Any]) -> Any:
+            value = os.environ.get(f'{prefix}_{name}')
+            return convert(value) if value else None
+
+        return cls(
+            model=get('MODEL', str),
+            max_output_tokens=get('MAX_OUTPUT_TOKENS', int),
+            temperature=get('TEMPERATURE', float),
+            thinking_budget=get('THINKING_BUDGET', int),
+        )
+
+    def resolve_model(self, default: str | BaseLlm) -> str | BaseLlm:
+        return self.model if self.model is not None else default
+
+    def generate_content_config(self) -> types.GenerateContentConfig | None:
+        if self.max_output_tokens is None and self.temperature is None:
+            return None
+        return types.GenerateContentConfig(
+            max_output_tokens=self.max_output_tokens,
+            temperature=self.temperature,
+        )
+
+    def planner(self) -> BuiltInPlanner | None:
+        # ADK takes the thinking config through the planner, not the generate
+        # content config.
+        if self.thinking_budget is None:
+            return None
+        return BuiltInPlanner(thinking_config=types.ThinkingConfig(thinking_budget=self.thinking_budget))
+
+    def agent_kwargs(self, default_model: str | BaseLlm) -> dict[str, Any]:
+        """Returns the model, generate_content_config and planner arguments of an LlmAgent."""
+        kwargs: dict[str, Any] = {'model': self.resolve_model(default_model)}
+        config = self.generate_content_config()
+        if config is not None:
+            kwargs['generate_content_config'] = config
+        planner = self.planner()
+        if planner is not None:
+            kwargs['planner'] = planner
+        return kwargs
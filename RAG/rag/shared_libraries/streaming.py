@@ -0,0 +1,214 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Streaming of explanation agent turns, with latency instrumentation.
+
+stream_turn() runs one turn with server-sent-event streaming enabled, hands only
+the text of the final explanation to a callback as it is generated, and measures
+the turn:
+- time to first token: until the first words of the explanation arrive, which is
+  when the student perceives the answer to start
+- per-stage time: the time spent waiting for each agent's events, i.e. every
+  gap between two events is attributed to the agent that produced the later one
+- total time
+
+append_turn() records a turn answered elsewhere (e.g. by an identical question
+in another session) in a session's history, without running the agent.
+"""
+
+import asyncio
+import dataclasses
+import time
+from collections.abc import AsyncGenerator, Callable, Iterable
+
+from google.adk.agents.invocation_context import new_invocation_context_id
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.genai import types
+
+# Authors whose text is the answer shown to the student: the explanation
+# generator, and the root agent itself when it answers from the semantic cache.
+DEFAULT_ANSWER_AUTHORS = ('ExplanationGeneratorAgent', 'explanation_agent')
+
+
+@dataclasses.dataclass
+class TurnTimings:
+    """Latency breakdown of one turn, in seconds from when the turn started."""
+
+    total: float = 0.0
+    time_to_first_token: float | None = None
+    stages: dict[str, float] = dataclasses.field(default_factory=dict)
+
+    def summary(self) -> str:
+        """Returns a one-line human-readable summary."""
+        ttft = f'{self.time_to_first_token:.2f}s' if self.time_to_first_token is not None else 'n/a'
+        stages = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.stages.items())
+        return f'first token {ttft} | total {self.total:.2f}s | {stages}'
+
+
+def _event_text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ''
+    return ''.join(part.text for part in event.content.parts if part.text and not part.thought)
+
+
+async def stream_turn(
+    runner: Runner,
+    user_id: str,
+    session_id: str,
+    message: str,
+    on_text: Callable[[str], None],
+    answer_authors: Iterable[str] = DEFAULT_ANSWER_AUTHORS,
+    clock: Callable[[], float] = time.perf_counter,
+    state_delta: dict | None = None,
+) -> TurnTimings:
+    """Runs one turn and streams the answer text to `on_text`.
+
+    Intermediate output (the extracted context JSON, retrieved chunks) is not
+    passed to `on_text`. Partial events are streamed as they arrive; a final event
+    from an answer author is only passed on if nothing was streamed for it, e.g.
+    for a cached answer.
+
+    Args:
+        runner: The runner of the explanation agent.
+        user_id: The user ID of the session.
+        session_id: The session to run the turn in.
+        message: The student's message.
+        on_text: Called with each piece of answer text, in order.
+        answer_authors: Names of the agents whose text is the answer.
+        clock: Returns the current time in seconds.
+        state_delta: State to set in the session before the turn runs.
+
+    Returns:
+        TurnTimings: The latency breakdown of the turn.
+    """
+    answer_authors = set(answer_authors)
+    timings = TurnTimings()
+    streamed_authors = set()
+    last_event_at = start = clock()
+
+    def emit(text: str) -> None:
+        if timings.time_to_first_token is None:
+            timings.time_to_first_token = clock() - start
+        on_text(text)
+
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=types.Content(role='user', parts=[types.Part(text=message)]),
+        state_delta=state_delta,
+        run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+    ):
+        now = clock()
+        timings.stages[event.author] = timings.stages.get(event.author, 0.0) + now - last_event_at
+        last_event_at = now
+
+        if event.author not in answer_authors:
+            continue
+        text = _event_text(event)
+        if not text:
+            continue
+        if event.partial:
+            streamed_authors.add(event.author)
+            emit(text)
+        elif event.author not in streamed_authors:
+            emit(text)
+
+    timings.total = clock() - start
+    return timings
+
+
+async def iter_turn(
+    runner: Runner,
+    user_id: str,
+    session_id: str,
+    message: str,
+    answer_authors: Iterable[str] = DEFAULT_ANSWER_AUTHORS,
+    state_delta: dict | None = None,
+) -> AsyncGenerator[str | TurnTimings, None]:
+    """Runs one turn like stream_turn(), as an async iterator.
+
+    Yields each piece of answer text as it arrives, and finally the turn's
+    TurnTimings. Closing the iterator early cancels the turn.
+    """
+    pieces: asyncio.Queue[str | None] = asyncio.Queue()
+
+    async def run() -> TurnTimings:
+        try:
+            return await stream_turn(
+                runner,
+                user_id,
+                session_id,
+                message,
+                pieces.put_nowait,
+                answer_authors=answer_authors,
+                state_delta=state_delta,
+            )
+        finally:
+            pieces.put_nowait(None)
+
+    turn = asyncio.create_task(run())
+    try:
+        while (text := await pieces.get()) is not None:
+            yield text
+        yield await turn
+    finally:
+        if not turn.done():
+            turn.cancel()
+
+
+async def append_turn(
+    runner: Runner,
+    user_id: str,
+    session_id: str,
+    message: str,
+    answer: str,
+    state_delta: dict | None = None,
+) -> None:
+    """Records a turn in a session as if the agent had answered it.
+
+    The student's message and the answer are appended as events, the answer
+    authored by the runner's root agent, so that follow-up turns see them in the
+    conversation history.
+
+    Args:
+        runner: The runner of the agent.
+        user_id: The user ID of the session.
+        session_id: The session to record the turn in.
+        message: The student's message.
+        answer: The answer text.
+        state_delta: State to set along with the answer.
+    """
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+    if session is None:
+        raise ValueError(f'Session not found: {session_id}')
+    invocation_id = new_invocation_context_id()
+    events = (
+        Event(
+            invocation_id=invocation_id,
+            author='user',
+            content=types.Content(role='user', parts=[types.Part(text=message)]),
+        ),
+        Event(
+            invocation_id=invocation_id,
+            author=runner.agent.name,
+            content=types.Content(role='model', parts=[types.Part(text=answer)]),
+            actions=EventActions(state_delta=state_delta or {}),
+        ),
+    )
+    for event in events:
+        await runner.session_service.append_event(session, event)
@@ -0,0 +1,180 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Typed student context shared by the agents.
+
+StudentContext is the structured output schema of the LLM context extractor and
+the form in which the resolved context is kept in session state. Board, grade,
+subject and term are enums of canonical values, built from the lexicons in
+context_parser.py, so the model can only answer with values the rest of the
+workflow understands, and later stages read fields instead of re-parsing text.
+
+Values that are not canonical yet (e.g. "Class 9", "tamilnadu state board", or
+state written by an older version) are normalized on validation; values that
+cannot be recognised become "Not Specified".
+"""
+
+import enum
+import re
+from typing import TYPE_CHECKING, Any, cast
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from .context_parser import (
+    GENERIC_STATE_BOARD,
+    NATIONAL_BOARDS,
+    NOT_SPECIFIED,
+    STATE_NAMES,
+    SUBJECTS,
+    ParsedStudentContext,
+    find_subjects,
+    grade_number,
+    parse_context_json,
+    parse_student_context,
+    term_number,
+)
+
+MAX_GRADE = 12
+MAX_TERM = 3
+
+
+def _member_name(value: str) -> str:
+    return re.sub(r'[^A-Z0-9]+', '_', value.upper()).strip('_')
+
+
+def _str_enum(name: str, values: list[str]) -> type[enum.Enum]:
+    return cast(type[enum.Enum], enum.Enum(name, [(_member_name(v), v) for v in values], type=str))
+
+
+Board = _str_enum(
+    'Board',
+    [*NATIONAL_BOARDS, *(f'{state} {GENERIC_STATE_BOARD}' for state in STATE_NAMES),
+     GENERIC_STATE_BOARD, NOT_SPECIFIED],
+)
+Grade = _str_enum('Grade', [*(f'Grade {n}' for n in range(1, MAX_GRADE + 1)), NOT_SPECIFIED])
+Subject = _str_enum('Subject', [*SUBJECTS, NOT_SPECIFIED])
+Term = _str_enum('Term', [f'Term {n}' for n in range(1, MAX_TERM + 1)])
+
+if TYPE_CHECKING:
+    # The enums are built at runtime, and the fields hold their values as plain
+    # strings (use_enum_values), so type checkers see the fields as str.
+    BoardField = str
+    GradeField = str
+    SubjectField = str
+    TermField = str
+else:
+    BoardField, GradeField, SubjectField, TermField = Board, Grade, Subject, Term
+
+
+class StudentContext(BaseModel):
+    """The student's education board, grade, subject and (optionally) term.
+
+    Fields hold the enum values as plain strings, e.g.
+    StudentContext(board='CBSE', grade='Grade 10', subject='Science').board == 'CBSE'.
+    """
+
+    model_config = ConfigDict(use_enum_values=True)
+
+    board: BoardField = Field(
+        default=NOT_SPECIFIED,
+        description='Education board, e.g. "CBSE" or "Tamil Nadu State Board".',
+    )
+    grade: GradeField = Field(default=NOT_SPECIFIED, description='Grade level, e.g. "Grade 4".')
+    subject: SubjectField = Field(default=NOT_SPECIFIED, description='Subject, e.g. "Science".')
+    term: TermField | None = Field(
+        default=None, description='Term of the textbook, only if the student names one.'
+    )
+
+    @field_validator('board', mode='before')
+    @classmethod
+    def _canonical_board(cls, value: Any) -> Any:
+        if not isinstance(value, str) or value in Board._value2member_map_:
+            return value
+        return parse_student_context(value).board or NOT_SPECIFIED
+
+    @field_validator('grade', mode='before')
+    @classmethod
+    def _canonical_grade(cls, value: Any) -> Any:
+        if isinstance(value, int):
+            value = str(value)
+        if not isinstance(value, str) or value in Grade._value2member_map_:
+            return value
+        number = grade_number(value)
+        return f'Grade {number}' if number else NOT_SPECIFIED
+
+    @field_validator('subject', mode='before')
+    @classmethod
+    def _canonical_subject(cls, value: Any) -> Any:
+        if not isinstance(value, str) or value in Subject._value2member_map_:
+            return value
+        subjects = find_subjects(value)
+        return subjects[0] if subjects else NOT_SPECIFIED
+
+    @field_validator('term', mode='before')
+    @classmethod
+    def _canonical_term(cls, value: Any) -> Any:
+        if isinstance(value, str) and value not in Term._value2member_map_:
+            value = term_number(value) or (int(value) if value.strip().isdigit() else None)
+        if isinstance(value, int):
+            return f'Term {value}' if 1 <= value <= MAX_TERM else None
+        return value
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether board, grade and subject are all known."""
+        return NOT_SPECIFIED not in (self.board, self.grade, self.subject)
+
+    @property
+    def textbook(self) -> str:
+        """The textbook the context names, e.g. "CBSE Grade 10 Science"."""
+        return f'{self.board} {self.grade} {self.subject}'
+
+    def to_state(self) -> dict:
+        """Returns the context as stored in session state (JSON-serializable)."""
+        return self.model_dump(mode='json', exclude_none=True)
+
+    def to_parsed(self) -> ParsedStudentContext:
+        """Returns the context for APIs that take a parser result (fully trusted)."""
+        return ParsedStudentContext.from_dict(self.to_state())
+
+    @classmethod
+    def from_parsed(cls, parsed: ParsedStudentContext) -> 'StudentContext':
+        """Canonicalizes a parser result; missing fields become "Not Specified"."""
+        return cls.model_validate({**parsed.to_dict(), 'term': parsed.term})
+
+    @classmethod
+    def from_state(cls, value: Any) -> 'StudentContext':
+        """Reads a context from session state.
+
+        Accepts a StudentContext, its state dict, or the JSON text the extractor
+        used to produce. Anything unreadable gives an empty context; so does a
+        field that is null or not valid, e.g. {"grade": null} or {"board": 5},
+        while the other fields are kept.
+        """
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            value = parse_context_json(value)
+        if not isinstance(value, dict):
+            return cls()
+        fields = {}
+        for name, field_value in value.items():
+            if name not in cls.model_fields or field_value is None:
+                continue
+            try:
+                cls.model_validate({name: field_value})
+            except ValidationError:
+                continue
+            fields[name] = field_value
+        return cls.model_validate(fields)
@@ -0,0 +1,266 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Index of the textbooks in a RAG corpus by board, grade, subject and term.
+
+Retrieval is restricted to the RAG files of the student's textbook before the
+vector search runs, instead of searching the whole corpus and asking the LLM to
+filter chunks by file name afterwards. This module maps a student context to
+those RAG files.
+
+The index is built from the display names of the files in the corpus, following
+the naming convention used for uploads, e.g.:
+- CBSE_Grade10_Science.pdf
+- ICSE_Class9_English.pdf
+- TamilNaduStateBoard_Grade4_Maths_Science_SocialScience_Term1.pdf
+
+A JSON manifest (TEXTBOOK_MANIFEST_PATH) can be used instead for files that do
+not follow the convention.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Iterable
+
+from vertexai.preview import rag
+
+from .context_parser import (
+    GENERIC_STATE_BOARD,
+    find_subjects,
+    grade_number,
+    parse_student_context,
+)
+from .semantic_cache import get_semantic_cache
+from .student_context import StudentContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 600.0
+# How long to wait before trying again to build a manifest that failed to build.
+FAILURE_RETRY_SECONDS = 30.0
+
+# A textbook for the broader subject also covers these subjects, e.g. a CBSE
+# Grade 10 Science textbook answers Physics questions.
+PARENT_SUBJECTS = {
+    'Physics': 'Science',
+    'Chemistry': 'Science',
+    'Biology': 'Science',
+    'History': 'Social Science',
+    'Geography': 'Social Science',
+    'Civics': 'Social Science',
+    'Economics': 'Social Science',
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class TextbookEntry:
+    """One RAG file and the textbook it contains."""
+
+    rag_file_name: str
+    display_name: str
+    board: str
+    grade: int
+    subjects: tuple[str, ...]
+    term: int | None = None
+
+    @property
+    def rag_file_id(self) -> str:
+        """The file ID, i.e. the last segment of the RAG file resource name."""
+        return self.rag_file_name.rsplit('/', 1)[-1]
+
+
+def parse_textbook_display_name(display_name: str) -> dict | None:
+    """Reads board, grade, subjects and term from a textbook file name.
+
+    Returns:
+        A dict with "board", "grade", "subjects" and "term", or None if board,
+        grade or subject cannot be determined.
+    """
+    text = os.path.splitext(display_name)[0]
+    text = re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', text)  # TamilNaduStateBoard
+    text = re.sub(r'[_\-.]+', ' ', text)
+
+    parsed = parse_student_context(text)
+    grade = grade_number(parsed.grade) if parsed.grade else None
+    subjects = find_subjects(text)
+    if not parsed.board or grade is None or not subjects:
+        return None
+
+    term = re.search(r'\bterm\s*(\d)\b', text, re.IGNORECASE)
+    return {
+        'board': parsed.board,
+        'grade': grade,
+        'subjects': subjects,
+        'term': int(term.group(1)) if term else None,
+    }
+
+
+class TextbookManifest:
+    """Maps (board, grade, subject, term) to the RAG files of matching textbooks."""
+
+    def __init__(self, entries: Iterable[TextbookEntry] = ()):
+        self.entries = list(entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def from_rag_files(cls, rag_files: Iterable) -> 'TextbookManifest':
+        """Builds the manifest from RAG files (objects with name and display_name).
+
+        Files whose display name does not follow the naming convention are left
+        out, so they are only found by unrestricted searches.
+        """
+        entries = []
+        for rag_file in rag_files:
+            fields = parse_textbook_display_name(rag_file.display_name or '')
+            if fields is None:
+                logger.debug('Not indexing %s: board, grade or subject not in its name', rag_file.display_name)
+                continue
+            entries.append(
+                TextbookEntry(
+                    rag_file_name=rag_file.name,
+                    display_name=rag_file.display_name,
+                    board=fields['board'],
+                    grade=fields['grade'],
+                    subjects=tuple(fields['subjects']),
+                    term=fields['term'],
+                )
+            )
+        return cls(entries)
+
+    @classmethod
+    def load(cls, path: str) -> 'TextbookManifest':
+        """Loads a manifest saved with save()."""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            TextbookEntry(**{**entry, 'subjects': tuple(entry['subjects'])})
+            for entry in data['textbooks']
+        )
+
+    def save(self, path: str) -> None:
+        """Saves the manifest as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'textbooks': [dataclasses.asdict(e) for e in self.entries]}, f, indent=2)
+
+    def lookup(
+        self,
+        board: str,
+        grade: str,
+        subject: str,
+        term: int | None = None,
+    ) -> list[TextbookEntry]:
+        """Returns the textbooks for a student context.
+
+        Multi-subject textbooks match any of their subjects. If there is no
+        textbook for the subject itself, textbooks of its broader subject are
+        returned (Physics -> Science). A generic "State Board" matches every state
+        board. When `term` is None, all terms match.
+        """
+        number = grade_number(grade)
+        if number is None:
+            return []
+
+        def matches(entry: TextbookEntry, wanted_subject: str) -> bool:
+            if board.lower() == 'state board':
+                board_matches = entry.board.lower().endswith('state board')
+            else:
+                board_matches = entry.board.lower() == board.lower()
+            return (
+                board_matches
+                and entry.grade == number
+                and wanted_subject in entry.subjects
+                and (term is None or entry.term in (None, term))
+            )
+
+        found = [e for e in self.entries if matches(e, subject)]
+        if not found and subject in PARENT_SUBJECTS:
+            found = [e for e in self.entries if matches(e, PARENT_SUBJECTS[subject])]
+        return found
+
+
+# Corpus -> (time the manifest expires, manifest).
+_manifests: dict[str, tuple[float, TextbookManifest]] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_textbook_manifest(rag_corpus: str) -> TextbookManifest:
+    """Returns the textbook manifest for a corpus, building it on first use.
+
+    The manifest is read from TEXTBOOK_MANIFEST_PATH if that is set, and otherwise
+    built by listing the files of the corpus. It is rebuilt after
+    TEXTBOOK_MANIFEST_REFRESH_SECONDS (default 600) so newly uploaded textbooks are
+    picked up, and cached answers for textbooks that were added or removed since
+    the previous build are dropped from the semantic answer cache. If the corpus
+    cannot be listed, an empty manifest is returned and retrieval falls back to
+    searching the whole corpus; the build is retried after FAILURE_RETRY_SECONDS.
+    """
+    with _manifests_lock:
+        cached = _manifests.get(rag_corpus)
+    if cached and time.monotonic() < cached[0]:
+        return cached[1]
+
+    # Listing the corpus is a network call, so it is made outside the lock. Two
+    # threads may build the same manifest at once; the last one to finish wins.
+    refresh_seconds = float(os.environ.get('TEXTBOOK_MANIFEST_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS))
+    manifest_path = os.environ.get('TEXTBOOK_MANIFEST_PATH')
+    try:
+        if manifest_path:
+            manifest = TextbookManifest.load(manifest_path)
+        else:
+            manifest = TextbookManifest.from_rag_files(rag.list_files(corpus_name=rag_corpus))
+        logger.info('Indexed %d textbook(s) for %s', len(manifest), rag_corpus)
+    except Exception as e:
+        logger.warning('Could not build the textbook manifest for %s: %s', rag_corpus, e)
+        manifest = TextbookManifest()
+        refresh_seconds = min(refresh_seconds, FAILURE_RETRY_SECONDS)
+
+    with _manifests_lock:
+        _manifests[rag_corpus] = (time.monotonic() + refresh_seconds, manifest)
+    if cached and len(cached[1]) and len(manifest):
+        _invalidate_cached_answers(cached[1], manifest)
+    return manifest
+
+
+def _invalidate_cached_answers(previous: TextbookManifest, manifest: TextbookManifest) -> None:
+    """Drops cached answers for textbooks added to or removed from the corpus."""
+    cache = get_semantic_cache()
+    if cache is None:
+        return
+    before = {e.rag_file_name: e for e in previous.entries}
+    after = {e.rag_file_name: e for e in manifest.entries}
+    changed = [after[name] for name in after.keys() - before.keys()]
+    changed += [before[name] for name in before.keys() - after.keys()]
+
+    textbooks = set()
+    for entry in changed:
+        # Students who only name "State Board", or a narrower subject, are served
+        # from this textbook too (see TextbookManifest.lookup).
+        boards = [entry.board]
+        if entry.board.lower().endswith(GENERIC_STATE_BOARD.lower()):
+            boards.append(GENERIC_STATE_BOARD)
+        subjects = set(entry.subjects)
+        subjects.update(child for child, parent in PARENT_SUBJECTS.items() if parent in entry.subjects)
+        for board in boards:
+            for subject in subjects:
+                canonical = StudentContext(board=board, grade=f'Grade {entry.grade}', subject=subject)
+                textbooks.add((canonical.board, canonical.grade, canonical.subject))
+    for textbook in sorted(textbooks):
+        cache.invalidate_textbook(*textbook)
@@ -0,0 +1,358 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process vector index of textbook chunks.
+
+VectorIndex holds unit-length chunk embeddings in one NumPy matrix, so an exact
+cosine search is a single matrix-vector product followed by a partial sort.
+Searches restricted to some RAG files (the student's textbook) only touch the
+rows of those files.
+
+For large corpora an IVF (inverted file) coarse index can be built: the chunks
+are clustered with spherical k-means, and a search only scores the chunks of the
+`n_probe` clusters closest to the query. This trades a little recall for speed;
+restricted searches always use the exact path, since a single textbook is small.
+
+A BM25 lexical index of the same chunks (see bm25.py) is built and saved with the
+vector index, for hybrid retrieval.
+
+Indexes are saved as a single .npz file, see save() and load(). To build one from
+a JSON file of textbook chunks (the format of benchmarks/fixtures/textbooks.json):
+
+    python -m rag.shared_libraries.vector_index --textbooks textbooks.json \\
+        --output textbooks.npz [--ivf-lists 256]
+
+or from the JSONL chunk files written by pdf_chunker.py, which also records the
+chapter, section and pages of each chunk:
+
+    python -m rag.shared_libraries.vector_index --chunks chunks/*.jsonl \\
+        --output textbooks.npz
+"""
+
+import argparse
+import dataclasses
+import hashlib
+import json
+import logging
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from .bm25 import BM25Index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_PROBE = 8
+# The location fields kept from chunk dicts, see pdf_chunker.Chunk.
+LOCATION_KEYS = ('chapter', 'section', 'page_start', 'page_end')
+_KMEANS_ITERATIONS = 15
+
+
+@dataclasses.dataclass(frozen=True)
+class IndexedFile:
+    """A RAG file whose chunks are in the index."""
+
+    rag_file_id: str
+    display_name: str
+
+
+def _normalize(matrix: ArrayLike) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+def _top_k(similarities: np.ndarray, k: int) -> np.ndarray:
+    """Returns the positions of the k largest similarities, largest first."""
+    if k < len(similarities):
+        candidates = np.argpartition(-similarities, k)[:k]
+    else:
+        candidates = np.arange(len(similarities))
+    return candidates[np.argsort(-similarities[candidates], kind='stable')]
+
+
+class VectorIndex:
+    """Exact and IVF cosine search over chunk embeddings.
+
+    Args:
+        embeddings: One embedding per chunk, shape (chunks, dimensions). They are
+            normalized to unit length.
+        texts: The text of each chunk.
+        file_indexes: For each chunk, the position of its file in `files`.
+        files: The RAG files the chunks come from.
+        corpus: Name of the corpus the index stands in for.
+        embedding_model: The model the embeddings were computed with; queries
+            must be embedded with the same model.
+        lexical: BM25 index of the same chunks, if any.
+        locations: For each chunk, where in its textbook it comes from (chapter,
+            section, page_start, page_end), or None if unknown.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        texts: Sequence[str],
+        file_indexes: Sequence[int],
+        files: Sequence[IndexedFile],
+        corpus: str = 'local',
+        embedding_model: str = '',
+        lexical: BM25Index | None = None,
+        locations: Sequence[dict | None] | None = None,
+    ):
+        self.embeddings = _normalize(embeddings).reshape(len(texts), -1)
+        self.texts = list(texts)
+        self.file_indexes = np.asarray(file_indexes, dtype=np.int32)
+        self.files = list(files)
+        self.corpus = corpus
+        self.embedding_model = embedding_model
+        self.lexical = lexical
+        self.locations = list(locations) if locations is not None else [None] * len(self.texts)
+        self._file_positions = {f.rag_file_id: i for i, f in enumerate(self.files)}
+        order = np.argsort(self.file_indexes, kind='stable')
+        bounds = np.searchsorted(self.file_indexes[order], np.arange(len(self.files) + 1))
+        self._file_rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.files))]
+        self.centroids: np.ndarray | None = None
+        self.assignments: np.ndarray | None = None
+        self._lists: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @classmethod
+    def from_textbooks(
+        cls,
+        textbooks: Iterable[dict],
+        embed_many: Callable[[Sequence[str]], Sequence[Sequence[float]]],
+        corpus: str = 'local',
+        embedding_model: str = '',
+        lexical: bool = True,
+    ) -> 'VectorIndex':
+        """Embeds the chunks of textbooks and indexes them.
+
+        Args:
+            textbooks: Dicts with "rag_file_id", "display_name" and "chunks": a
+                list of texts, or of chunk dicts as written by pdf_chunker.py,
+                whose chapter, section and pages are kept.
+            embed_many: Returns the embeddings of a list of texts.
+            corpus: Name of the corpus the index stands in for.
+            embedding_model: The model `embed_many` uses.
+            lexical: Whether to also build a BM25 index of the chunks.
+
+        Raises:
+            ValueError: If the textbooks have no chunks.
+        """
+        files: list[IndexedFile] = []
+        texts: list[str] = []
+        file_indexes: list[int] = []
+        locations: list[dict | None] = []
+        for textbook in textbooks:
+            files.append(IndexedFile(str(textbook['rag_file_id']), textbook['display_name']))
+            for chunk in textbook['chunks']:
+                if isinstance(chunk, str):
+                    texts.append(chunk)
+                    locations.append(None)
+                else:
+                    texts.append(chunk['text'])
+                    locations.append({key: chunk.get(key) for key in LOCATION_KEYS})
+                file_indexes.append(len(files) - 1)
+        if not texts:
+            raise ValueError(f'No chunks to index in {len(files)} textbook(s)')
+        embeddings = np.asarray(embed_many(texts), dtype=np.float32)
+        return cls(
+            embeddings,
+            texts,
+            file_indexes,
+            files,
+            corpus=corpus,
+            embedding_model=embedding_model,
+            lexical=BM25Index.build(texts) if lexical else None,
+            locations=locations,
+        )
+
+    def build_ivf(self, n_lists: int, seed: int = 0) -> None:
+        """Clusters the chunks into `n_lists` lists for approximate search."""
+        n_lists = min(n_lists, len(self))
+        if n_lists < 2:
+            return
+        rng = np.random.default_rng(seed)
+        centroids = self.embeddings[rng.choice(len(self), n_lists, replace=False)]
+        for _ in range(_KMEANS_ITERATIONS):
+            assignments = np.argmax(self.embeddings @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, self.embeddings)
+            empty = ~sums.any(axis=1)
+            # Re-seed empty clusters with random chunks.
+            sums[empty] = self.embeddings[rng.choice(len(self), int(empty.sum()))]
+            centroids = _normalize(sums)
+        self._set_ivf(centroids, np.argmax(self.embeddings @ centroids.T, axis=1))
+
+    def _set_ivf(self, centroids: np.ndarray, assignments: np.ndarray) -> None:
+        self.centroids = centroids.astype(np.float32)
+        self.assignments = assignments.astype(np.int32)
+        self._lists = [np.flatnonzero(self.assignments == i) for i in range(len(centroids))]
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int,
+        rag_file_ids: Iterable[str] | None = None,
+        n_probe: int = DEFAULT_N_PROBE,
+    ) -> list[tuple[int, float]]:
+        """Returns the chunks most similar to a query.
+
+        Args:
+            query_embedding: Embedding of the query.
+            top_k: Number of chunks to return.
+            rag_file_ids: Only search the chunks of these files. All files when
+                empty or None.
+            n_probe: Number of IVF lists to search, when an IVF index is built
+                and the search is not restricted to some files.
+
+        Returns:
+            (chunk position, cosine distance) pairs, closest first.
+        """
+        query = _normalize(query_embedding).reshape(-1)
+        rows = self.rows_for(rag_file_ids)
+        if rows is None and self.centroids is not None:
+            lists = _top_k(self.centroids @ query, n_probe)
+            rows = np.concatenate([self._lists[i] for i in lists])
+
+        if rows is None:
+            similarities = self.embeddings @ query
+            best = _top_k(similarities, top_k)
+            return [(int(row), float(1 - similarities[row])) for row in best]
+        if not len(rows):
+            return []
+        similarities = self.embeddings[rows] @ query
+        best = _top_k(similarities, top_k)
+        return [(int(rows[i]), float(1 - similarities[i])) for i in best]
+
+    def rows_for(self, rag_file_ids: Iterable[str] | None) -> np.ndarray | None:
+        """Returns the positions of the chunks of some files, or None for all."""
+        rag_file_ids = list(rag_file_ids or [])
+        if not rag_file_ids:
+            return None
+        positions = [self._file_positions[f] for f in rag_file_ids if f in self._file_positions]
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._file_rows[p] for p in positions])
+
+    def distances(self, query_embedding: Sequence[float], rows: Sequence[int]) -> np.ndarray:
+        """Returns the cosine distance between a query and some chunks."""
+        query = _normalize(query_embedding).reshape(-1)
+        return 1 - self.embeddings[np.asarray(rows, dtype=np.int64)] @ query
+
+    def file_of(self, row: int) -> IndexedFile:
+        """Returns the file chunk `row` comes from."""
+        return self.files[self.file_indexes[row]]
+
+    def save(self, path: str) -> None:
+        """Saves the index, including its IVF lists, to a .npz file."""
+        metadata = {
+            'corpus': self.corpus,
+            'embedding_model': self.embedding_model,
+            'files': [dataclasses.asdict(f) for f in self.files],
+            'texts': self.texts,
+            'locations': self.locations,
+            'lexical_terms': self.lexical.terms if self.lexical is not None else None,
+        }
+        arrays: dict[str, Any] = {
+            'embeddings': self.embeddings,
+            'file_indexes': self.file_indexes,
+            'metadata': np.frombuffer(json.dumps(metadata).encode('utf-8'), dtype=np.uint8),
+        }
+        if self.centroids is not None and self.assignments is not None:
+            arrays.update(centroids=self.centroids, assignments=self.assignments)
+        if self.lexical is not None:
+            arrays.update(self.lexical.to_arrays())
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'VectorIndex':
+        """Loads an index saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(data['metadata'].tobytes().decode('utf-8'))
+            index = cls(
+                data['embeddings'],
+                metadata['texts'],
+                data['file_indexes'],
+                [IndexedFile(**f) for f in metadata['files']],
+                corpus=metadata['corpus'],
+                embedding_model=metadata['embedding_model'],
+                locations=metadata.get('locations'),
+            )
+            if metadata.get('lexical_terms') is not None:
+                index.lexical = BM25Index.from_arrays(metadata['lexical_terms'], data, len(index))
+            if 'centroids' in data:
+                index._set_ivf(data['centroids'], data['assignments'])
+        logger.info('Loaded %d chunk(s) of %d file(s) from %s', len(index), len(index.files), path)
+        return index
+
+
+def textbooks_from_chunk_files(paths: Iterable[str]) -> list[dict]:
+    """Groups the chunks of JSONL chunk files by textbook, for from_textbooks().
+
+    Each textbook gets a RAG file ID derived from its display name.
+    """
+    from .pdf_chunker import read_chunks
+
+    textbooks: dict[str, dict] = {}
+    for path in paths:
+        for chunk in read_chunks(path):
+            name = chunk['display_name']
+            if name not in textbooks:
+                rag_file_id = hashlib.sha1(name.encode('utf-8')).hexdigest()[:16]
+                textbooks[name] = {'rag_file_id': rag_file_id, 'display_name': name, 'chunks': []}
+            textbooks[name]['chunks'].append(chunk)
+    return list(textbooks.values())
+
+
+def main() -> None:
+    from .semantic_cache import DEFAULT_EMBEDDING_MODEL, VertexAiEmbedder
+
+    parser = argparse.ArgumentParser(description='Build a local vector index of textbook chunks.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--textbooks', help='JSON file with "textbooks": [{rag_file_id, display_name, chunks}].')
+    source.add_argument('--chunks', nargs='+', help='JSONL chunk files written by pdf_chunker.py.')
+    parser.add_argument('--output', required=True, help='Path of the .npz index to write.')
+    parser.add_argument('--corpus', help='Corpus name to record. Defaults to "rag_corpus" in the JSON file.')
+    parser.add_argument('--embedding-model', default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument('--ivf-lists', type=int, default=0, help='Number of IVF lists; 0 for exact search only.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    data: dict[str, Any]
+    if args.chunks:
+        data = {'textbooks': textbooks_from_chunk_files(args.chunks)}
+    else:
+        with open(args.textbooks, encoding='utf-8') as f:
+            data = json.load(f)
+    embedder = VertexAiEmbedder(args.embedding_model, task_type='RETRIEVAL_DOCUMENT')
+    index = VectorIndex.from_textbooks(
+        data['textbooks'],
+        embedder.embed_many,
+        corpus=args.corpus or data.get('rag_corpus', 'local'),
+        embedding_model=args.embedding_model,
+    )
+    if args.ivf_lists:
+        index.build_ivf(args.ivf_lists)
+    index.save(args.output)
+    print(f'Indexed {len(index)} chunk(s) of {len(index.files)} textbook(s) into {args.output}')
+
+
+if __name__ == '__main__':
+    main()
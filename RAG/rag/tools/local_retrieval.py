@@ -0,0 +1,163 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Textbook retrieval from an in-process vector index.
+
+LocalVectorRetrieval is a drop-in replacement for the Vertex AI RAG Engine
+backed tool: it has the same name, description and arguments, restricts the
+search to the student's textbooks in the same way, and returns chunks in the same
+format. The search itself runs on a VectorIndex in memory (see
+rag/shared_libraries/vector_index.py), so after the query is embedded it takes
+well under a millisecond for a textbook, instead of a RAG Engine round trip.
+
+When the index has a BM25 lexical index, retrieval is hybrid: the vector and BM25
+rankings are fused with reciprocal rank fusion, so chunks that contain the exact
+terms of the question (chapter titles, formula names) are found even when their
+embeddings are not close enough. Each ranking contributes the top
+`similarity_top_k + fusion_overfetch` candidates to the fusion.
+
+Select it with RETRIEVAL_BACKEND=local and LOCAL_INDEX_PATH=<index .npz>.
+"""
+
+import functools
+import logging
+from collections.abc import Callable, Sequence
+from types import SimpleNamespace
+
+from google.genai import types
+from vertexai.preview import rag
+
+from ..shared_libraries.bm25 import reciprocal_rank_fusion
+from ..shared_libraries.metrics import Metrics
+from ..shared_libraries.retrieval_cache import RetrievalCache
+from ..shared_libraries.semantic_cache import DEFAULT_EMBEDDING_MODEL, VertexAiEmbedder
+from ..shared_libraries.textbook_manifest import TextbookManifest
+from ..shared_libraries.vector_index import DEFAULT_N_PROBE, VectorIndex
+from .textbook_retrieval import (
+    DEFAULT_SIMILARITY_TOP_K,
+    DEFAULT_VECTOR_DISTANCE_THRESHOLD,
+    TOOL_DESCRIPTION,
+    TOOL_NAME,
+    TextbookRagRetrieval,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FUSION_OVERFETCH = 10
+
+
+class LocalVectorRetrieval(TextbookRagRetrieval):
+    """TextbookRagRetrieval that searches a VectorIndex instead of the RAG Engine.
+
+    The model always calls it as a function, since Gemini's built-in retrieval
+    only reaches the RAG Engine.
+
+    Args:
+        index: The index of textbook chunks.
+        embed_fn: Returns the embedding of a query. Defaults to Vertex AI, with the
+            model the index was built with.
+        similarity_top_k: Number of chunks to retrieve.
+        vector_distance_threshold: Maximum cosine distance of retrieved chunks.
+        n_probe: Number of IVF lists to search in unrestricted searches.
+        cache: Retrieval cache to use, if any.
+        filter_by_textbook: Whether to restrict retrieval to the student's
+            textbooks when their board, grade and subject are known.
+        metrics: Where to record retrieval metrics.
+        hybrid: Whether to fuse BM25 results with vector results, when the index
+            has a BM25 index.
+        fusion_overfetch: Extra candidates each ranking contributes to the fusion,
+            beyond similarity_top_k.
+    """
+
+    uses_rag_engine = False
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        embed_fn: Callable[[str], Sequence[float]] | None = None,
+        similarity_top_k: int = DEFAULT_SIMILARITY_TOP_K,
+        vector_distance_threshold: float = DEFAULT_VECTOR_DISTANCE_THRESHOLD,
+        n_probe: int = DEFAULT_N_PROBE,
+        cache: RetrievalCache | None = None,
+        filter_by_textbook: bool = True,
+        metrics: Metrics | None = None,
+        hybrid: bool = True,
+        fusion_overfetch: int = DEFAULT_FUSION_OVERFETCH,
+    ):
+        super().__init__(
+            name=TOOL_NAME,
+            description=TOOL_DESCRIPTION,
+            rag_resources=[rag.RagResource(rag_corpus=index.corpus)],
+            similarity_top_k=similarity_top_k,
+            vector_distance_threshold=vector_distance_threshold,
+            cache=cache,
+            filter_by_textbook=filter_by_textbook,
+            metrics=metrics,
+            textbook_manifest=TextbookManifest.from_rag_files(
+                SimpleNamespace(name=f'{index.corpus}/ragFiles/{f.rag_file_id}', display_name=f.display_name)
+                for f in index.files
+            ),
+        )
+        self.index = index
+        self.embed_fn = embed_fn or VertexAiEmbedder(
+            index.embedding_model or DEFAULT_EMBEDDING_MODEL, task_type='RETRIEVAL_QUERY'
+        )
+        self.n_probe = n_probe
+        self.hybrid = hybrid and index.lexical is not None
+        self.fusion_overfetch = fusion_overfetch
+
+    def query_corpus(self, query: str, store: types.VertexRagStore) -> list[dict]:
+        rag_file_ids = [
+            file_id for resource in store.rag_resources or [] for file_id in resource.rag_file_ids or []
+        ]
+        top_k = store.similarity_top_k or DEFAULT_SIMILARITY_TOP_K
+        threshold = store.vector_distance_threshold
+        query_embedding = self.embed_fn(query)
+        matches = self.index.search(
+            query_embedding,
+            top_k=top_k + self.fusion_overfetch if self.hybrid else top_k,
+            rag_file_ids=rag_file_ids,
+            n_probe=self.n_probe,
+        )
+        matches = [(row, d) for row, d in matches if threshold is None or d <= threshold]
+
+        lexical_index = self.index.lexical if self.hybrid else None
+        if lexical_index is not None:
+            lexical = lexical_index.search(
+                query, top_k + self.fusion_overfetch, rows=self.index.rows_for(rag_file_ids)
+            )
+            fused = reciprocal_rank_fusion([[row for row, _ in matches], [row for row, _ in lexical]])
+            rows = [row for row, _ in fused[:top_k]]
+            matches = list(zip(rows, self.index.distances(query_embedding, rows).tolist(), strict=True))
+
+        chunks = []
+        for row, distance in matches[:top_k]:
+            indexed_file = self.index.file_of(row)
+            chunk = {
+                'text': self.index.texts[row],
+                'source_uri': f'{self.index.corpus}/ragFiles/{indexed_file.rag_file_id}',
+                'source_display_name': indexed_file.display_name,
+                'distance': distance,
+            }
+            location = self.index.locations[row]
+            if location:
+                chunk.update((key, value) for key, value in location.items() if value is not None)
+            chunks.append(chunk)
+        return chunks
+
+
+@functools.cache
+def load_vector_index(path: str) -> VectorIndex:
+    """Loads an index once per process."""
+    return VectorIndex.load(path)
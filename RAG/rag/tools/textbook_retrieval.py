@@ -0,0 +1,375 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Textbook retrieval tool backed by the Vertex AI RAG Engine.
+
+Both the root RAG agent and the RAG Retrieval Agent use the tool built by
+create_textbook_retrieval_tool(), so retrieval settings live in one place.
+
+When the student's board, grade and subject are known, the search is restricted
+to the RAG files of their textbook (see textbook_manifest.py) before the vector
+search runs, so that top-k slots are not spent on other textbooks.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any
+
+from google.adk.models import LlmRequest
+from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrieval
+from google.adk.tools.tool_context import ToolContext
+from google.adk.utils.model_name_utils import is_gemini_2_or_above
+from google.genai import types
+from vertexai.preview import rag
+
+from ..shared_libraries.constants import SESSION_CONTEXT_KEY
+from ..shared_libraries.context_parser import (
+    ParsedStudentContext,
+    parse_student_context,
+)
+from ..shared_libraries.metrics import Metrics, get_metrics
+from ..shared_libraries.retrieval_cache import RetrievalCache, get_retrieval_cache
+from ..shared_libraries.textbook_manifest import TextbookManifest, get_textbook_manifest
+from ..shared_libraries.vector_index import DEFAULT_N_PROBE
+
+logger = logging.getLogger(__name__)
+
+TOOL_NAME = 'retrieve_student_textbook_content'
+
+TOOL_DESCRIPTION = (
+    'Use this tool to retrieve relevant content from student textbooks in the RAG corpus. '
+    'The corpus contains PDFs organized by education board, grade level, and subject. '
+    'IMPORTANT: When calling this tool, you MUST include the student\'s education board, '
+    'grade, and subject in the query string to make retrieval more targeted and efficient. '
+    'Format your query as: "[board] [grade] [subject]: [student question]" '
+    'Example: "CBSE Grade 10 Science: What is photosynthesis?" '
+    'Retrieval is automatically restricted to the textbooks for that board, grade, and '
+    'subject, so the results do not need further filtering.'
+)
+
+DEFAULT_SIMILARITY_TOP_K = 5  # Reduced from 10 since queries are more targeted with context
+DEFAULT_VECTOR_DISTANCE_THRESHOLD = 0.6
+
+
+class TextbookRagRetrieval(VertexAiRagRetrieval):
+    """VertexAiRagRetrieval restricted to the student's textbooks, with a cache.
+
+    Textbook filtering: the student context is read from session state (set by
+    the Context Extractor Agent) or, failing that, parsed from the query. If the
+    textbook manifest has files for that board, grade and subject, only those files
+    are searched. Otherwise the whole corpus is searched, as before.
+
+    Caching: without a cache, Gemini 2+ models use the built-in Vertex AI RAG
+    retrieval, which runs inside the model call and cannot be intercepted. With a
+    cache, retrieval is always exposed to the model as a function call so that it
+    runs through run_async(), where repeated queries are answered from the cache
+    instead of the RAG Engine. This costs the LLM an extra turn per retrieval, so
+    it pays off mainly when retrieval is called directly rather than by an LLM
+    (see the RAG Retrieval stage of the explanation agent).
+
+    Metrics: every retrieval that runs through retrieve() records its duration,
+    the number of chunks returned and whether it was served from the cache.
+    Built-in retrieval inside the model call cannot be measured separately.
+
+    Backends: query_corpus() runs the search on the RAG Engine. Subclasses that
+    search elsewhere override it and set uses_rag_engine to False, so that the
+    model calls them as a function rather than through built-in retrieval.
+    """
+
+    uses_rag_engine = True
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        description: str,
+        rag_resources: list[rag.RagResource],
+        similarity_top_k: int = DEFAULT_SIMILARITY_TOP_K,
+        vector_distance_threshold: float = DEFAULT_VECTOR_DISTANCE_THRESHOLD,
+        cache: RetrievalCache | None = None,
+        filter_by_textbook: bool = True,
+        metrics: Metrics | None = None,
+        textbook_manifest: TextbookManifest | None = None,
+    ):
+        super().__init__(
+            name=name,
+            description=description,
+            rag_resources=rag_resources,
+            similarity_top_k=similarity_top_k,
+            vector_distance_threshold=vector_distance_threshold,
+        )
+        self.cache = cache
+        self.filter_by_textbook = filter_by_textbook
+        self.metrics = metrics if metrics is not None else get_metrics()
+        # A fixed index of textbooks; by default it is built from the corpus.
+        self.textbook_manifest = textbook_manifest
+
+    @property
+    def corpus(self) -> str:
+        """The corpus (or corpora) this tool retrieves from, as one string."""
+        return ','.join(sorted(r.rag_corpus for r in self.vertex_rag_store.rag_resources or []))
+
+    def rag_store_for(self, student_context: ParsedStudentContext | None) -> types.VertexRagStore:
+        """Returns the RAG store to search for a student context.
+
+        The store is restricted to the RAG files of the student's textbooks when
+        they are known, and is the unrestricted store otherwise.
+        """
+        if not self.filter_by_textbook or student_context is None:
+            return self.vertex_rag_store
+        board, grade, subject = student_context.board, student_context.grade, student_context.subject
+        if not (board and grade and subject):
+            return self.vertex_rag_store
+
+        resources = []
+        for resource in self.vertex_rag_store.rag_resources or []:
+            if not resource.rag_corpus:
+                return self.vertex_rag_store
+            manifest = self.textbook_manifest
+            if manifest is None:
+                manifest = get_textbook_manifest(resource.rag_corpus)
+            textbooks = manifest.lookup(board, grade, subject, term=student_context.term)
+            if not textbooks:
+                logger.info(
+                    'No textbook indexed for %s %s %s in %s; searching the whole corpus',
+                    board, grade, subject, resource.rag_corpus,
+                )
+                return self.vertex_rag_store
+            resources.append(
+                types.VertexRagStoreRagResource(
+                    rag_corpus=resource.rag_corpus,
+                    rag_file_ids=sorted(t.rag_file_id for t in textbooks),
+                )
+            )
+        return self.vertex_rag_store.model_copy(update={'rag_resources': resources})
+
+    def _student_context(
+        self, tool_context: ToolContext | None, query: str | None = None
+    ) -> ParsedStudentContext | None:
+        if tool_context is not None:
+            resolved = ParsedStudentContext.from_dict(tool_context.state.get(SESSION_CONTEXT_KEY) or {})
+            if resolved.is_complete:
+                return resolved
+        if query is None and tool_context is not None and tool_context.user_content:
+            query = ''.join(p.text for p in tool_context.user_content.parts or [] if p.text)
+        parsed = parse_student_context(query or '')
+        return parsed if parsed.is_confident() else None
+
+    async def process_llm_request(
+        self,
+        *,
+        tool_context: ToolContext,
+        llm_request: LlmRequest,
+    ) -> None:
+        if self.uses_rag_engine and self.cache is None and is_gemini_2_or_above(llm_request.model):
+            # Built-in Vertex AI RAG retrieval, restricted to the student's textbooks.
+            # Resolving the store may rebuild the textbook manifest, which lists
+            # the corpus files, so it runs off the event loop.
+            store = await asyncio.to_thread(self.rag_store_for, self._student_context(tool_context))
+            llm_request.config = llm_request.config or types.GenerateContentConfig()
+            llm_request.config.tools = llm_request.config.tools or []
+            llm_request.config.tools.append(
+                types.Tool(retrieval=types.Retrieval(vertex_rag_store=store))
+            )
+            return
+        # Declare the tool as a regular function, so that calls reach run_async()
+        # and can be served from the cache.
+        await super(VertexAiRagRetrieval, self).process_llm_request(
+            tool_context=tool_context, llm_request=llm_request
+        )
+
+    def retrieve(
+        self,
+        query: str,
+        student_context: ParsedStudentContext | None = None,
+    ) -> list[dict]:
+        """Retrieves chunks for a query, restricted to the student's textbooks.
+
+        This is a blocking call; run it in a thread from async code.
+
+        Args:
+            query: The retrieval query.
+            student_context: The student's board, grade and subject, if known.
+
+        Returns:
+            A list of chunks, each a dict with "text", "source_uri",
+            "source_display_name" and "distance", most relevant first.
+        """
+        start = time.perf_counter()
+        store = self.rag_store_for(student_context)
+
+        cache = self.cache
+        key = None
+        if cache is not None:
+            key = cache.make_key(
+                query=query,
+                corpus=self.corpus,
+                similarity_top_k=store.similarity_top_k,
+                vector_distance_threshold=store.vector_distance_threshold,
+                rag_file_ids=[r.rag_file_ids for r in store.rag_resources or []],
+            )
+            chunks = cache.get(key, corpus=self.corpus)
+            self.metrics.increment(
+                'rag_retrieval_cache_lookups_total', result='miss' if chunks is None else 'hit'
+            )
+            if chunks is not None:
+                self._record_retrieval(start, chunks, cache='hit')
+                return chunks
+
+        chunks = self.query_corpus(query, store)
+        if cache is not None and key is not None:
+            cache.put(key, chunks, corpus=self.corpus)
+        self._record_retrieval(start, chunks, cache='miss' if key is not None else 'disabled')
+        return chunks
+
+    def query_corpus(self, query: str, store: types.VertexRagStore) -> list[dict]:
+        """Runs a vector search on the RAG Engine, bypassing the cache.
+
+        This is the only call to the retrieval backend; benchmarks and tests
+        override it to retrieve from a local corpus.
+
+        Args:
+            query: The retrieval query.
+            store: The RAG store to search, from rag_store_for().
+
+        Returns:
+            The chunks, in the format returned by retrieve().
+        """
+        response = rag.retrieval_query(
+            text=query,
+            rag_resources=[
+                rag.RagResource(rag_corpus=r.rag_corpus, rag_file_ids=r.rag_file_ids)
+                for r in store.rag_resources or []
+            ],
+            similarity_top_k=store.similarity_top_k,
+            vector_distance_threshold=store.vector_distance_threshold,
+        )
+        logger.debug('RAG raw response: %s', response)
+        return [
+            {
+                'text': context.text,
+                'source_uri': context.source_uri,
+                'source_display_name': context.source_display_name,
+                'distance': context.distance,
+            }
+            for context in response.contexts.contexts
+        ]
+
+    def _record_retrieval(self, start: float, chunks: list[dict], cache: str) -> None:
+        self.metrics.observe('rag_retrieval_duration_seconds', time.perf_counter() - start, cache=cache)
+        self.metrics.observe('rag_retrieval_chunks', len(chunks))
+
+    async def run_async(
+        self,
+        *,
+        args: dict[str, Any],
+        tool_context: ToolContext,
+    ) -> Any:
+        query = args['query']
+        student_context = self._student_context(tool_context, query)
+        chunks = await asyncio.to_thread(self.retrieve, query, student_context)
+        if not chunks:
+            return f'No matching result found with the config: {self.rag_store_for(student_context)}'
+        return [chunk['text'] for chunk in chunks]
+
+
+def create_textbook_retrieval_tool(
+    rag_corpus: str | None = None,
+    similarity_top_k: int = DEFAULT_SIMILARITY_TOP_K,
+    vector_distance_threshold: float = DEFAULT_VECTOR_DISTANCE_THRESHOLD,
+    cache: RetrievalCache | None = None,
+    filter_by_textbook: bool = True,
+    metrics: Metrics | None = None,
+    backend: str | None = None,
+) -> TextbookRagRetrieval | None:
+    """Creates the textbook retrieval tool for a RAG corpus.
+
+    With the "vertex" backend the tool searches the RAG Engine corpus. With the
+    "local" backend it searches the in-process vector index at LOCAL_INDEX_PATH
+    (see local_retrieval.py); LOCAL_INDEX_N_PROBE sets the number of IVF lists
+    searched, LOCAL_INDEX_HYBRID ("true" by default) whether BM25 results are
+    fused in, and LOCAL_INDEX_FUSION_OVERFETCH how many extra candidates each
+    ranking contributes to the fusion.
+
+    Args:
+        rag_corpus: The RAG corpus resource name, e.g.
+            projects/123/locations/us-central1/ragCorpora/456. Defaults to the
+            RAG_CORPUS environment variable.
+        similarity_top_k: Number of chunks to retrieve.
+        vector_distance_threshold: Maximum vector distance of retrieved chunks.
+        cache: Retrieval cache to use. Defaults to the process-wide cache
+            configured by the RETRIEVAL_CACHE_* environment variables, which is
+            disabled unless RETRIEVAL_CACHE_ENABLED is set.
+        filter_by_textbook: Whether to restrict retrieval to the RAG files of the
+            student's textbooks when their board, grade and subject are known.
+        metrics: Where to record retrieval metrics. Defaults to the process-wide
+            recorder configured by METRICS_EXPORTER.
+        backend: "vertex" or "local". Defaults to the RETRIEVAL_BACKEND environment
+            variable, or "vertex".
+
+    Returns:
+        TextbookRagRetrieval: The retrieval tool, or None if no corpus is configured.
+
+    Raises:
+        ValueError: If the backend is unknown, or is "local" and LOCAL_INDEX_PATH
+            is not set.
+    """
+    cache = cache if cache is not None else get_retrieval_cache()
+    backend = (backend or os.environ.get('RETRIEVAL_BACKEND') or 'vertex').lower()
+    if backend == 'local':
+        from .local_retrieval import (
+            DEFAULT_FUSION_OVERFETCH,
+            LocalVectorRetrieval,
+            load_vector_index,
+        )
+
+        index_path = os.environ.get('LOCAL_INDEX_PATH')
+        if not index_path:
+            raise ValueError('RETRIEVAL_BACKEND is "local" but LOCAL_INDEX_PATH is not set.')
+        return LocalVectorRetrieval(
+            load_vector_index(index_path),
+            similarity_top_k=similarity_top_k,
+            vector_distance_threshold=vector_distance_threshold,
+            n_probe=int(os.environ.get('LOCAL_INDEX_N_PROBE', DEFAULT_N_PROBE)),
+            cache=cache,
+            filter_by_textbook=filter_by_textbook,
+            metrics=metrics,
+            hybrid=os.environ.get('LOCAL_INDEX_HYBRID', 'true').lower() in ('1', 'true', 'yes'),
+            fusion_overfetch=int(os.environ.get('LOCAL_INDEX_FUSION_OVERFETCH', DEFAULT_FUSION_OVERFETCH)),
+        )
+    if backend != 'vertex':
+        raise ValueError(f'Unknown RETRIEVAL_BACKEND: {backend!r}')
+
+    rag_corpus = rag_corpus or os.environ.get('RAG_CORPUS')
+    if not rag_corpus:
+        return None
+
+    return TextbookRagRetrieval(
+        name=TOOL_NAME,
+        description=TOOL_DESCRIPTION,
+        rag_resources=[
+            rag.RagResource(
+                # RAG corpus containing student textbooks organized by board, grade, and subject
+                # e.g. projects/123/locations/us-central1/ragCorpora/456
+                rag_corpus=rag_corpus
+            )
+        ],
+        similarity_top_k=similarity_top_k,
+        vector_distance_threshold=vector_distance_threshold,
+        cache=cache,
+        filter_by_textbook=filter_by_textbook,
+        metrics=metrics,
+    )
@@ -16,23 +16,31 @@
 """Runner script for the Sequential Explanation Agent.
 
 This script provides an alternative way to run the explanation agent
-programmatically using the InMemoryRunner.
+programmatically using the InMemoryRunner. The explanation is streamed as it is
+generated, and each turn reports its time to first token, the time spent in each
+stage, and the total time.
 """
 
-import os
+import asyncio
 import sys
 
-from dotenv import load_dotenv
-from google.adk.runner import InMemoryRunner
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import InMemoryRunner
 
-# Load environment variables
-load_dotenv()
+from rag.callbacks import MetricsPlugin
+from rag.explanation_agent import get_explanation_agent
+from rag.shared_libraries.metrics import get_metrics
+from rag.shared_libraries.streaming import stream_turn
 
-# Import the explanation agent
-from rag.explanation_agent import explanation_agent
+APP_NAME = 'explanation_agent'
+USER_ID = 'user_123'
 
 
-def main():
+def print_text(text: str) -> None:
+    print(text, end='', flush=True)
+
+
+async def main() -> None:
     """Run the explanation agent interactively."""
     print("=" * 60)
     print("Sequential Explanation Agent")
@@ -41,60 +49,52 @@ def main():
     print("based on their board, grade, and subject.")
     print("\nExample query: I'm studying CBSE Grade 10 Science. Can you explain photosynthesis?")
     print("\nType 'exit' or 'quit' to end the session.\n")
-    
-    # Create runner
-    runner = InMemoryRunner(explanation_agent, "explanation_agent")
-    
-    # Create a session
-    session = runner.session_service().create_session("explanation_agent", "user_123")
-    print(f"Session created: {session.id()}\n")
-    
+
+    agent = get_explanation_agent()
+    plugins: list[BasePlugin] = [MetricsPlugin()] if get_metrics().enabled else []
+    runner = InMemoryRunner(agent=agent, app_name=APP_NAME, plugins=plugins)
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    print(f"Session created: {session.id}\n")
+
     # Interactive loop
     while True:
         try:
-            # Get user input
-            user_query = input("You: ").strip()
-            
-            if user_query.lower() in ['exit', 'quit', 'q']:
-                print("\nGoodbye!")
-                break
-            
-            if not user_query:
-                continue
-            
-            print("\nAgent: ", end="", flush=True)
-            
-            # Run the agent
-            response_stream = runner.run_async(
-                "user_123",
-                session.id(),
-                user_query
+            user_query = (await asyncio.to_thread(input, "You: ")).strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\n\nGoodbye!")
+            break
+
+        if user_query.lower() in ['exit', 'quit', 'q']:
+            print("\nGoodbye!")
+            break
+
+        if not user_query:
+            continue
+
+        print("\nAgent: ", end="", flush=True)
+        try:
+            timings = await stream_turn(
+                runner,
+                user_id=USER_ID,
+                session_id=session.id,
+                message=user_query,
+                on_text=print_text,
+                answer_authors=('ExplanationGeneratorAgent', agent.name),
             )
-            
-            # Stream the response
-            full_response = ""
-            for event in response_stream:
-                if hasattr(event, 'content') and event.content:
-                    content = str(event.content)
-                    if content:
-                        print(content, end="", flush=True)
-                        full_response += content
-                elif hasattr(event, 'stringify_content'):
-                    content = event.stringify_content()
-                    if content:
-                        print(content, end="", flush=True)
-                        full_response += content
-            
-            print("\n")  # New line after response
-            
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
             break
         except Exception as e:
             print(f"\nError: {e}")
             print("Please try again.\n")
+            continue
 
+        print("\n")
+        print(f"[{timings.summary()}]\n", file=sys.stderr)
 
-if __name__ == "__main__":
-    main()
 
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from benchmarks.load_test import create_agent
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag.batch import BatchItem, BatchResult, run_batch
+
+STORY = "I'm studying CBSE Grade 10 Science. What is photosynthesis? Explain like a story."
+
+
+class CountingRetrieval(FixtureRetrieval):
+    """Counts searches, and fails the ones that mention "magnesium"."""
+
+    def __init__(self, find_nothing: bool = False):
+        super().__init__(latency=0)
+        self.queries: list[str] = []
+        self.find_nothing = find_nothing
+
+    def query_corpus(self, query: str, store: types.VertexRagStore) -> list[dict]:
+        self.queries.append(query)
+        if 'magnesium' in query:
+            raise RuntimeError('backend unavailable')
+        return [] if self.find_nothing else super().query_corpus(query, store)
+
+
+def run(
+    retrieval: CountingRetrieval, questions_by_session: list[list[str]]
+) -> tuple[list[BatchItem], list[BatchResult], InMemoryRunner]:
+    async def main() -> tuple[list[BatchItem], list[BatchResult], InMemoryRunner]:
+        llm = StubLlm(first_token_latency=0, tokens_per_second=1e6, output_tokens=20)
+        runner = InMemoryRunner(create_agent('explanation', llm, retrieval), app_name='classroom')
+        items: list[BatchItem] = []
+        for questions in questions_by_session:
+            session = await runner.session_service.create_session(app_name='classroom', user_id='student')
+            items.extend(BatchItem(session.id, question) for question in questions)
+        results = [result async for result in run_batch(runner, items, max_concurrency=3)]
+        return items, sorted(results, key=lambda r: r.index), runner
+
+    return asyncio.run(main())
+
+
+def test_identical_questions_share_retrieval_and_generation() -> None:
+    retrieval = CountingRetrieval()
+    questions = [[STORY], [STORY], [STORY], ["I'm in CBSE Grade 10 Science. What is respiration? Use simple examples."]]
+
+    items, results, runner = run(retrieval, questions)
+
+    assert [r.error for r in results] == [None] * 4
+    assert [r.shared for r in results] == [False, True, True, False]
+    assert results[1].explanation == results[0].explanation
+    assert {getattr(r.student_context, 'textbook', None) for r in results} == {'CBSE Grade 10 Science'}
+    assert len(retrieval.queries) == 2
+
+    sessions = [
+        asyncio.run(
+            runner.session_service.get_session(app_name='classroom', user_id='student', session_id=item.session_id)
+        )
+        for item in items
+    ]
+    assert sessions[1] is not None and sessions[1].state['final_explanation'] == results[0].explanation
+    assert [event.author for event in sessions[1].events] == ['user', 'explanation_agent']
+    # Prefetched chunks are passed with the turn, not left in session state.
+    assert all(session is not None and 'prefetched_retrieval' not in session.state for session in sessions)
+
+
+def test_ungrounded_answers_are_not_shared() -> None:
+    retrieval = CountingRetrieval(find_nothing=True)
+
+    _items, results, _runner = run(retrieval, [[STORY], [STORY]])
+
+    assert [r.error for r in results] == [None, None]
+    assert [r.shared for r in results] == [False, False]
+    assert len(retrieval.queries) == 1
+
+
+def test_failed_turn_is_reported_and_session_order_is_kept() -> None:
+    retrieval = CountingRetrieval()
+    questions = [[
+        'CBSE Grade 10 Science: how does magnesium ribbon burn?',
+        'What is Ohm\'s law?',
+    ]]
+
+    _items, results, _runner = run(retrieval, questions)
+
+    assert isinstance(results[0].error, RuntimeError)
+    assert results[1].error is None and results[1].explanation
+    # The follow-up was resolved from the first turn's context, after it ran.
+    assert retrieval.queries[-1] == "CBSE Grade 10 Science: What is Ohm's law?"
@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+import zlib
+
+import numpy as np
+
+from rag.shared_libraries.bm25 import BM25Index, reciprocal_rank_fusion
+from rag.shared_libraries.context_parser import parse_student_context
+from rag.shared_libraries.vector_index import VectorIndex
+from rag.tools import LocalVectorRetrieval
+
+TEXTBOOKS = [
+    {
+        'rag_file_id': '1',
+        'display_name': 'TamilNaduStateBoard_Grade4_English_Term1.pdf',
+        'chunks': [
+            'Unit 2: My Little Pictionary. Look at the pictures and learn the words.',
+            'Read the story of the clever crow and answer the questions.',
+            'A picture dictionary shows words together with pictures.',
+        ],
+    },
+    {
+        'rag_file_id': '2',
+        'display_name': 'CBSE_Grade10_Science.pdf',
+        'chunks': ['Photosynthesis happens in the leaves of green plants.'],
+    },
+]
+
+
+def unrelated_embedding(text: str) -> list[float]:
+    """An embedding model that knows nothing: every text gets a random vector."""
+    return np.random.default_rng(zlib.crc32(text.encode())).normal(size=64).tolist()
+
+
+def test_bm25_ranks_exact_terms_and_rrf_fuses_rankings() -> None:
+    index = BM25Index.build(chunk for textbook in TEXTBOOKS for chunk in textbook['chunks'])
+
+    results = index.search('explain MY LITTLE PICTIONARY like a story', top_k=3)
+    assert results[0][0] == 0
+    assert index.search('pictionary', top_k=3, rows=np.array([1, 2, 3])) == []
+
+    assert [item for item, _ in reciprocal_rank_fusion([[1, 2, 3], [3, 1]])] == [1, 3, 2]
+
+
+def test_hybrid_retrieval_finds_exact_terms_the_vector_search_misses(tmp_path: pathlib.Path) -> None:
+    index = VectorIndex.from_textbooks(
+        TEXTBOOKS, lambda texts: [unrelated_embedding(t) for t in texts], corpus='local'
+    )
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    index = VectorIndex.load(path)
+    context = parse_student_context('Tamil Nadu State Board Grade 4 English')
+    query = 'Tamil Nadu State Board Grade 4 English: explain MY LITTLE PICTIONARY like a story'
+
+    vector_only = LocalVectorRetrieval(index, embed_fn=unrelated_embedding, hybrid=False)
+    hybrid = LocalVectorRetrieval(index, embed_fn=unrelated_embedding, similarity_top_k=2)
+
+    assert vector_only.retrieve(query, context) == []
+    chunks = hybrid.retrieve(query, context)
+    assert chunks[0]['text'].startswith('Unit 2: My Little Pictionary')
+    assert len(chunks) == 2
+    assert {c['source_display_name'] for c in chunks} == {'TamilNaduStateBoard_Grade4_English_Term1.pdf'}
@@ -0,0 +1,90 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from benchmarks.load_test import create_agent
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag.coalescing import TurnCoalescer
+from rag.shared_libraries.metrics import InMemoryExporter, Metrics
+from rag.shared_libraries.streaming import TurnTimings
+
+STORY = "I'm studying CBSE Grade 10 Science. What is photosynthesis? Explain like a story."
+
+
+class CountingRetrieval(FixtureRetrieval):
+    def __init__(self) -> None:
+        super().__init__(latency=0)
+        self.queries: list[str] = []
+
+    def query_corpus(self, query: str, store: types.VertexRagStore) -> list[dict]:
+        self.queries.append(query)
+        return super().query_corpus(query, store)
+
+
+Answers = list[tuple[str, str]]
+
+
+def run(messages_by_session: list[str]) -> tuple[InMemoryRunner, CountingRetrieval, InMemoryExporter, Answers]:
+    """Sends each session's message at the same time and returns the answers."""
+
+    async def main() -> tuple[InMemoryRunner, CountingRetrieval, InMemoryExporter, Answers]:
+        retrieval = CountingRetrieval()
+        llm = StubLlm(first_token_latency=0.05, tokens_per_second=2000, output_tokens=40)
+        runner = InMemoryRunner(create_agent('explanation', llm, retrieval), app_name='classroom')
+        metrics = InMemoryExporter()
+        coalescer = TurnCoalescer(runner, metrics=Metrics([metrics]))
+
+        async def ask(message: str) -> tuple[str, str]:
+            session = await runner.session_service.create_session(app_name='classroom', user_id='student')
+            items = [item async for item in coalescer.iter_turn('student', session.id, message)]
+            assert isinstance(items[-1], TurnTimings)
+            return session.id, ''.join(item for item in items[:-1] if isinstance(item, str))
+
+        answers = await asyncio.gather(*(ask(message) for message in messages_by_session))
+        return runner, retrieval, metrics, answers
+
+    return asyncio.run(main())
+
+
+def test_identical_questions_in_flight_run_once() -> None:
+    runner, retrieval, metrics, answers = run([STORY, STORY, STORY])
+
+    assert len(retrieval.queries) == 1
+    assert len({answer for _, answer in answers}) == 1
+    assert 'photosynthesis' in answers[0][1]
+    assert metrics.counter('rag_coalesced_turns_total', role='leader') == 1
+    assert metrics.counter('rag_coalesced_turns_total', role='follower') == 2
+
+    # Every session has the turn in its history, ready for follow-ups.
+    for session_id, answer in answers:
+        session = asyncio.run(
+            runner.session_service.get_session(app_name='classroom', user_id='student', session_id=session_id)
+        )
+        assert session is not None
+        assert session.state['final_explanation'] == answer
+        assert session.state['student_context']['grade'] == 'Grade 10'
+        content = session.events[0].content
+        assert content is not None and content.parts
+        assert content.parts[0].text == STORY
+
+
+def test_questions_without_a_resolved_context_are_not_coalesced() -> None:
+    _runner, _retrieval, metrics, answers = run(['What is photosynthesis?', 'What is photosynthesis?'])
+
+    assert metrics.counter('rag_coalesced_turns_total', role='follower') == 0
+    assert all(answer for _, answer in answers)
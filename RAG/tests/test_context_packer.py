@@ -0,0 +1,57 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from rag.agents.rag_retrieval_agent import format_retrieved_chunks
+from rag.shared_libraries.context_packer import (
+    ContextPacker,
+    estimate_tokens,
+    token_budget_for,
+)
+from rag.shared_libraries.context_parser import parse_student_context
+
+
+def chunk(text: str, distance: float, **metadata: str) -> dict:
+    return {'text': text, 'source_display_name': 'CBSE_Grade10_Science.pdf', 'distance': distance, **metadata}
+
+
+def test_packs_chunks_in_retriever_order_and_cuts_at_sentences() -> None:
+    long_text = ' '.join(f'Sentence number {i} is about refraction of light.' for i in range(40))
+    # Ranked by fusion of vector and lexical results, not by vector distance.
+    chunks = [
+        chunk('Light bends when it enters water.', 0.3),
+        chunk(long_text, 0.1, chapter='Chapter 10 Light'),
+        chunk('Least relevant. ' * 30, 0.2, chapter='Chapter 9'),
+    ]
+    packer = ContextPacker(token_budget=300, min_chunk_tokens=20)
+    packed = packer.pack(chunks)
+
+    assert packed.chunks[0]['text'] == 'Light bends when it enters water.'
+    cut = packed.chunks[1]
+    assert cut['truncated'] and cut['text'].endswith('light.') and cut['text'] in long_text
+    assert packed.tokens <= 300
+    assert packed.omitted == [{'source_display_name': 'CBSE_Grade10_Science.pdf', 'chapter': 'Chapter 9', 'distance': 0.2}]
+
+    formatted = format_retrieved_chunks(parse_student_context('CBSE Grade 10 Science'), packed.chunks, packed.omitted)
+    assert 'Least relevant' not in formatted
+    assert '[3] Source: CBSE_Grade10_Science.pdf (Chapter 9)' in formatted
+    assert estimate_tokens(formatted) < 300 + 60
+
+
+def test_budget_depends_on_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('CONTEXT_TOKEN_BUDGET', raising=False)
+    assert token_budget_for('gemini-2.5-flash-lite') < token_budget_for('gemini-2.5-flash') < token_budget_for('gemini-2.5-pro')
+    monkeypatch.setenv('CONTEXT_TOKEN_BUDGET', '1234')
+    assert ContextPacker.for_model('gemini-2.5-pro').token_budget == 1234
@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from rag.shared_libraries.context_parser import (
+    ParsedStudentContext,
+    parse_context_json,
+    parse_student_context,
+)
+
+
+@pytest.mark.parametrize(
+    'query, expected',
+    [
+        (
+            "I'm studying CBSE Grade 10 Science. Can you explain photosynthesis?",
+            {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'},
+        ),
+        (
+            "I'm studying Tamil Nadu State Board Grade 4 Science. Explain photosynthesis like a story.",
+            {'board': 'Tamil Nadu State Board', 'grade': 'Grade 4', 'subject': 'Science'},
+        ),
+        (
+            "I'm studying Maharashtra State Board Class 12 Mathematics. Explain with simple examples.",
+            {'board': 'Maharashtra State Board', 'grade': 'Class 12', 'subject': 'Mathematics'},
+        ),
+        (
+            'i am studing in 4th science in tamilnadu state board : what is transparent object?',
+            {'board': 'Tamil Nadu State Board', 'grade': 'Grade 4', 'subject': 'Science'},
+        ),
+        (
+            'cbse class x social science: what is federalism?',
+            {'board': 'CBSE', 'grade': 'Class 10', 'subject': 'Social Science'},
+        ),
+        (
+            'Tamil Nadu State Board Grade 4 English: can you explain MY LITTLE PICTIONARY',
+            {'board': 'Tamil Nadu State Board', 'grade': 'Grade 4', 'subject': 'English'},
+        ),
+        (
+            'ICSE grade10 mathematcs: what is a prime number?',
+            {'board': 'ICSE', 'grade': 'Grade 10', 'subject': 'Mathematics'},
+        ),
+    ],
+)
+def test_confident_parses(query: str, expected: dict[str, str]) -> None:
+    parsed = parse_student_context(query)
+    assert parsed.to_dict() == expected
+    assert parsed.is_confident()
+
+
+@pytest.mark.parametrize(
+    'query',
+    [
+        'What is a quadratic equation? Use memory techniques.',
+        "I'm in 5th grade CBSE. What is photosynthesis?",
+        "I'm in Class 9 ICSE. Help me with algebra using simple examples.",
+        "Explain Newton's 1st law",
+        'I study maths and science in CBSE Grade 4',
+        'Hi, how are you?',
+    ],
+)
+def test_uncertain_parses_fall_back_to_llm(query: str) -> None:
+    assert not parse_student_context(query).is_confident()
+
+
+def test_missing_fields_are_not_specified() -> None:
+    parsed = parse_student_context('What about cellular respiration?')
+    assert not parsed.mentions_context
+    assert parsed.to_dict() == {
+        'board': 'Not Specified',
+        'grade': 'Not Specified',
+        'subject': 'Not Specified',
+    }
+
+
+def test_follow_up_updates_only_mentioned_fields() -> None:
+    previous = ParsedStudentContext.from_dict(
+        {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'}
+    )
+    parsed = parse_student_context("Actually, I'm in Grade 11 now.")
+    assert parsed.mentions_context
+    merged = parsed.merged_onto(previous)
+    assert merged.to_dict() == {'board': 'CBSE', 'grade': 'Grade 11', 'subject': 'Science'}
+    assert merged.is_confident()
+
+
+def test_weak_signals_do_not_count_as_context_changes() -> None:
+    assert not parse_student_context("Explain Newton's 1st law").mentions_context
+
+
+def test_parse_context_json_tolerates_code_fences() -> None:
+    text = '```json\n{"board": "ICSE", "grade": "Class 9", "subject": "Mathematics"}\n```'
+    assert parse_context_json(text) == {
+        'board': 'ICSE',
+        'grade': 'Class 9',
+        'subject': 'Mathematics',
+    }
+    assert parse_context_json('Could you tell me your board and grade?') is None
@@ -0,0 +1,54 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from rag.shared_libraries.explanation_style import (
+    MEMORY_TECHNIQUE,
+    SIMPLE_EXAMPLES,
+    STORY,
+    parse_style_reply,
+)
+
+
+@pytest.mark.parametrize(
+    'reply, expected',
+    [
+        ('1', STORY),
+        ('the first one', STORY),
+        ('Explain it like a story', STORY),
+        ('2', MEMORY_TECHNIQUE),
+        ("I'll go with the second one", MEMORY_TECHNIQUE),
+        ('memory technique', MEMORY_TECHNIQUE),
+        ('Option 3 please', SIMPLE_EXAMPLES),
+        ('simple examples', SIMPLE_EXAMPLES),
+    ],
+)
+def test_menu_replies(reply: str, expected: str) -> None:
+    assert parse_style_reply(reply) == expected
+
+
+@pytest.mark.parametrize(
+    'question',
+    [
+        'What is a simple machine?',
+        'First law of motion?',
+        'Second law of thermodynamics',
+        'memory of a computer?',
+        'One more doubt',
+        'Explain refraction like a story',
+    ],
+)
+def test_new_questions_are_not_replies(question: str) -> None:
+    assert parse_style_reply(question) is None
@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Any, TypeVar
+
+import httpx
+import pytest
+from google.adk.sessions import Session
+
+from benchmarks.load_test import create_agent
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag import gateway as gateway_module
+from rag.gateway import AgentGateway, create_gateway_app
+
+T = TypeVar('T')
+
+QUESTION = "I'm studying CBSE Grade 10 Science. What is photosynthesis? Explain like a story."
+
+
+def parse_events(body: str) -> list[tuple[str, dict[str, Any]]]:
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def run(test: Callable[[AgentGateway, httpx.AsyncClient], Awaitable[T]]) -> T:
+    async def main() -> T:
+        llm = StubLlm(first_token_latency=0, tokens_per_second=1e6, output_tokens=20)
+        agent = create_agent('explanation', llm, FixtureRetrieval(latency=0))
+        gateway = AgentGateway({'explanation_agent': agent}, session_pool_size=2)
+        await gateway.start()
+        transport = httpx.ASGITransport(app=create_gateway_app(gateway))
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url='http://gateway') as client:
+                return await test(gateway, client)
+        finally:
+            await gateway.close()
+
+    return asyncio.run(main())
+
+
+def test_streams_only_the_answer_text() -> None:
+    async def test(
+        gateway: AgentGateway, client: httpx.AsyncClient
+    ) -> tuple[httpx.Response, list[tuple[str, dict[str, Any]]]]:
+        response = await client.post('/apps/explanation_agent/stream', json={'message': QUESTION})
+        return response, parse_events(response.text)
+
+    response, events = run(test)
+
+    assert response.headers['content-type'].startswith('text/event-stream')
+    names = [name for name, _ in events]
+    assert names[0] == 'session' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'text'}
+    answer = ''.join(data['text'] for name, data in events if name == 'text')
+    assert 'photosynthesis' in answer
+    # Neither the extracted context nor the retrieved chunks are streamed.
+    assert 'board' not in answer and 'Retrieved content' not in answer
+    assert events[-1][1]['timings']['total'] > 0
+
+
+def test_sessions_come_from_the_pool_and_keep_history() -> None:
+    async def test(
+        gateway: AgentGateway, client: httpx.AsyncClient
+    ) -> tuple[list[tuple[str, dict[str, Any]]], Session | None, int, int]:
+        pool = gateway.pools['explanation_agent']
+        for _ in range(100):  # Let the pool fill.
+            if pool.available == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.available == 2
+        session_id = (await client.post('/apps/explanation_agent/sessions')).json()['session_id']
+        await client.post('/apps/explanation_agent/stream', json={'message': QUESTION, 'session_id': session_id})
+        follow_up = await client.post(
+            '/apps/explanation_agent/stream', json={'message': 'Tell me more', 'session_id': session_id}
+        )
+        session = await gateway.session_service.get_session(
+            app_name='explanation_agent', user_id=gateway.user_id, session_id=session_id
+        )
+        missing = await client.post('/apps/explanation_agent/stream', json={'message': 'hi', 'session_id': 'nope'})
+        unknown = await client.post('/apps/other/sessions')
+        return parse_events(follow_up.text), session, missing.status_code, unknown.status_code
+
+    events, session, missing, unknown = run(test)
+
+    assert events[-1][0] == 'done'
+    assert session is not None
+    assert session.state['session_student_context']['board'] == 'CBSE'
+    assert (missing, unknown) == (404, 404)
+
+
+def test_a_turn_that_ends_without_timings_is_an_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def truncated_turn(*args: Any, **kwargs: Any) -> AsyncGenerator[str, None]:
+        yield 'Once upon'
+
+    monkeypatch.setattr(gateway_module, 'iter_turn', truncated_turn)
+
+    async def test(gateway: AgentGateway, client: httpx.AsyncClient) -> list[tuple[str, dict[str, Any]]]:
+        gateway.coalescers.clear()
+        response = await client.post('/apps/explanation_agent/stream', json={'message': QUESTION})
+        return parse_events(response.text)
+
+    events = run(test)
+
+    assert [name for name, _ in events] == ['session', 'text', 'error']
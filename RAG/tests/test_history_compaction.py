@@ -0,0 +1,163 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+from pydantic import Field
+
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag.explanation_agent import create_explanation_agent
+from rag.shared_libraries.history_compaction import (
+    CompactedHistory,
+    HistoryCompactor,
+    content_tokens,
+)
+from rag.shared_libraries.stage_config import StageConfig
+from rag.shared_libraries.student_context import StudentContext
+
+
+def user(text: str) -> types.Content:
+    return types.Content(role='user', parts=[types.Part(text=text)])
+
+
+def turn(question: str, answer: str) -> list[types.Content]:
+    """A past turn as the Explanation Generator sees it."""
+    return [
+        user(question),
+        types.Content(role='user', parts=[
+            types.Part(text='For context:'),
+            types.Part(text='[RagRetrievalAgent] said: Retrieved content: ' + 'textbook text. ' * 100),
+        ]),
+        types.Content(role='model', parts=[types.Part(text=answer)]),
+    ]
+
+
+def history(n: int) -> list[types.Content]:
+    contents: list[types.Content] = []
+    for i in range(n):
+        contents += turn(f'Question {i}?', f'Answer {i}. More detail {i}.')
+    return [*contents, user('Current question?')]
+
+
+CONTEXT = StudentContext(board='CBSE', grade='Grade 10', subject='Science')
+
+
+def summary_text(compacted: CompactedHistory) -> str:
+    """The text of the summary that replaces the folded turns."""
+    parts = compacted.contents[0].parts
+    assert parts is not None and parts[0].text == 'For context:'
+    return parts[1].text or ''
+
+
+def test_short_history_is_sent_unchanged() -> None:
+    assert HistoryCompactor(token_threshold=10_000).compact(history(3)) is None
+    assert HistoryCompactor(token_threshold=10, keep_turns=3).compact(history(3)) is None
+    # The whole history is above the threshold, but the one turn to fold is not.
+    assert HistoryCompactor(token_threshold=500, keep_turns=2).compact(history(3)) is None
+
+
+def test_older_turns_are_folded_into_a_summary() -> None:
+    contents = history(5)
+    compacted = HistoryCompactor(token_threshold=500, keep_turns=2).compact(contents, CONTEXT)
+    assert compacted is not None
+
+    text = summary_text(compacted)
+    assert 'first 3 turns' in text and 'Student context: CBSE, Grade 10, Science' in text
+    assert '- Student: Question 0?\n  Answer: Answer 0. More detail 0.' in text
+    assert 'Question 3?' not in text
+    # The last two turns and the current message are kept verbatim.
+    assert compacted.contents[1:] == contents[9:]
+    assert compacted.summary['turns'] == 3
+    assert compacted.tokens_removed > 0
+    assert sum(content_tokens(c) for c in compacted.contents) < sum(content_tokens(c) for c in contents)
+
+
+def test_running_summary_is_extended_not_rebuilt() -> None:
+    compactor = HistoryCompactor(token_threshold=500, keep_turns=2)
+    previous = {'turns': 2, 'lines': ['- kept line 1', '- kept line 2'], 'last_question': 'Question 1?'}
+
+    extended = compactor.compact(history(5), CONTEXT, summary=previous)
+    assert extended is not None
+    assert extended.summary['lines'][:2] == ['- kept line 1', '- kept line 2']
+    assert extended.summary['lines'][2].startswith('- Student: Question 2?')
+
+    # A summary of another conversation is not reused.
+    stale = dict(previous, last_question='Something else?')
+    rebuilt = compactor.compact(history(5), CONTEXT, summary=stale)
+    assert rebuilt is not None
+    assert rebuilt.summary['lines'][0].startswith('- Student: Question 0?')
+
+
+def test_summary_keeps_the_newest_lines_within_its_budget() -> None:
+    compacted = HistoryCompactor(token_threshold=500, keep_turns=1, summary_token_budget=30).compact(history(8))
+    assert compacted is not None
+
+    lines = compacted.summary['lines']
+    assert len(lines) < 7 and lines[-1].startswith('- Student: Question 6?')
+    assert f'({7 - len(lines)} earlier turns not shown)' in summary_text(compacted)
+
+
+class RecordingLlm(StubLlm):
+    """Records the estimated input tokens of the conversation in each request."""
+
+    requests: list[int] = Field(default_factory=list)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.requests.append(sum(map(content_tokens, llm_request.contents)))
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+def test_input_tokens_stop_growing_in_long_sessions() -> None:
+    questions = [
+        "I'm studying CBSE Grade 10 Science. What is photosynthesis?",
+        'What are stomata?',
+        'What is respiration?',
+        'What is a chemical reaction?',
+        'What are acids?',
+        "What is Ohm's law?",
+    ]
+
+    async def main() -> tuple[list[int], dict[str, Any]]:
+        llm = RecordingLlm(first_token_latency=0, tokens_per_second=1e6, output_tokens=80)
+        agent = create_explanation_agent(
+            model=llm,
+            retrieval_tool=FixtureRetrieval(latency=0),
+            context_extractor_config=StageConfig(),
+            rag_retrieval_config=StageConfig(),
+            explanation_generator_config=StageConfig(),
+            history_compactor=HistoryCompactor(token_threshold=100, keep_turns=2),
+        )
+        runner = InMemoryRunner(agent, app_name='tutor')
+        session = await runner.session_service.create_session(app_name='tutor', user_id='student')
+        for question in questions:
+            async for _ in runner.run_async(user_id='student', session_id=session.id, new_message=user(question)):
+                pass
+        finished = await runner.session_service.get_session(app_name='tutor', user_id='student', session_id=session.id)
+        assert finished is not None
+        return llm.requests, finished.state
+
+    requests, state = asyncio.run(main())
+
+    # One generator request per turn; from the fourth turn on, only two turns are kept.
+    assert len(requests) == len(questions)
+    assert max(requests[3:]) - min(requests[3:]) < 150
+    assert state['conversation_summary']['turns'] == 3
@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import Any, NoReturn
+
+import pytest
+from google.adk.events import Event
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from rag.explanation_agent import create_explanation_agent
+from rag.shared_libraries.intent_classifier import classify_intent
+from rag.tools import TextbookRagRetrieval, create_textbook_retrieval_tool
+
+CORPUS = 'projects/123/locations/us-central1/ragCorpora/456'
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('Hi, how are you?', 'small_talk'),
+    ('Hello there!', 'greeting'),
+    ('thank you so much teacher', 'thanks'),
+    ('Thanks, I got all the information I need. Goodbye!', 'farewell'),
+    ('Hi! What is photosynthesis?', 'academic'),
+    ('Thanks! What about respiration?', 'academic'),
+    ("Hi, I'm studying CBSE Grade 10 Science", 'academic'),
+    ('1', 'academic'),
+    ('ok', 'academic'),
+])
+def test_classify_intent(message: str, intent: str) -> None:
+    assert classify_intent(message) == intent
+
+
+def test_small_talk_skips_the_workflow(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(*args: Any, **kwargs: Any) -> NoReturn:
+        raise AssertionError('no stage should run')
+
+    monkeypatch.setattr(TextbookRagRetrieval, 'retrieve', fail)
+    agent = create_explanation_agent(model='unused', retrieval_tool=create_textbook_retrieval_tool(CORPUS))
+
+    async def run() -> list[Event]:
+        runner = InMemoryRunner(agent, app_name='test')
+        session = await runner.session_service.create_session(
+            app_name='test',
+            user_id='student',
+            state={'session_student_context': {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'}},
+        )
+        return [
+            event
+            async for event in runner.run_async(
+                user_id='student',
+                session_id=session.id,
+                new_message=types.Content(role='user', parts=[types.Part(text='Hi, how are you?')]),
+            )
+        ]
+
+    events = asyncio.run(run())
+
+    assert [event.author for event in events] == ['explanation_agent']
+    content = events[0].content
+    assert content is not None and content.parts
+    assert 'CBSE Grade 10 Science textbook' in (content.parts[0].text or '')
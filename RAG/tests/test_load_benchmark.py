@@ -0,0 +1,41 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+from benchmarks.load_test import create_agent, percentile, run_load_test
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag.shared_libraries.context_parser import parse_student_context
+
+
+def test_fixture_retrieval_is_restricted_to_the_students_textbook() -> None:
+    retrieval = FixtureRetrieval(latency=0)
+    context = parse_student_context('CBSE Grade 10 Science')
+
+    chunks = retrieval.retrieve('CBSE Grade 10 Science: what is photosynthesis?', context)
+
+    assert chunks[0]['text'].startswith('Photosynthesis is the process')
+    assert {c['source_display_name'] for c in chunks} == {'CBSE_Grade10_Science.pdf'}
+
+
+def test_load_test_runs_offline() -> None:
+    llm = StubLlm(first_token_latency=0, tokens_per_second=1e6, output_tokens=20)
+    agent = create_agent('explanation', llm, FixtureRetrieval(latency=0))
+
+    result = asyncio.run(run_load_test(agent, sessions=3, turns=2))
+
+    assert result.turns == 6
+    assert len(result.times_to_first_token) == 6
+    assert set(result.stages) >= {'ContextExtractorAgent', 'RagRetrievalAgent', 'ExplanationGeneratorAgent'}
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
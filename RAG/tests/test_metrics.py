@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import LlmAgent, SequentialAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from rag.callbacks import MetricsPlugin
+from rag.shared_libraries.metrics import Histogram, Metrics, PrometheusExporter
+
+
+class StubLlm(BaseLlm):
+    """Calls the `lookup` tool once, then answers; reports fixed token usage."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        called_tool = any(
+            part.function_response
+            for content in llm_request.contents
+            for part in content.parts or []
+        )
+        if called_tool:
+            part = types.Part(text='Plants make food from sunlight.')
+        else:
+            part = types.Part(function_call=types.FunctionCall(name='lookup', args={'topic': 'plants'}))
+        yield LlmResponse(
+            content=types.Content(role='model', parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=120, candidates_token_count=30
+            ),
+        )
+
+
+def lookup(topic: str) -> str:
+    """Looks a topic up."""
+    return f'{topic} make food'
+
+
+def histogram(exporter: PrometheusExporter, name: str, **labels: str) -> Histogram:
+    found = exporter.histogram(name, **labels)
+    assert found is not None
+    return found
+
+
+def test_records_agent_model_and_tool_metrics() -> None:
+    exporter = PrometheusExporter()
+    agent = SequentialAgent(
+        name='explanation_agent',
+        sub_agents=[LlmAgent(name='ExplanationGeneratorAgent', model=StubLlm(model='stub'), tools=[lookup])],
+    )
+    runner = InMemoryRunner(agent, app_name='test', plugins=[MetricsPlugin(Metrics([exporter]))])
+
+    async def run() -> None:
+        session = await runner.session_service.create_session(app_name='test', user_id='student')
+        async for _ in runner.run_async(
+            user_id='student',
+            session_id=session.id,
+            new_message=types.Content(role='user', parts=[types.Part(text='Explain photosynthesis')]),
+        ):
+            pass
+
+    asyncio.run(run())
+
+    stage = {'agent': 'ExplanationGeneratorAgent'}
+    model = {**stage, 'model': 'stub'}
+    assert histogram(exporter, 'rag_invocation_duration_seconds').count == 1
+    assert histogram(exporter, 'rag_agent_duration_seconds', agent='explanation_agent').count == 1
+    assert histogram(exporter, 'rag_agent_duration_seconds', **stage).count == 1
+    assert histogram(exporter, 'rag_model_duration_seconds', **model).count == 2
+    assert histogram(exporter, 'rag_model_input_tokens', **model).sum == 240
+    assert histogram(exporter, 'rag_model_output_tokens', **model).sum == 60
+    assert histogram(exporter, 'rag_tool_duration_seconds', **stage, tool='lookup').count == 1
+
+    text = exporter.render()
+    assert '# TYPE rag_model_input_tokens histogram' in text
+    assert 'rag_model_input_tokens_bucket{agent="ExplanationGeneratorAgent",model="stub",le="250"} 2' in text
+    assert 'rag_model_input_tokens_count{agent="ExplanationGeneratorAgent",model="stub"} 2' in text
+
+
+def test_histogram_quantiles_and_disabled_metrics() -> None:
+    histogram = Histogram(buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 1.75
+    assert histogram.quantile(1.0) == 4
+
+    metrics = Metrics()
+    assert not metrics.enabled
+    with metrics.timer('rag_agent_duration_seconds', agent='x'):
+        pass
@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pathlib
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from rag.agents.rag_retrieval_agent import format_retrieved_chunks
+from rag.shared_libraries.context_parser import parse_student_context
+from rag.shared_libraries.pdf_chunker import chunk_pdf, iter_pages, read_chunks
+from rag.shared_libraries.vector_index import VectorIndex, textbooks_from_chunk_files
+from rag.tools import LocalVectorRetrieval
+from tests.test_vector_index import bag_of_words
+
+
+def make_pdf(
+    path: str, pages: list[list[str]], outline: Sequence[tuple[int, str]] = ()
+) -> None:
+    """Writes a PDF with one line of text per item of each page."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    for lines in pages:
+        page = writer.add_blank_page(612, 792)
+        stream = DecodedStreamObject()
+        stream.set_data('\n'.join(
+            ['BT', '/F1 12 Tf', '14 TL', '72 720 Td'] + [f'({line}) Tj T*' for line in lines] + ['ET']
+        ).encode('latin-1'))
+        page[NameObject('/Contents')] = writer._add_object(stream)
+        page[NameObject('/Resources')] = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+        })
+    for page_index, title in outline:
+        writer.add_outline_item(title, page_index)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def textbook_pages(chapter_two_words: str = 'reflection') -> list[list[str]]:
+    return [
+        ['Chapter 1 Light', '1.1 Sources of light', 'The sun is a natural source of light.'],
+        ['Light travels in straight lines. ' * 4],
+        ['Chapter 2 Mirrors', '2.1 Plane mirrors', f'A plane mirror shows {chapter_two_words}.'],
+        ['2.2 Curved mirrors', 'Concave mirrors converge light. ' * 3],
+    ]
+
+
+def test_chunks_keep_chapter_section_and_page(tmp_path: pathlib.Path) -> None:
+    pdf = str(tmp_path / 'science.pdf')
+    make_pdf(pdf, textbook_pages())
+    output = str(tmp_path / 'science.jsonl')
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert [p.number for p in iter_pages(pdf, executor, pages_per_task=1, max_pending=2)] == [1, 2, 3, 4]
+        written = chunk_pdf(pdf, output, 'CBSE_Grade10_Science.pdf', executor, max_words=20, overlap_words=5)
+
+    chunks = list(read_chunks(output))
+    assert written == len(chunks) > 2
+    assert {c['chapter'] for c in chunks} == {'Chapter 1 Light', 'Chapter 2 Mirrors'}
+    assert all(c['display_name'] == 'CBSE_Grade10_Science.pdf' for c in chunks)
+    first_chapter_two = next(c for c in chunks if c['chapter'] == 'Chapter 2 Mirrors')
+    assert first_chapter_two['page_start'] == 3
+    assert first_chapter_two['section'] == '2.1 Plane mirrors'
+    assert 'Chapter 1' not in first_chapter_two['text']  # chunks never span chapters
+
+
+def test_reprocesses_one_chapter(tmp_path: pathlib.Path) -> None:
+    pdf = str(tmp_path / 'science.pdf')
+    outline = [(0, 'Chapter 1 Light'), (2, 'Chapter 2 Mirrors')]
+    make_pdf(pdf, textbook_pages(), outline)
+    output = str(tmp_path / 'science.jsonl')
+    chunk_pdf(pdf, output, max_words=20, overlap_words=0)
+    chapter_one = [c for c in read_chunks(output) if c['chapter'] == 'Chapter 1 Light']
+
+    make_pdf(pdf, textbook_pages('a virtual image'), outline)
+    chunk_pdf(pdf, output, chapter='Chapter 2', max_words=20, overlap_words=0)
+
+    chunks = list(read_chunks(output))
+    assert [c for c in chunks if c['chapter'] == 'Chapter 1 Light'] == chapter_one
+    chapter_two = ' '.join(c['text'] for c in chunks if c['chapter'] == 'Chapter 2 Mirrors')
+    assert 'a virtual image' in chapter_two and 'reflection' not in chapter_two
+    with open(output, encoding='utf-8') as f:
+        assert all(json.loads(line)['id'] for line in f)
+
+
+def test_local_index_cites_chapter_and_pages(tmp_path: pathlib.Path) -> None:
+    pdf = str(tmp_path / 'science.pdf')
+    make_pdf(pdf, textbook_pages())
+    output = str(tmp_path / 'science.jsonl')
+    chunk_pdf(pdf, output, 'CBSE_Grade10_Science.pdf', max_words=20, overlap_words=0)
+
+    index = VectorIndex.from_textbooks(
+        textbooks_from_chunk_files([output]), lambda texts: [bag_of_words(t) for t in texts]
+    )
+    path = str(tmp_path / 'science.npz')
+    index.save(path)
+    tool = LocalVectorRetrieval(VectorIndex.load(path), embed_fn=bag_of_words, vector_distance_threshold=0.9)
+
+    student_context = parse_student_context('CBSE Grade 10 Science')
+    chunks = tool.retrieve('What do concave mirrors do?', student_context)
+    assert chunks[0]['chapter'] == 'Chapter 2 Mirrors'
+    assert (chunks[0]['page_start'], chunks[0]['page_end']) == (3, 4)
+    assert '(Chapter 2 Mirrors, 2.1 Plane mirrors, pp. 3-4)' in format_retrieved_chunks(student_context, chunks[:1])
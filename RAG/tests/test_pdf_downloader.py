@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import hashlib
+import pathlib
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, ClassVar
+
+import pytest
+
+from rag.shared_libraries.pdf_downloader import ChecksumMismatch, PdfDownloader
+
+BODY = bytes(range(256)) * 4096  # 1 MiB
+ETAG = '"v1"'
+
+
+class StorageHandler(BaseHTTPRequestHandler):
+    """Serves BODY like Cloud Storage: ranges, ETag, x-goog-hash, 304s."""
+
+    requests: ClassVar[list[dict[str, str]]] = []
+    cut_first_response_at: ClassVar[int | None] = None
+    ignore_ranges: ClassVar[bool] = False
+
+    def do_GET(self) -> None:
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        start, end = 0, len(BODY) - 1
+        ranged = (
+            not type(self).ignore_ranges
+            and 'Range' in self.headers
+            and self.headers.get('If-Range', ETAG) == ETAG
+        )
+        if ranged:
+            first, _, last = self.headers['Range'][len('bytes='):].partition('-')
+            start, end = int(first), int(last) if last else len(BODY) - 1
+        self.send_response(206 if ranged else 200)
+        self.send_header('Content-Length', str(end - start + 1))
+        if ranged:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(BODY)}')
+        if not type(self).ignore_ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', ETAG)
+        self.send_header('x-goog-hash', 'md5=' + base64.b64encode(hashlib.md5(BODY).digest()).decode())
+        self.end_headers()
+        body = BODY[start:end + 1]
+        cut_at = type(self).cut_first_response_at
+        if cut_at is not None and len(body) > cut_at:
+            body = body[:cut_at]
+            type(self).cut_first_response_at = None
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[str]:
+    StorageHandler.requests = []
+    StorageHandler.cut_first_response_at = None
+    StorageHandler.ignore_ranges = False
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StorageHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/textbook.pdf'
+    httpd.shutdown()
+
+
+def test_parallel_ranges_then_not_modified(server: str, tmp_path: pathlib.Path) -> None:
+    output = str(tmp_path / 'textbook.pdf')
+    downloader = PdfDownloader(segments=4, min_segment_bytes=128 * 1024, block_size=64 * 1024)
+
+    result = downloader.download(server, output, expected_sha256=hashlib.sha256(BODY).hexdigest())
+    assert result.status == 'downloaded'
+    with open(output, 'rb') as f:
+        assert f.read() == BODY
+    assert StorageHandler.requests[0]['Range'] == 'bytes=0-0'
+    assert sum('Range' in r for r in StorageHandler.requests) == 1 + 4
+
+    again = downloader.download(server, output)
+    assert again.status == 'not_modified' and again.bytes_transferred == 0
+    assert StorageHandler.requests[-1]['If-None-Match'] == ETAG
+
+
+def test_resumes_an_interrupted_download(server: str, tmp_path: pathlib.Path) -> None:
+    output = str(tmp_path / 'textbook.pdf')
+    StorageHandler.cut_first_response_at = 300 * 1024
+    downloader = PdfDownloader(segments=1, block_size=64 * 1024)
+
+    result = downloader.download(server, output)
+    assert result.status == 'resumed'
+    with open(output, 'rb') as f:
+        assert f.read() == BODY
+    assert StorageHandler.requests[-1]['Range'].startswith('bytes=')
+    assert StorageHandler.requests[-1]['Range'] != 'bytes=0-'
+    assert result.bytes_transferred < 1.5 * len(BODY)
+
+    with pytest.raises(ChecksumMismatch):
+        PdfDownloader().download(server, str(tmp_path / 'other.pdf'), expected_sha256='0' * 64)
+    assert not (tmp_path / 'other.pdf').exists()
+
+
+def test_streams_in_one_request_when_ranges_are_ignored(server: str, tmp_path: pathlib.Path) -> None:
+    StorageHandler.ignore_ranges = True
+    output = str(tmp_path / 'textbook.pdf')
+    downloader = PdfDownloader(segments=4, min_segment_bytes=128 * 1024)
+
+    result = downloader.download(server, output)
+    assert result.status == 'downloaded' and result.bytes_transferred == len(BODY)
+    with open(output, 'rb') as f:
+        assert f.read() == BODY
+    assert len(StorageHandler.requests) == 1
@@ -0,0 +1,234 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import pathlib
+from types import ModuleType, SimpleNamespace
+
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+
+CORPUS = 'projects/123/locations/us-central1/ragCorpora/456'
+
+
+@pytest.fixture
+def corpus_script(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    # The script requires a configured project at import time.
+    monkeypatch.setenv('GOOGLE_CLOUD_PROJECT', 'test-project')
+    monkeypatch.setenv('GOOGLE_CLOUD_LOCATION', 'us-central1')
+    module = importlib.import_module('rag.shared_libraries.prepare_corpus_and_data')
+    monkeypatch.setattr(module.time, 'sleep', lambda seconds: None)
+    return module
+
+
+class FakeRag:
+    """Stands in for the RAG Engine file API, failing the first uploads if asked."""
+
+    def __init__(self, quota_errors: int = 0) -> None:
+        self.files: dict[str, str] = {}  # RAG file name -> display name
+        self.uploads: list[str] = []
+        self.deleted: list[str] = []
+        self.quota_errors = quota_errors
+
+    def upload_file(self, corpus_name: str, path: str, display_name: str, description: str) -> SimpleNamespace:
+        if self.quota_errors:
+            self.quota_errors -= 1
+            raise ResourceExhausted('Quota exceeded')
+        name = f'{corpus_name}/ragFiles/{len(self.uploads) + 1}'
+        self.uploads.append(display_name)
+        self.files[name] = display_name
+        return SimpleNamespace(name=name, display_name=display_name)
+
+    def delete_file(self, name: str) -> None:
+        self.deleted.append(name)
+        del self.files[name]
+
+    def list_files(self, corpus_name: str) -> list[SimpleNamespace]:
+        return [SimpleNamespace(name=name, display_name=display) for name, display in self.files.items()]
+
+
+@pytest.fixture
+def fake_rag(corpus_script: ModuleType, monkeypatch: pytest.MonkeyPatch) -> FakeRag:
+    fake = FakeRag()
+    for name in ('upload_file', 'delete_file', 'list_files'):
+        monkeypatch.setattr(corpus_script.rag, name, getattr(fake, name))
+    return fake
+
+
+def textbook(tmp_path: pathlib.Path, name: str, content: bytes = b'%PDF-1.4') -> dict:
+    path = tmp_path / f'{name}.pdf'
+    path.write_bytes(content)
+    return {'pdf_path': str(path), 'display_name': f'{name}.pdf'}
+
+
+def test_backoff_delay_is_full_jitter_below_the_cap(
+    corpus_script: ModuleType, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for attempt in range(8):
+        cap = min(60.0, 2.0 * 2**attempt)
+        assert all(0 <= corpus_script.backoff_delay(attempt, 2.0, 60.0) <= cap for _ in range(50))
+
+    monkeypatch.setattr(corpus_script.random, 'uniform', lambda low, high: high)
+    assert [corpus_script.backoff_delay(n, 2.0, 60.0) for n in range(7)] == [2, 4, 8, 16, 32, 60, 60]
+
+
+def test_quota_errors_are_retried_until_the_upload_succeeds(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    fake_rag.quota_errors = 2
+
+    [result] = corpus_script.ingest_textbooks(CORPUS, [textbook(tmp_path, 'science')], str(tmp_path))
+
+    assert (result.status, result.attempts) == ('uploaded', 3)
+    assert result.rag_file.name == f'{CORPUS}/ragFiles/1'
+    assert result.upload_seconds >= 0
+
+
+def test_upload_gives_up_after_max_attempts(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    fake_rag.quota_errors = 10
+    stats: dict[str, int] = {}
+
+    rag_file = corpus_script.upload_pdf_to_corpus(
+        CORPUS, str(tmp_path / 'science.pdf'), 'science.pdf', 'Science', max_attempts=3, stats=stats
+    )
+
+    assert rag_file is None
+    assert stats == {'attempts': 3}
+    assert fake_rag.quota_errors == 7
+
+
+def test_results_keep_textbook_order_and_failures_do_not_stop_the_rest(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    textbooks = [
+        textbook(tmp_path, 'english'),
+        {'pdf_path': str(tmp_path / 'missing.pdf'), 'display_name': 'missing.pdf'},
+        textbook(tmp_path, 'broken'),
+        textbook(tmp_path, 'science'),
+    ]
+    resolve = corpus_script.resolve_textbook_pdf
+
+    def resolve_textbook_pdf(entry: dict, temp_dir: str | None = None) -> str | None:
+        if entry['display_name'] == 'broken.pdf':
+            raise OSError('disk vanished')
+        return resolve(entry, temp_dir)
+
+    monkeypatch.setattr(corpus_script, 'resolve_textbook_pdf', resolve_textbook_pdf)
+
+    results = corpus_script.ingest_textbooks(CORPUS, textbooks, str(tmp_path), download_workers=4)
+
+    assert [(r.display_name, r.status) for r in results] == [
+        ('english.pdf', 'uploaded'),
+        ('missing.pdf', 'unavailable'),
+        ('broken.pdf', 'download failed'),
+        ('science.pdf', 'uploaded'),
+    ]
+    assert sorted(fake_rag.uploads) == ['english.pdf', 'science.pdf']
+
+
+def ingest(corpus_script: ModuleType, textbooks: list[dict], manifest: object, tmp_path: pathlib.Path) -> list:
+    """Runs ingestion the way main() does: against the files the corpus holds now."""
+    remote_files = corpus_script.group_files_by_display_name(
+        corpus_script.list_corpus_files(CORPUS, verbose=False)
+    )
+    return corpus_script.ingest_textbooks(
+        CORPUS, textbooks, str(tmp_path), manifest=manifest, remote_files=remote_files
+    )
+
+
+def test_unchanged_textbooks_are_skipped(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    manifest = corpus_script.IngestionManifest(str(tmp_path / 'manifest.json'), CORPUS)
+    science = textbook(tmp_path, 'science')
+
+    [first] = ingest(corpus_script, [science], manifest, tmp_path)
+    [second] = ingest(corpus_script, [science], manifest, tmp_path)
+
+    assert (first.status, second.status) == ('uploaded', 'unchanged')
+    assert fake_rag.uploads == ['science.pdf']
+    assert fake_rag.deleted == []
+
+
+def test_changed_textbook_is_uploaded_before_the_old_copy_is_deleted(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    manifest = corpus_script.IngestionManifest(str(tmp_path / 'manifest.json'), CORPUS)
+    ingest(corpus_script, [textbook(tmp_path, 'science')], manifest, tmp_path)
+    old_name = manifest.rag_file_name('science.pdf')
+
+    [result] = ingest(corpus_script, [textbook(tmp_path, 'science', b'%PDF-1.4 edition 2')], manifest, tmp_path)
+
+    assert result.status == 'replaced'
+    assert fake_rag.deleted == [old_name]
+    assert manifest.rag_file_name('science.pdf') == result.rag_file.name != old_name
+    assert list(fake_rag.files) == [result.rag_file.name]
+
+
+def test_textbooks_dropped_from_the_config_are_deleted_and_forgotten(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    path = str(tmp_path / 'manifest.json')
+    manifest = corpus_script.IngestionManifest(path, CORPUS)
+    science, english = textbook(tmp_path, 'science'), textbook(tmp_path, 'english')
+    ingest(corpus_script, [science, english], manifest, tmp_path)
+    fake_rag.files[f'{CORPUS}/ragFiles/uploaded-elsewhere'] = 'notes.pdf'
+    english_file = manifest.rag_file_name('english.pdf')
+
+    remote_files = corpus_script.group_files_by_display_name(fake_rag.list_files(CORPUS))
+    removed = corpus_script.prune_removed_textbooks(manifest, [science], remote_files)
+
+    assert removed == ['english.pdf']
+    assert fake_rag.deleted == [english_file]
+    assert manifest.get('english.pdf') is None
+    assert corpus_script.IngestionManifest(path, CORPUS).get('english.pdf') is None
+    # Files the manifest never recorded are not touched.
+    assert 'notes.pdf' in fake_rag.files.values()
+
+
+def test_duplicate_copies_of_an_unchanged_textbook_are_removed(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    manifest = corpus_script.IngestionManifest(str(tmp_path / 'manifest.json'), CORPUS)
+    science = textbook(tmp_path, 'science')
+    ingest(corpus_script, [science], manifest, tmp_path)
+    duplicate = f'{CORPUS}/ragFiles/duplicate'
+    fake_rag.files[duplicate] = 'science.pdf'
+
+    [result] = ingest(corpus_script, [science], manifest, tmp_path)
+
+    assert result.status == 'unchanged'
+    assert fake_rag.deleted == [duplicate]
+    assert list(fake_rag.files) == [manifest.rag_file_name('science.pdf')]
+
+
+def test_a_rerun_resumes_from_the_saved_manifest(
+    corpus_script: ModuleType, fake_rag: FakeRag, tmp_path: pathlib.Path
+) -> None:
+    path = str(tmp_path / 'manifest.json')
+    science, english = textbook(tmp_path, 'science'), textbook(tmp_path, 'english')
+    ingest(corpus_script, [science], corpus_script.IngestionManifest(path, CORPUS), tmp_path)
+    # A run that crashed after uploading english.pdf but before recording it.
+    fake_rag.upload_file(CORPUS, english['pdf_path'], 'english.pdf', 'English')
+    orphan = next(name for name, display in fake_rag.files.items() if display == 'english.pdf')
+
+    resumed = corpus_script.IngestionManifest(path, CORPUS)
+    results = ingest(corpus_script, [science, english], resumed, tmp_path)
+
+    assert [r.status for r in results] == ['unchanged', 'replaced']
+    assert fake_rag.deleted == [orphan]
+    assert sorted(fake_rag.files.values()) == ['english.pdf', 'science.pdf']
+    assert corpus_script.IngestionManifest(path, 'another-corpus').textbooks == {}
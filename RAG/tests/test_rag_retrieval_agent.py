@@ -0,0 +1,257 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+from collections.abc import AsyncGenerator
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from benchmarks.load_test import create_agent
+from benchmarks.stubs import FixtureRetrieval, StubLlm
+from rag.agents import DirectRagRetrievalAgent
+from rag.explanation_agent import create_explanation_agent
+from rag.shared_libraries.context_parser import ParsedStudentContext
+from rag.tools import TextbookRagRetrieval, create_textbook_retrieval_tool
+
+CORPUS = 'projects/123/locations/us-central1/ragCorpora/456'
+CHUNKS = [
+    {
+        'text': 'Photosynthesis is the process by which green plants make food.',
+        'source_uri': 'gs://textbooks/CBSE_Grade10_Science.pdf',
+        'source_display_name': 'CBSE_Grade10_Science.pdf',
+        'distance': 0.21,
+    }
+]
+
+
+def retrieval_tool() -> TextbookRagRetrieval:
+    tool = create_textbook_retrieval_tool(CORPUS)
+    assert tool is not None
+    return tool
+
+
+def run_agent(agent: BaseAgent, state: dict, message: str) -> tuple[list[Event], dict[str, Any]]:
+    async def run() -> tuple[list[Event], dict[str, Any]]:
+        runner = InMemoryRunner(agent, app_name='test')
+        session = await runner.session_service.create_session(
+            app_name='test', user_id='student', state=state
+        )
+        events = [
+            event
+            async for event in runner.run_async(
+                user_id='student',
+                session_id=session.id,
+                new_message=types.Content(role='user', parts=[types.Part(text=message)]),
+            )
+        ]
+        finished = await runner.session_service.get_session(
+            app_name='test', user_id='student', session_id=session.id
+        )
+        assert finished is not None
+        return events, finished.state
+
+    return asyncio.run(run())
+
+
+class MenuLlm(BaseLlm):
+    """Offers the style menu, and tells a story once a style is chosen."""
+
+    model: str = 'menu'
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        content = llm_request.contents[-1]
+        assert content.parts
+        last = content.parts[-1].text or ''
+        text = 'Once upon a time...' if last.strip() == '1' else (
+            'I found relevant information about your question. How would you like me to explain this? '
+            'Please choose one:\n1. Explain like a story\n2. Explain using memory techniques\n'
+            '3. Explain using simple examples'
+        )
+        yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=text)]))
+
+
+def test_retrieves_without_llm_and_keeps_chunk_metadata(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries = []
+
+    def fake_retrieve(
+        self: TextbookRagRetrieval, query: str, student_context: ParsedStudentContext | None = None
+    ) -> list[dict]:
+        assert student_context is not None
+        queries.append((query, student_context.subject))
+        return CHUNKS
+
+    monkeypatch.setattr(TextbookRagRetrieval, 'retrieve', fake_retrieve)
+    agent = DirectRagRetrievalAgent(retrieval_tool())
+    state: dict[str, Any] = {'session_student_context': {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'}}
+
+    events, state = run_agent(agent, state, 'What is photosynthesis?')
+
+    assert queries == [('CBSE Grade 10 Science: What is photosynthesis?', 'Science')]
+    assert state['retrieved_chunks'] == CHUNKS
+    assert 'Source: CBSE_Grade10_Science.pdf' in state['retrieved_content']
+    content = events[-1].content
+    assert content is not None and content.parts
+    assert content.parts[0].text == state['retrieved_content']
+
+
+def test_reports_answer_not_found(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(TextbookRagRetrieval, 'retrieve', lambda self, query, student_context=None: [])
+    agent = DirectRagRetrievalAgent(retrieval_tool())
+    state: dict[str, Any] = {'student_context': {'board': 'ICSE', 'grade': 'Grade 9', 'subject': 'English'}}
+
+    _, state = run_agent(agent, state, 'Who wrote the poem?')
+
+    assert state['retrieved_content'] == 'Answer not found in the textbook for ICSE Grade 9 English'
+
+
+def test_skips_retrieval_without_student_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(*args: Any, **kwargs: Any) -> list[dict]:
+        raise AssertionError('retrieval should be skipped')
+
+    monkeypatch.setattr(TextbookRagRetrieval, 'retrieve', fail)
+    agent = DirectRagRetrievalAgent(retrieval_tool())
+
+    _, state = run_agent(agent, {}, 'Hi, how are you?')
+
+    assert state['retrieved_chunks'] == []
+
+
+def test_retrieves_with_partial_student_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries = []
+
+    def fake_retrieve(
+        self: TextbookRagRetrieval, query: str, student_context: ParsedStudentContext | None = None
+    ) -> list[dict]:
+        queries.append(query)
+        return CHUNKS
+
+    monkeypatch.setattr(TextbookRagRetrieval, 'retrieve', fake_retrieve)
+    agent = DirectRagRetrievalAgent(retrieval_tool())
+    state: dict[str, Any] = {'student_context': {'board': 'Not Specified', 'grade': 'Grade 11', 'subject': 'Physics'}}
+
+    _, state = run_agent(agent, state, "Explain Newton's laws")
+
+    assert queries == ["Grade 11 Physics: Explain Newton's laws"]
+    assert state['retrieved_chunks'] == CHUNKS
+
+
+def test_style_reply_reuses_retrieved_content(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries: list[str] = []
+
+    def fake_retrieve(
+        self: TextbookRagRetrieval, query: str, student_context: ParsedStudentContext | None = None
+    ) -> list[dict]:
+        queries.append(query)
+        return CHUNKS
+
+    monkeypatch.setattr(TextbookRagRetrieval, 'retrieve', fake_retrieve)
+    agent = create_explanation_agent(model=MenuLlm(), retrieval_tool=create_textbook_retrieval_tool(CORPUS))
+
+    async def run() -> list[dict[str, Any]]:
+        runner = InMemoryRunner(agent, app_name='test')
+        session = await runner.session_service.create_session(app_name='test', user_id='student')
+        states = []
+        for message in ["I'm studying CBSE Grade 10 Science. What is photosynthesis?", '1']:
+            async for _ in runner.run_async(
+                user_id='student',
+                session_id=session.id,
+                new_message=types.Content(role='user', parts=[types.Part(text=message)]),
+            ):
+                pass
+            current = await runner.session_service.get_session(
+                app_name='test', user_id='student', session_id=session.id
+            )
+            assert current is not None
+            states.append(dict(current.state))
+        return states
+
+    asked, answered = asyncio.run(run())
+
+    assert len(queries) == 1
+    assert asked['pending_style_choice']['retrieved_chunks'] == CHUNKS
+    assert answered['final_explanation'] == 'Once upon a time...'
+    assert answered['retrieved_content'] == asked['retrieved_content']
+    assert answered['pending_style_choice'] is None
+
+
+def test_question_is_answered_once_the_context_is_complete() -> None:
+    queries: list[str] = []
+
+    class RecordingRetrieval(FixtureRetrieval):
+        def query_corpus(self, query: str, store: types.VertexRagStore) -> list[dict]:
+            queries.append(query)
+            return super().query_corpus(query, store)
+
+    llm = StubLlm(first_token_latency=0, tokens_per_second=1e6, output_tokens=20)
+    agent = create_agent('explanation', llm, RecordingRetrieval(latency=0))
+
+    async def run() -> list[str | None]:
+        runner = InMemoryRunner(agent, app_name='test')
+        session = await runner.session_service.create_session(app_name='test', user_id='student')
+        pending = []
+        for message in ["Explain Newton's laws for Grade 11 Physics", 'CBSE', 'Tell me more']:
+            async for _ in runner.run_async(
+                user_id='student',
+                session_id=session.id,
+                new_message=types.Content(role='user', parts=[types.Part(text=message)]),
+            ):
+                pass
+            current = await runner.session_service.get_session(
+                app_name='test', user_id='student', session_id=session.id
+            )
+            assert current is not None
+            pending.append(current.state.get('pending_question'))
+        return pending
+
+    pending = asyncio.run(run())
+
+    assert pending == ["Explain Newton's laws for Grade 11 Physics"] * 2 + [None]
+    assert queries[1] == "CBSE Grade 11 Physics: Explain Newton's laws for Grade 11 Physics"
+    assert queries[2] == 'CBSE Grade 11 Physics: Tell me more'
+
+
+def test_textbook_store_is_resolved_off_the_event_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    threads: list[threading.Thread] = []
+    store = types.VertexRagStore(rag_resources=[types.VertexRagStoreRagResource(rag_corpus=CORPUS)])
+
+    def rag_store_for(
+        self: TextbookRagRetrieval, student_context: ParsedStudentContext | None
+    ) -> types.VertexRagStore:
+        threads.append(threading.current_thread())
+        return store
+
+    monkeypatch.setattr(TextbookRagRetrieval, 'rag_store_for', rag_store_for)
+    tool = retrieval_tool()
+    tool.cache = None
+    llm_request = LlmRequest(model='gemini-2.5-flash')
+    tool_context = cast(ToolContext, SimpleNamespace(state={}, user_content=None))
+
+    asyncio.run(tool.process_llm_request(tool_context=tool_context, llm_request=llm_request))
+
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert llm_request.config is not None and llm_request.config.tools
+    tool_config = llm_request.config.tools[-1]
+    assert isinstance(tool_config, types.Tool) and tool_config.retrieval is not None
+    assert tool_config.retrieval.vertex_rag_store == store
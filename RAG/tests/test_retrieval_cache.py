@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+from typing import Any
+
+import pytest
+
+from rag.shared_libraries.retrieval_cache import RetrievalCache
+
+CORPUS = 'projects/123/locations/us-central1/ragCorpora/456'
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_key_normalizes_query_but_not_retrieval_settings() -> None:
+    key = RetrievalCache.make_key('What is photosynthesis?', CORPUS, 5, 0.6)
+    assert key == RetrievalCache.make_key('  what is   PHOTOSYNTHESIS ', CORPUS, 5, 0.6)
+    assert key != RetrievalCache.make_key('What is photosynthesis?', CORPUS, 10, 0.6)
+    assert key != RetrievalCache.make_key('What is photosynthesis?', CORPUS, 5, 0.5)
+    assert key != RetrievalCache.make_key('What is photosynthesis?', 'other-corpus', 5, 0.6)
+
+
+def test_lru_eviction_and_counters() -> None:
+    cache = RetrievalCache(max_entries=2)
+    cache.put('a', ['chunk a'], corpus=CORPUS)
+    cache.put('b', ['chunk b'], corpus=CORPUS)
+    assert cache.get('a') == ['chunk a']  # "b" is now least recently used
+    cache.put('c', ['chunk c'], corpus=CORPUS)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == ['chunk c']
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (2, 1, 1)
+
+
+def test_entries_expire_after_ttl() -> None:
+    clock = FakeClock()
+    cache = RetrievalCache(ttl_seconds=60, clock=clock)
+    cache.put('a', ['chunk a'], corpus=CORPUS)
+    clock.now += 59
+    assert cache.get('a') == ['chunk a']
+    clock.now += 2
+    assert cache.get('a') is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_disk_tier_survives_restarts_and_is_invalidated_per_corpus(tmp_path: pathlib.Path) -> None:
+    cache = RetrievalCache(cache_dir=str(tmp_path))
+    cache.put('a', ['chunk a'], corpus=CORPUS)
+    cache.put('b', ['chunk b'], corpus='other-corpus')
+
+    restarted = RetrievalCache(cache_dir=str(tmp_path))
+    assert restarted.get('a') == ['chunk a']
+
+    restarted.invalidate_corpus(CORPUS)
+    assert RetrievalCache(cache_dir=str(tmp_path)).get('a') is None
+    assert RetrievalCache(cache_dir=str(tmp_path)).get('b') == ['chunk b']
+
+
+def test_put_writes_to_disk_without_holding_the_lock(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache = RetrievalCache(cache_dir=str(tmp_path))
+    store = cache._store
+    held: list[bool] = []
+
+    def recording_store(key: str, entry: Any) -> None:
+        held.append(cache._lock.locked())
+        store(key, entry)
+
+    monkeypatch.setattr(cache, '_store', recording_store)
+    cache.put('a', ['chunk a'], corpus=CORPUS)
+
+    assert held == [False]
+    assert RetrievalCache(cache_dir=str(tmp_path)).get('a') == ['chunk a']
+
+
+def test_invalidation_reaches_other_processes_memory(tmp_path: pathlib.Path) -> None:
+    clock = FakeClock()
+    worker = RetrievalCache(cache_dir=str(tmp_path), clock=clock, invalidation_check_seconds=5)
+    worker.put('a', ['chunk a'], corpus=CORPUS)
+    worker.put('b', ['chunk b'], corpus='other-corpus')
+    assert worker.get('a', corpus=CORPUS) == ['chunk a']
+
+    clock.now += 1
+    RetrievalCache(cache_dir=str(tmp_path), clock=clock).invalidate_corpus(CORPUS)
+    clock.now += 5
+
+    assert worker.get('a', corpus=CORPUS) is None
+    assert worker.get('b') == ['chunk b']
+    worker.put('a', ['new chunk a'], corpus=CORPUS)
+    assert worker.get('a') == ['new chunk a']
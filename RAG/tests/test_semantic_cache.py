@@ -0,0 +1,150 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import re
+import zlib
+from collections.abc import AsyncGenerator
+
+import numpy as np
+from google.adk.agents import BaseAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from rag.callbacks import create_answer_cache_callbacks
+from rag.shared_libraries.semantic_cache import SemanticCache
+
+STOP_WORDS = {'i', 'm', 'studying', 'what', 'is', 'explain', 'tell', 'it', 'can', 'you', 'please', 'a', 'the', 'me'}
+CBSE_SCIENCE_STORY = ('CBSE', 'Grade 10', 'Science', 'story')
+
+
+def bag_of_words(text: str) -> list[float]:
+    """Deterministic stand-in for a text embedding model."""
+    vector = np.zeros(64)
+    for word in re.findall(r'[a-z]+', text.lower()):
+        if word not in STOP_WORDS:
+            vector[zlib.crc32(word.encode()) % 64] += 1
+    return vector.tolist()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_similar_questions_share_answers_within_a_partition() -> None:
+    cache = SemanticCache(embed_fn=bag_of_words, similarity_threshold=0.9)
+    cache.put('Explain photosynthesis', CBSE_SCIENCE_STORY, 'Once upon a time...')
+
+    assert cache.get('What is photosynthesis?', CBSE_SCIENCE_STORY) == 'Once upon a time...'
+    assert cache.get('What is respiration?', CBSE_SCIENCE_STORY) is None
+    assert cache.get('What is photosynthesis?', ('CBSE', 'Grade 10', 'Science', 'simple_examples')) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_eviction_expiry_and_textbook_invalidation() -> None:
+    clock = FakeClock()
+    cache = SemanticCache(embed_fn=bag_of_words, max_entries=2, ttl_seconds=60, clock=clock)
+    cache.put('photosynthesis', CBSE_SCIENCE_STORY, 'a')
+    cache.put('respiration', CBSE_SCIENCE_STORY, 'b')
+    cache.put('transpiration', ('ICSE', 'Class 9', 'Science', 'story'), 'c')
+
+    assert cache.get('photosynthesis', CBSE_SCIENCE_STORY) is None  # evicted
+    assert cache.stats.evictions == 1
+
+    cache.invalidate_textbook('CBSE', 'Grade 10', 'Science')
+    assert cache.get('respiration', CBSE_SCIENCE_STORY) is None
+    assert len(cache) == 1
+
+    clock.now += 61
+    assert cache.get('transpiration', ('ICSE', 'Class 9', 'Science', 'story')) is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_clear_forgets_question_embeddings() -> None:
+    calls: list[str] = []
+
+    def embed(text: str) -> list[float]:
+        calls.append(text)
+        return bag_of_words(text)
+
+    cache = SemanticCache(embed_fn=embed)
+    cache.put('photosynthesis', CBSE_SCIENCE_STORY, 'a')
+    cache.clear()
+    assert cache.get('photosynthesis', CBSE_SCIENCE_STORY) is None
+    assert calls == ['photosynthesis', 'photosynthesis']
+
+
+class StubExplanationStages(BaseAgent):
+    """Stands in for the three stages; counts how often it runs."""
+
+    runs: int = 0
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        self.runs += 1
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=types.Content(role='model', parts=[types.Part(text='Once upon a time...')]),
+            actions=EventActions(
+                state_delta={
+                    'session_student_context': {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'},
+                    'retrieved_chunks': [{'text': 'Plants make food.'}],
+                    'final_explanation': 'Once upon a time...',
+                }
+            ),
+        )
+
+
+def ask(runner: InMemoryRunner, question: str) -> str | None:
+    async def run() -> str | None:
+        session = await runner.session_service.create_session(app_name='test', user_id='student')
+        events = [
+            event
+            async for event in runner.run_async(
+                user_id='student',
+                session_id=session.id,
+                new_message=types.Content(role='user', parts=[types.Part(text=question)]),
+            )
+        ]
+        content = events[-1].content
+        assert content is not None and content.parts
+        return content.parts[0].text
+
+    return asyncio.run(run())
+
+
+def test_cached_answers_skip_every_stage() -> None:
+    stages = StubExplanationStages(name='stages')
+    before, after = create_answer_cache_callbacks(SemanticCache(embed_fn=bag_of_words))
+    agent = SequentialAgent(
+        name='explanation_agent',
+        sub_agents=[stages],
+        before_agent_callback=before,
+        after_agent_callback=after,
+    )
+    runner = InMemoryRunner(agent, app_name='test')
+
+    first = ask(runner, "I'm studying CBSE Grade 10 Science. Explain photosynthesis like a story.")
+    second = ask(runner, 'CBSE Grade 10 Science: what is photosynthesis? Tell it like a story')
+    ask(runner, 'Explain that like a story')  # a follow-up, never served from the cache
+
+    assert first == second == 'Once upon a time...'
+    assert stages.runs == 2
@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+
+from rag.shared_libraries.single_flight import SingleFlight
+
+
+class Producer:
+    """Yields the given items, waiting for `release` before the last one."""
+
+    def __init__(self, *items: str, error: Exception | None = None) -> None:
+        self.items = items
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> AsyncGenerator[str, None]:
+        self.calls += 1
+        try:
+            for item in self.items[:-1]:
+                yield item
+            await self.release.wait()
+            if self.error is not None:
+                raise self.error
+            yield self.items[-1]
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def collect(
+    flights: SingleFlight[str], key: str, producer: Producer, roles: list[bool] | None = None
+) -> list[str]:
+    on_join = roles.append if roles is not None else None
+    return [item async for item in flights.stream(key, producer, on_join=on_join)]
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_callers_share_one_execution() -> None:
+    async def main() -> tuple[SingleFlight[str], Producer, list[bool], tuple[list[str], list[str]]]:
+        flights: SingleFlight[str] = SingleFlight()
+        producer = Producer('a', 'b', 'c')
+        roles: list[bool] = []
+        first = asyncio.create_task(collect(flights, 'q', producer, roles))
+        await settle()
+        # Joins after 'a' and 'b' were produced, and still receives them.
+        second = asyncio.create_task(collect(flights, 'q', producer, roles))
+        await settle()
+        assert flights.in_flight('q')
+        producer.release.set()
+        results = await asyncio.gather(first, second)
+        return flights, producer, roles, results
+
+    flights, producer, roles, results = asyncio.run(main())
+
+    assert list(results) == [['a', 'b', 'c'], ['a', 'b', 'c']]
+    assert producer.calls == 1
+    assert roles == [True, False]
+    assert not flights.in_flight('q')
+
+
+def test_error_is_raised_in_every_subscriber() -> None:
+    async def main() -> list[list[str] | BaseException]:
+        flights: SingleFlight[str] = SingleFlight()
+        producer = Producer('a', 'b', error=RuntimeError('model unavailable'))
+        callers = [asyncio.create_task(collect(flights, 'q', producer)) for _ in range(3)]
+        await settle()
+        producer.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert {str(result) for result in results} == {'model unavailable'}
+
+
+def test_cancelled_subscriber_leaves_the_others_running() -> None:
+    async def main() -> tuple[Producer, list[str]]:
+        flights: SingleFlight[str] = SingleFlight()
+        producer = Producer('a', 'b')
+        first = asyncio.create_task(collect(flights, 'q', producer))
+        second = asyncio.create_task(collect(flights, 'q', producer))
+        await settle()
+        first.cancel()
+        await settle()
+        producer.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return producer, await second
+
+    producer, result = asyncio.run(main())
+
+    assert result == ['a', 'b']
+    assert not producer.cancelled
+
+
+def test_execution_is_cancelled_when_every_subscriber_leaves() -> None:
+    async def main() -> tuple[Producer, list[str]]:
+        flights: SingleFlight[str] = SingleFlight()
+        producer = Producer('a', 'b')
+        callers = [asyncio.create_task(collect(flights, 'q', producer)) for _ in range(2)]
+        await settle()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await settle()
+        assert producer.cancelled
+        assert not flights.in_flight('q')
+
+        # The next caller starts a new execution instead of joining the cancelled one.
+        producer.release.set()
+        return producer, await collect(flights, 'q', producer)
+
+    producer, result = asyncio.run(main())
+
+    assert result == ['a', 'b']
+    assert producer.calls == 2
@@ -0,0 +1,55 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.planners import BuiltInPlanner
+
+from rag.agents import ContextExtractorAgent, DirectRagRetrievalAgent
+from rag.explanation_agent import create_explanation_agent
+from rag.shared_libraries.stage_config import StageConfig
+from rag.tools import create_textbook_retrieval_tool
+
+CORPUS = 'projects/123/locations/us-central1/ragCorpora/456'
+
+
+def test_stages_get_their_own_model_and_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('CONTEXT_EXTRACTOR_MODEL', 'gemini-2.5-flash-lite')
+    monkeypatch.setenv('CONTEXT_EXTRACTOR_THINKING_BUDGET', '0')
+    monkeypatch.setenv('CONTEXT_EXTRACTOR_MAX_OUTPUT_TOKENS', '256')
+    monkeypatch.delenv('CONTEXT_TOKEN_BUDGET', raising=False)
+
+    agent = create_explanation_agent(
+        model='gemini-2.5-flash',
+        retrieval_tool=create_textbook_retrieval_tool(CORPUS),
+        explanation_generator_config=StageConfig(model='gemini-2.5-pro', temperature=0.7),
+    )
+    extractor, retrieval, generator = agent.sub_agents
+    assert isinstance(extractor, ContextExtractorAgent)
+    assert isinstance(retrieval, DirectRagRetrievalAgent)
+    assert isinstance(generator, LlmAgent)
+
+    llm_extractor = extractor.llm_extractor
+    assert isinstance(llm_extractor, LlmAgent)
+    assert llm_extractor.model == 'gemini-2.5-flash-lite'
+    assert isinstance(llm_extractor.planner, BuiltInPlanner)
+    assert llm_extractor.planner.thinking_config.thinking_budget == 0
+    assert llm_extractor.generate_content_config is not None
+    assert llm_extractor.generate_content_config.max_output_tokens == 256
+    assert generator.model == 'gemini-2.5-pro'
+    assert generator.generate_content_config is not None
+    assert generator.generate_content_config.temperature == 0.7
+    assert generator.planner is None
+    assert retrieval.context_packer is not None
+    assert retrieval.context_packer.token_budget == 6000  # sized for the generator's model
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import BaseAgent, InvocationContext, SequentialAgent
+from google.adk.events import Event
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from rag.shared_libraries.streaming import TurnTimings, stream_turn
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StubStage(BaseAgent):
+    """Emits its pieces of text, advancing the clock one second before each."""
+
+    pieces: list[str]
+    streams: bool = False
+    clock: FakeClock
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        if self.streams:
+            for piece in self.pieces:
+                self.clock.now += 1
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author=self.name,
+                    partial=True,
+                    content=types.Content(role='model', parts=[types.Part(text=piece)]),
+                )
+        self.clock.now += 1
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=types.Content(role='model', parts=[types.Part(text=''.join(self.pieces))]),
+        )
+
+
+def test_only_the_explanation_is_streamed_and_the_turn_is_timed() -> None:
+    clock = FakeClock()
+    agent = SequentialAgent(
+        name='explanation_agent',
+        sub_agents=[
+            StubStage(name='ContextExtractorAgent', pieces=['{"board": "CBSE"}'], clock=clock),
+            StubStage(name='RagRetrievalAgent', pieces=['Plants make food.'], clock=clock),
+            StubStage(
+                name='ExplanationGeneratorAgent',
+                pieces=['Once ', 'upon ', 'a time...'],
+                streams=True,
+                clock=clock,
+            ),
+        ],
+    )
+    runner = InMemoryRunner(agent, app_name='test')
+    received: list[str] = []
+
+    async def run() -> TurnTimings:
+        session = await runner.session_service.create_session(app_name='test', user_id='student')
+        return await stream_turn(
+            runner,
+            user_id='student',
+            session_id=session.id,
+            message='Explain photosynthesis like a story',
+            on_text=received.append,
+            clock=clock,
+        )
+
+    timings = asyncio.run(run())
+
+    assert received == ['Once ', 'upon ', 'a time...']
+    assert timings.time_to_first_token == 3
+    assert timings.total == 6
+    assert timings.stages == {
+        'ContextExtractorAgent': 1,
+        'RagRetrievalAgent': 1,
+        'ExplanationGeneratorAgent': 4,
+    }
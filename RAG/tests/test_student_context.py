@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from benchmarks.stubs import StubLlm
+from rag.agents import create_context_extractor_agent
+from rag.shared_libraries.context_parser import parse_student_context
+from rag.shared_libraries.stage_config import StageConfig
+from rag.shared_libraries.student_context import StudentContext
+
+from .test_rag_retrieval_agent import run_agent
+
+
+@pytest.mark.parametrize(
+    'fields, expected',
+    [
+        (
+            {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'},
+            {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science'},
+        ),
+        (
+            {'board': 'tamilnadu state board', 'grade': '4th', 'subject': 'maths', 'term': 'term II'},
+            {'board': 'Tamil Nadu State Board', 'grade': 'Grade 4', 'subject': 'Mathematics', 'term': 'Term 2'},
+        ),
+        (
+            {'board': 'ICSE', 'grade': 'Class 9', 'subject': 'Astrology'},
+            {'board': 'ICSE', 'grade': 'Grade 9', 'subject': 'Not Specified'},
+        ),
+    ],
+)
+def test_fields_are_canonicalized(fields: dict[str, str], expected: dict[str, str]) -> None:
+    assert StudentContext.model_validate(fields).to_state() == expected
+
+
+def test_reads_legacy_json_and_parser_results() -> None:
+    legacy = StudentContext.from_state('```json\n{"board": "ICSE", "grade": "Class 9", "subject": "English"}\n```')
+    parsed = StudentContext.from_parsed(parse_student_context('CBSE class 10 science term 1'))
+
+    assert legacy.textbook == 'ICSE Grade 9 English'
+    assert parsed.to_state() == {'board': 'CBSE', 'grade': 'Grade 10', 'subject': 'Science', 'term': 'Term 1'}
+    assert parsed.to_parsed().term == 1
+    assert not StudentContext.from_state('Could you tell me your board?').is_complete
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    [
+        ('{"board": "CBSE", "grade": null, "subject": "Science"}', 'CBSE Not Specified Science'),
+        ({'board': None}, 'Not Specified Not Specified Not Specified'),
+        ({'board': 5, 'grade': 'Class 9'}, 'Not Specified Grade 9 Not Specified'),
+    ],
+)
+def test_null_and_invalid_fields_are_dropped(value: object, expected: str) -> None:
+    assert StudentContext.from_state(value).textbook == expected
+
+
+def test_schema_only_allows_canonical_values() -> None:
+    schema = StudentContext.model_json_schema()
+
+    assert 'Tamil Nadu State Board' in schema['$defs']['Board']['enum']
+    assert 'Class 9' not in schema['$defs']['Grade']['enum']
+
+
+def test_llm_extractor_output_is_validated_into_state() -> None:
+    agent = create_context_extractor_agent(
+        model=StubLlm(first_token_latency=0, tokens_per_second=1e6), config=StageConfig()
+    )
+
+    # "algebra" only implies the subject, so the parser defers to the LLM.
+    _, state = run_agent(agent, {}, "I'm in Class 9 ICSE. Help me with algebra.")
+
+    expected = {'board': 'ICSE', 'grade': 'Grade 9', 'subject': 'Mathematics'}
+    assert state['student_context'] == expected
+    assert state['session_student_context'] == expected
@@ -0,0 +1,118 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+from collections.abc import Iterable
+from types import SimpleNamespace
+
+import pytest
+
+from rag.shared_libraries import textbook_manifest
+from rag.shared_libraries.textbook_manifest import (
+    TextbookEntry,
+    TextbookManifest,
+    parse_textbook_display_name,
+)
+
+CORPUS = 'projects/123/locations/us-central1/ragCorpora/456'
+
+
+def rag_file(file_id: str, display_name: str) -> SimpleNamespace:
+    return SimpleNamespace(name=f'{CORPUS}/ragFiles/{file_id}', display_name=display_name)
+
+
+MANIFEST = TextbookManifest.from_rag_files(
+    [
+        rag_file('1', 'CBSE_Grade10_Science.pdf'),
+        rag_file('2', 'ICSE_Class9_English.pdf'),
+        rag_file('3', 'TamilNaduStateBoard_Grade4_Maths_Science_SocialScience_Term1.pdf'),
+        rag_file('4', 'TamilNaduStateBoard_Grade4_English_Term2.pdf'),
+        rag_file('5', 'scanned_notes.pdf'),
+    ]
+)
+
+
+def file_ids(textbooks: Iterable[TextbookEntry]) -> list[str]:
+    return sorted(t.rag_file_id for t in textbooks)
+
+
+def test_display_name_parsing() -> None:
+    assert parse_textbook_display_name('TamilNaduStateBoard_Grade4_Maths_Science_SocialScience_Term1.pdf') == {
+        'board': 'Tamil Nadu State Board',
+        'grade': 4,
+        'subjects': ['Mathematics', 'Science', 'Social Science'],
+        'term': 1,
+    }
+    assert parse_textbook_display_name('scanned_notes.pdf') is None
+    assert len(MANIFEST) == 4
+
+
+def test_lookup_matches_multi_subject_textbooks() -> None:
+    assert file_ids(MANIFEST.lookup('Tamil Nadu State Board', 'Grade 4', 'Social Science')) == ['3']
+    assert file_ids(MANIFEST.lookup('Tamil Nadu State Board', 'Class 4', 'English')) == ['4']
+    assert file_ids(MANIFEST.lookup('Tamil Nadu State Board', 'Grade 4', 'Science', term=2)) == []
+
+
+def test_lookup_grade_and_class_are_equivalent() -> None:
+    assert file_ids(MANIFEST.lookup('ICSE', 'Grade 9', 'English')) == ['2']
+    assert file_ids(MANIFEST.lookup('CBSE', 'Class 10', 'Science')) == ['1']
+    assert MANIFEST.lookup('CBSE', 'Grade 9', 'Science') == []
+
+
+def test_lookup_falls_back_to_broader_subject() -> None:
+    assert file_ids(MANIFEST.lookup('CBSE', 'Grade 10', 'Physics')) == ['1']
+    assert file_ids(MANIFEST.lookup('State Board', 'Grade 4', 'Mathematics')) == ['3']
+
+
+def test_save_and_load_round_trip(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / 'textbooks.json')
+    MANIFEST.save(path)
+    assert TextbookManifest.load(path).entries == MANIFEST.entries
+
+
+def test_failed_manifest_is_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[str] = []
+
+    def list_files(corpus_name: str) -> list[SimpleNamespace]:
+        calls.append(corpus_name)
+        if len(calls) == 1:
+            raise RuntimeError('unavailable')
+        return [rag_file('1', 'CBSE_Grade10_Science.pdf')]
+
+    monkeypatch.setattr(textbook_manifest.rag, 'list_files', list_files)
+    monkeypatch.setattr(textbook_manifest, 'FAILURE_RETRY_SECONDS', 0.0)
+    monkeypatch.setattr(textbook_manifest, '_manifests', {})
+
+    assert len(textbook_manifest.get_textbook_manifest(CORPUS)) == 0
+    assert len(textbook_manifest.get_textbook_manifest(CORPUS)) == 1
+    assert len(textbook_manifest.get_textbook_manifest(CORPUS)) == 1
+    assert len(calls) == 2
+
+
+def test_changed_textbooks_invalidate_cached_answers(monkeypatch: pytest.MonkeyPatch) -> None:
+    files = [[rag_file('1', 'CBSE_Grade10_Science.pdf')]]
+    invalidated: list[tuple[str, ...]] = []
+    cache = SimpleNamespace(invalidate_textbook=lambda *textbook: invalidated.append(textbook))
+    monkeypatch.setattr(textbook_manifest.rag, 'list_files', lambda corpus_name: files[-1])
+    monkeypatch.setattr(textbook_manifest, 'get_semantic_cache', lambda: cache)
+    monkeypatch.setattr(textbook_manifest, '_manifests', {})
+    monkeypatch.setenv('TEXTBOOK_MANIFEST_REFRESH_SECONDS', '0')
+
+    textbook_manifest.get_textbook_manifest(CORPUS)
+    textbook_manifest.get_textbook_manifest(CORPUS)
+    assert invalidated == []
+
+    files.append([*files[0], rag_file('2', 'ICSE_Class9_English.pdf')])
+    textbook_manifest.get_textbook_manifest(CORPUS)
+    assert invalidated == [('ICSE', 'Grade 9', 'English')]
@@ -0,0 +1,104 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pathlib
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from benchmarks.stubs import FIXTURE_CORPUS_PATH
+from rag.shared_libraries.context_parser import parse_student_context
+from rag.shared_libraries.vector_index import IndexedFile, VectorIndex
+from rag.tools import LocalVectorRetrieval, create_textbook_retrieval_tool
+
+STOP_WORDS = {'a', 'an', 'and', 'by', 'in', 'is', 'of', 'the', 'their', 'to', 'what', 'which'}
+
+
+def bag_of_words(text: str) -> list[float]:
+    """Deterministic stand-in for a text embedding model."""
+    vector = np.zeros(256)
+    for word in re.findall(r'[a-z]+', text.lower()):
+        if word not in STOP_WORDS:
+            vector[zlib.crc32(word.encode()) % 256] += 1
+    return vector.tolist()
+
+
+def random_index(
+    chunks: int = 2000, files: int = 10, dimensions: int = 32
+) -> tuple[VectorIndex, np.random.Generator]:
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(40, dimensions))
+    embeddings = centers[rng.integers(0, 40, chunks)] + 0.3 * rng.normal(size=(chunks, dimensions))
+    return VectorIndex(
+        embeddings,
+        texts=[f'chunk {i}' for i in range(chunks)],
+        file_indexes=[i % files for i in range(chunks)],
+        files=[IndexedFile(rag_file_id=str(i), display_name=f'book{i}.pdf') for i in range(files)],
+    ), rng
+
+
+def test_exact_search_restriction_and_ivf_recall(tmp_path: pathlib.Path) -> None:
+    index, rng = random_index()
+    queries = index.embeddings[rng.integers(0, len(index), 50)] + 0.05 * rng.normal(size=(50, 32))
+
+    exact = [index.search(q, top_k=10) for q in queries]
+    brute = [np.argsort(-(index.embeddings @ (q / np.linalg.norm(q))))[:10] for q in queries]
+    assert [[row for row, _ in result] for result in exact] == [list(rows) for rows in brute]
+
+    restricted = index.search(queries[0], top_k=5, rag_file_ids=['3'])
+    assert restricted and all(index.file_of(row).rag_file_id == '3' for row, _ in restricted)
+
+    index.build_ivf(n_lists=32)
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    loaded = VectorIndex.load(path)
+    recalled = sum(
+        len({row for row, _ in loaded.search(q, top_k=10, n_probe=4)} & {row for row, _ in result})
+        for q, result in zip(queries, exact, strict=True)
+    )
+    assert recalled / (10 * len(queries)) > 0.9
+
+
+def test_local_backend_is_selected_by_configuration(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with open(FIXTURE_CORPUS_PATH, encoding='utf-8') as f:
+        fixture = json.load(f)
+    index = VectorIndex.from_textbooks(
+        fixture['textbooks'], lambda texts: [bag_of_words(t) for t in texts], corpus=fixture['rag_corpus']
+    )
+    path = str(tmp_path / 'textbooks.npz')
+    index.save(path)
+    monkeypatch.setenv('RETRIEVAL_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_INDEX_PATH', path)
+
+    tool = create_textbook_retrieval_tool(vector_distance_threshold=0.9)
+    assert isinstance(tool, LocalVectorRetrieval)
+    assert tool.name == 'retrieve_student_textbook_content'
+
+    tool.embed_fn = bag_of_words
+    chunks = tool.retrieve(
+        'CBSE Grade 10 Science: what is photosynthesis?', parse_student_context('CBSE Grade 10 Science')
+    )
+    assert 'photosynthesis' in chunks[0]['text']
+    assert {c['source_display_name'] for c in chunks} == {'CBSE_Grade10_Science.pdf'}
+
+
+def test_empty_corpus_is_rejected() -> None:
+    textbooks = [{'rag_file_id': '1', 'display_name': 'scanned_notes.pdf', 'chunks': []}]
+    with pytest.raises(ValueError, match='No chunks'):
+        VectorIndex.from_textbooks(textbooks, lambda texts: [bag_of_words(t) for t in texts])